@@ -0,0 +1,83 @@
+"""
+Cold import time
+
+Starts a fresh interpreter for every sample and times a few import
+statements against a bare interpreter start, reporting the median and
+best import cost in milliseconds and how many modules each one loads.
+Cold starts of short-lived workers pay this on every boot.
+
+Usage:
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --importtime   # also list the slowest modules
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SAMPLES = 15
+
+STATEMENTS = [
+    "import nasirpy",
+    "from nasirpy import App",
+    "from nasirpy import App, CORSMiddleware",
+    "from nasirpy import App, StaticFiles, EventSourceResponse",
+]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, len(sys.modules))
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    # Measure imports from up-to-date .pyc files, as a deployed app would
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def sample(statement: str) -> tuple:
+    env = _env()
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(statement=statement)],
+        check=True, capture_output=True, text=True, env=env,
+    ).stdout.split()
+    return float(output[0]) * 1000, int(output[1])
+
+
+def slowest_modules(statement: str, count: int = 15) -> list:
+    env = _env()
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        check=True, capture_output=True, text=True, env=env,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines()[1:]:
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace(":", "|", 1).split("|"))
+        rows.append((int(cumulative_us), int(self_us), name))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main() -> None:
+    _, baseline_modules = sample("pass")
+    print(f"{'statement':<58}{'median ms':>10}{'best ms':>10}{'modules':>9}")
+    for statement in STATEMENTS:
+        sample(statement)  # write the bytecode cache and warm the OS file cache
+        runs = [sample(statement) for _ in range(SAMPLES)]
+        times = [ms for ms, _ in runs]
+        modules = runs[-1][1] - baseline_modules
+        print(f"{statement:<58}{statistics.median(times):>10.1f}{min(times):>10.1f}{modules:>9}")
+
+    if "--importtime" in sys.argv:
+        print("\nslowest modules for 'from nasirpy import App' (cumulative us, self us):")
+        for cumulative, self_us, name in slowest_modules("from nasirpy import App"):
+            print(f"{cumulative:>10}{self_us:>10}  {name}")
+
+
+if __name__ == "__main__":
+    main()
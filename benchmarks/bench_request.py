@@ -0,0 +1,118 @@
+"""
+Per-request cost of the App request path
+
+Runs a small app in-process (no server) and reports time per request
+(bare, and with the header-adding middleware installed), peak memory traced while handling one request, and the bytes allocated
+to build a Request and a JSON Response.
+
+Usage:
+    python benchmarks/bench_request.py
+"""
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from nasirpy import App, Request, Response  # noqa: E402
+from nasirpy import CORSMiddleware, SecurityHeadersMiddleware  # noqa: E402
+
+SCOPE = {
+    "type": "http",
+    "method": "GET",
+    "path": "/users/42",
+    "query_string": b"verbose=1&page=2",
+    "headers": [
+        (b"host", b"example.com"),
+        (b"user-agent", b"bench/1.0"),
+        (b"accept", b"application/json"),
+        (b"origin", b"https://example.com"),
+    ],
+    "client": ("127.0.0.1", 50000),
+}
+
+
+def build_app(header_middleware: bool = False) -> App:
+    app = App()
+    if header_middleware:
+        app.add_middleware(CORSMiddleware())
+        app.add_middleware(SecurityHeadersMiddleware())
+
+    @app.get("/users/{user_id}")
+    async def get_user(request):
+        return Response({
+            "user_id": request.path_params["user_id"],
+            "agent": request.headers.get("user-agent"),
+            "page": request.query_params.get("page"),
+        })
+
+    return app
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def bytes_per_object(factory, count: int = 1000) -> float:
+    """Bytes allocated and still referenced per call of factory"""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    objects = [factory() for _ in range(count)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def make_request() -> Request:
+    return Request(SCOPE, receive)
+
+
+def make_response() -> Response:
+    return Response({"user_id": "42", "agent": "bench/1.0", "page": "2"})
+
+
+async def time_per_request(app: App, iterations: int) -> float:
+    await app.startup()
+    for _ in range(1000):
+        await app(SCOPE, receive, send)
+
+    # Best of five rounds, to keep scheduler noise out of the comparison
+    rounds = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iterations // 5):
+            await app(SCOPE, receive, send)
+        rounds.append((time.perf_counter() - start) / (iterations // 5))
+    return min(rounds)
+
+
+async def main(iterations: int = 20000) -> None:
+    app = build_app()
+    elapsed = await time_per_request(app, iterations)
+    with_headers = await time_per_request(build_app(header_middleware=True), iterations)
+
+    tracemalloc.start()
+    await app(SCOPE, receive, send)
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    await app(SCOPE, receive, send)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"requests:            {iterations}")
+    print(f"time per request:    {elapsed * 1e6:.1f} us")
+    print(f"  + CORS + security headers: {with_headers * 1e6:.1f} us")
+    print(f"peak bytes/request:  {peak - baseline}")
+    print(f"Request object:      {bytes_per_object(make_request):.0f} bytes")
+    print(f"Response object:     {bytes_per_object(make_response):.0f} bytes")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Serializing a list of 10k dataclass records
+
+Compares building intermediate dicts with ``dataclasses.asdict`` before
+``json.dumps`` against the cached per-type encoders in
+``nasirpy.serialization`` (used by Response), and against orjson with the
+same ``default`` hook when orjson is installed.
+
+Usage:
+    python benchmarks/bench_serialization.py
+"""
+import dataclasses
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from nasirpy import serialization  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+RECORDS = 10_000
+ROUNDS = 20
+
+
+@dataclasses.dataclass
+class Address:
+    street: str
+    city: str
+
+
+@dataclasses.dataclass
+class Record:
+    id: int
+    name: str
+    email: str
+    score: float
+    active: bool
+    created: datetime
+    tags: List[str]
+    address: Optional[Address]
+
+
+def make_records() -> List[Record]:
+    created = datetime(2024, 1, 1, 12, 0, 0)
+    return [
+        Record(i, f"user{i}", f"user{i}@example.com", i / 7, i % 2 == 0, created,
+               ["a", "b"], Address(f"{i} Main St", "Springfield"))
+        for i in range(RECORDS)
+    ]
+
+
+def asdict_dumps(records: List[Record]) -> bytes:
+    return json.dumps([dataclasses.asdict(r) for r in records], default=str).encode()
+
+
+def measure(name: str, func, records: List[Record]) -> None:
+    func(records)  # warm up (and build the cached encoders)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        func(records)
+    elapsed = (time.perf_counter() - start) / ROUNDS
+    print(f"{name:<34} {elapsed * 1000:8.2f} ms")
+
+
+def main() -> None:
+    records = make_records()
+    print(f"records: {RECORDS}, rounds: {ROUNDS}")
+    measure("asdict + json.dumps", asdict_dumps, records)
+    measure("serialization.dumps", serialization.dumps, records)
+    if orjson is not None:
+        measure("orjson (default for datetime etc.)",
+                lambda r: orjson.dumps(r, default=serialization.default), records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Replay recorded traffic against an app
+
+Loads the app from ``module:attribute``, replays a recording written by
+RecordingMiddleware in-process, and prints per-route latency percentiles.
+Save a run with --save, then replay against another version of the code
+with --compare to see the change per route.
+
+Usage:
+    python benchmarks/replay.py myapp:app traffic.jsonl --speed 10 --save before.json
+    git checkout feature-branch
+    python benchmarks/replay.py myapp:app traffic.jsonl --speed 10 --compare before.json
+    python benchmarks/replay.py myapp:app traffic.jsonl --fast --concurrency 100
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from nasirpy.replay import ReplayReport, compare, format_comparison, replay  # noqa: E402
+
+
+def load_app(target: str):
+    module_name, _, attribute = target.partition(":")
+    sys.path.insert(0, os.getcwd())
+    return getattr(importlib.import_module(module_name), attribute or "app")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("app", help="module:attribute of the ASGI app")
+    parser.add_argument("recording", help="file written by RecordingMiddleware")
+    parser.add_argument("--speed", type=float, default=1.0, help="pacing relative to the recording")
+    parser.add_argument("--fast", action="store_true", help="ignore recorded pacing")
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight with --fast")
+    parser.add_argument("--save", help="write this run's report to a file")
+    parser.add_argument("--compare", help="report from an earlier run to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(replay(
+        load_app(args.app), args.recording,
+        speed=None if args.fast else args.speed, concurrency=args.concurrency,
+    ))
+    print(f"{report.total} requests in {report.wall_time:.3f}s\n")
+    if args.save:
+        report.save(args.save)
+    baseline = ReplayReport.load(args.compare) if args.compare else report
+    print(format_comparison(compare(baseline, report)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+from dataclasses import asdict, dataclass
+from typing import Optional
+
 from nasirpy import App, Response, Router
 from nasirpy import LoggingMiddleware, TimingMiddleware, CORSMiddleware
 from nasirpy.exceptions import NotFoundError, BadRequestError
@@ -9,6 +12,11 @@ app.add_middleware(CORSMiddleware())
 app.add_middleware(LoggingMiddleware())
 app.add_middleware(TimingMiddleware())
 
+@dataclass
+class UserIn:
+    name: str
+    email: Optional[str] = None
+
 # Create an API router with prefix
 api = Router(prefix="/api/v1")
 
@@ -27,21 +35,13 @@ async def get_user(request):
     })
 
 @api.post("/users")
-async def create_user(request):
-    try:
-        user_data = await request.json()
-        # Validate required fields
-        if "name" not in user_data:
-            raise BadRequestError("name is required")
-        
-        return Response({
-            "message": "User created",
-            "user": user_data
-        }, status_code=201)
-    except BadRequestError as e:
-        raise e
-    except Exception as e:
-        raise BadRequestError(str(e))
+async def create_user(user: UserIn):
+    # The body is decoded and validated into UserIn before the handler runs;
+    # a missing or mistyped field is answered with 422 automatically
+    return Response({
+        "message": "User created",
+        "user": asdict(user)
+    }, status_code=201)
 
 @api.post("/login")
 async def login(request):
@@ -73,5 +73,6 @@ async def hello(request):
     return Response({"message": "Hello, World!"})
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    import os
+    from nasirpy.server import run
+    run(app, host="127.0.0.1", port=8000, workers=os.cpu_count() or 1)
@@ -1,35 +1,104 @@
-from .app import App
-from .response import Response
-from .request import Request
-from .router import Router
-from .middleware import (
-    BaseMiddleware,
-    MiddlewareManager,
-    CORSMiddleware,
-    LoggingMiddleware,
-    TimingMiddleware,
-    SecurityHeadersMiddleware,
-    RateLimitMiddleware,
-    create_auth_middleware,
-    create_custom_middleware,
-)
-from .exceptions import HTTPException, NotFoundError, BadRequestError
-
-__all__ = [
-    'App', 
-    'Response', 
-    'Request', 
-    'Router',
-    'BaseMiddleware',
-    'MiddlewareManager',
-    'CORSMiddleware',
-    'LoggingMiddleware',
-    'TimingMiddleware',
-    'SecurityHeadersMiddleware',
-    'RateLimitMiddleware',
-    'create_auth_middleware',
-    'create_custom_middleware',
-    'HTTPException',
-    'NotFoundError',
-    'BadRequestError',
-]
+"""
+nasirpy
+
+Public names are imported on first access (PEP 562 module ``__getattr__``),
+so ``import nasirpy`` loads nothing else and ``from nasirpy import App``
+loads only what App needs. Built-in middleware, Server-Sent Events and
+static files are imported when they are first used.
+"""
+from importlib import import_module
+# typing.TYPE_CHECKING without importing typing; type checkers treat it as True
+TYPE_CHECKING = False
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    'App': 'app',
+    'Response': 'response',
+    'StreamingResponse': 'response',
+    'FileResponse': 'response',
+    'Request': 'request',
+    'Router': 'router',
+    'BaseMiddleware': 'middleware',
+    'MiddlewareManager': 'middleware',
+    'CORSMiddleware': 'middleware',
+    'LoggingMiddleware': 'middleware',
+    'TimingMiddleware': 'middleware',
+    'SecurityHeadersMiddleware': 'middleware',
+    'RateLimitMiddleware': 'middleware',
+    'RecordingMiddleware': 'replay',
+    'create_auth_middleware': 'middleware',
+    'create_custom_middleware': 'middleware',
+    'HTTPException': 'exceptions',
+    'NotFoundError': 'exceptions',
+    'MethodNotAllowedError': 'exceptions',
+    'BadRequestError': 'exceptions',
+    'RequestValidationError': 'exceptions',
+    'Depends': 'dependencies',
+    'Query': 'dependencies',
+    'Header': 'dependencies',
+    'Body': 'dependencies',
+    'cpu_bound': 'concurrency',
+    'BackgroundTasks': 'background',
+    'bulkhead': 'admission',
+    'single_flight': 'singleflight',
+    'timeout': 'timeouts',
+    'cancel_on_disconnect': 'timeouts',
+    'WebSocket': 'websocket',
+    'WebSocketDisconnect': 'websocket',
+    'Broadcast': 'websocket',
+    'EventSourceResponse': 'sse',
+    'ServerSentEvent': 'sse',
+    'EventPublisher': 'sse',
+    'StaticFiles': 'staticfiles',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{module}", __name__), name)
+    # Cache it so later lookups don't come through here
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:  # pragma: no cover - for type checkers and IDEs only
+    from .app import App
+    from .response import Response, StreamingResponse, FileResponse
+    from .request import Request
+    from .router import Router
+    from .middleware import (
+        BaseMiddleware,
+        MiddlewareManager,
+        CORSMiddleware,
+        LoggingMiddleware,
+        TimingMiddleware,
+        SecurityHeadersMiddleware,
+        RateLimitMiddleware,
+        create_auth_middleware,
+        create_custom_middleware,
+    )
+    from .exceptions import (
+        HTTPException,
+        NotFoundError,
+        MethodNotAllowedError,
+        BadRequestError,
+        RequestValidationError,
+    )
+    from .dependencies import Depends, Query, Header, Body
+    from .concurrency import cpu_bound
+    from .background import BackgroundTasks
+    from .admission import bulkhead
+    from .singleflight import single_flight
+    from .timeouts import timeout, cancel_on_disconnect
+    from .websocket import WebSocket, WebSocketDisconnect, Broadcast
+    from .sse import EventSourceResponse, ServerSentEvent, EventPublisher
+    from .staticfiles import StaticFiles
+    from .replay import RecordingMiddleware
@@ -0,0 +1,168 @@
+"""
+Admission control and load shedding
+
+Without a limit every request is admitted, so under overload they all slow
+down together. A ConcurrencyLimiter admits up to ``limit`` requests at a
+time, parks a bounded number of extra requests in a FIFO queue for at most
+``queue_timeout`` seconds, and turns everything beyond that away at once
+with 503 Service Unavailable and a ``Retry-After`` header, which is cheaper
+for both sides than a request that times out later.
+
+App-wide:
+
+    app.limit_concurrency(100, max_queue=200, queue_timeout=1.0)
+
+Per route (a bulkhead, so one slow endpoint can't take every slot):
+
+    @app.get("/reports")
+    @bulkhead(5, max_queue=10)
+    async def reports(request):
+        ...
+
+With ``target_latency`` set the limit adapts (AIMD): it grows by one after
+a full window of requests finish under the target and is cut by
+``backoff`` whenever a request takes longer, staying within
+``[min_limit, max_limit]``.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Deque, Optional
+
+from .exceptions import HTTPException
+
+
+class ConcurrencyLimiter:
+    """
+    Bounded concurrency with a bounded, deadline-limited waiting queue
+
+    Args:
+        limit: Requests allowed to run at once (the starting limit when adaptive)
+        max_queue: Requests allowed to wait for a slot; more are rejected
+        queue_timeout: Seconds a request may wait before it is rejected
+        retry_after: Seconds suggested to rejected clients
+        target_latency: Enables the adaptive limit, in seconds
+        min_limit: Lower bound for the adaptive limit
+        max_limit: Upper bound for the adaptive limit (defaults to 10 * limit)
+        backoff: Factor applied to the limit when a request is too slow
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        max_queue: int = 0,
+        queue_timeout: float = 1.0,
+        retry_after: int = 1,
+        target_latency: Optional[float] = None,
+        min_limit: int = 1,
+        max_limit: Optional[int] = None,
+        backoff: float = 0.9,
+    ):
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.target_latency = target_latency
+        self.min_limit = min_limit
+        self.max_limit = max_limit if max_limit is not None else limit * 10
+        self.backoff = backoff
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._successes = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if allowed; False means shed the request"""
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # Granted just as the deadline passed; take it
+                return True
+            self._waiters.remove(waiter)
+            waiter.cancel()
+            self.rejected += 1
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+                waiter.cancel()
+            raise
+
+    def release(self, latency: Optional[float] = None) -> None:
+        """
+        Give a slot back, handing it to the oldest waiter
+
+        Args:
+            latency: How long the request took, for the adaptive limit
+        """
+        self.in_flight -= 1
+        if self.target_latency is not None and latency is not None:
+            self._adapt(latency)
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot passes directly to the waiter
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _adapt(self, latency: float) -> None:
+        if latency > self.target_latency:
+            self.limit = max(self.min_limit, int(self.limit * self.backoff))
+            self._successes = 0
+        else:
+            self._successes += 1
+            if self._successes >= self.limit:
+                self.limit = min(self.max_limit, self.limit + 1)
+                self._successes = 0
+
+    def overloaded(self) -> HTTPException:
+        """The 503 to answer a shed request with"""
+        return HTTPException(503, headers={"Retry-After": str(self.retry_after)})
+
+    def wrap(self, endpoint: Callable) -> Callable:
+        """Run an endpoint coroutine function under this limiter"""
+        async def limited(request):
+            if not await self.acquire():
+                raise self.overloaded()
+            start = time.perf_counter()
+            try:
+                return await endpoint(request)
+            finally:
+                self.release(time.perf_counter() - start)
+        return limited
+
+
+def bulkhead(limit: int, **options) -> Callable[[Callable], Callable]:
+    """
+    Give a route handler its own ConcurrencyLimiter
+
+    Accepts the same options as ConcurrencyLimiter. Requests over the
+    bulkhead's limit and queue get 503 without affecting other routes.
+    """
+    def decorator(handler: Callable) -> Callable:
+        handler._nasirpy_limiter = ConcurrencyLimiter(limit, **options)
+        return handler
+    return decorator
+
+
+def get_limiter(handler: Callable) -> Optional[ConcurrencyLimiter]:
+    return getattr(handler, "_nasirpy_limiter", None)
@@ -1,16 +1,63 @@
-from typing import Callable, Dict, List, Optional, Union, Tuple
-from .request import Request
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Union, Tuple
+import asyncio
+import inspect
+import json
+import time
+from .request import Headers, Request
 from .response import Response
-from .utils import match_route
-from .exceptions import HTTPException, NotFoundError
-from .router import Router
-from .middleware import MiddlewareManager, BaseMiddleware
+from .exceptions import (
+    DEFAULT_DETAILS,
+    HTTPException,
+    MethodNotAllowedError,
+    NotFoundError,
+    RequestValidationError,
+)
+from .router import WEBSOCKET, HostTable, MountTable, Router, RouteGroups, RouteTable
+from .dependencies import DependencyContainer, compile_endpoint, get_plan
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .admission import ConcurrencyLimiter
+    from .middleware import BaseMiddleware
+
+# Middleware, WebSocket, timeout, admission and single-flight support is
+# imported where the App first needs it, so ``from nasirpy import App``
+# stays cheap
 
 class App(Router):
     def __init__(self):
         super().__init__()
         self.routers: List[Router] = []
+        # (prefix, router) in inclusion order; the prefix is applied when the table is built
+        self._included: List[Tuple[str, Router]] = []
+        # Mounted ASGI apps, see mount()
+        self.mounts: Dict[str, Callable] = {}
+        self._mount_table: Optional[MountTable] = None
+        # Header carrying the API version for routers created with version=...
+        self.version_header = "x-api-version"
+        # Built when any router is bound to a host or version
+        self._host_table: Optional[HostTable] = None
+        from .middleware import MiddlewareManager
         self.middleware_manager = MiddlewareManager()
+        self.dependencies = DependencyContainer()
+        self.startup_handlers: List[Callable] = []
+        self.shutdown_handlers: List[Callable] = []
+        self.started = False
+        self._route_table: Optional[RouteTable] = None
+        self.exception_handlers: Dict[type, Callable] = {
+            HTTPException: http_exception_handler,
+            RequestValidationError: validation_exception_handler,
+            Exception: server_error_handler,
+        }
+        # App-wide defaults, see set_request_timeout() / set_cancel_on_disconnect()
+        self.request_timeout: Optional[float] = None
+        self.cancel_on_disconnect = False
+        # App-wide admission control, see limit_concurrency()
+        self.admission: Optional["ConcurrencyLimiter"] = None
+        # Background tasks allowed to run at once across all requests
+        self.max_background_tasks = 100
+        self._background_limit: Optional[asyncio.Semaphore] = None
+        # Exception class -> handler, resolved through the MRO on first use
+        self._exception_handler_cache: Dict[type, Callable] = {}
         
     async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
         """
@@ -22,73 +69,338 @@ class App(Router):
         """
         ASGI application handler
         """
+        if scope["type"] == "lifespan":
+            await self._handle_lifespan(receive, send)
+            return
+        if self._mount_table is not None:
+            prefix, app = self._mount_table.match(scope["path"])
+            if app is not None:
+                # The mounted app sees the path below its prefix
+                scope = dict(scope)
+                scope["root_path"] = scope.get("root_path", "") + prefix
+                scope["path"] = scope["path"][len(prefix):] or "/"
+                await app(scope, receive, send)
+                return
+        if scope["type"] == "websocket":
+            await self._handle_websocket(scope, receive, send)
+            return
         if scope["type"] != "http":
             return
             
         request = Request(scope, receive)
-        response = await self._dispatch(request)
-        await response.send(send)
+        limiter = self.admission
+        if limiter is not None:
+            if not await limiter.acquire():
+                response = await self._handle_exception(request, limiter.overloaded())
+                await response.send(send)
+                return
+            start = time.perf_counter()
+        try:
+            try:
+                response = await self._dispatch(request)
+                # receive lets streaming responses stop when the client goes away
+                await response.send(send, request._receive_pending)
+            finally:
+                # Free the slot as soon as the response is out, before post-processing
+                if limiter is not None:
+                    limiter.release(time.perf_counter() - start)
+            # The client has its response; now run any post-processing
+            if request._background is not None:
+                await request._background.run(self._get_background_limit())
+            if response.background is not None:
+                await response.background.run(self._get_background_limit())
+        finally:
+            request._cancel_receive()
+            await self.dependencies.close_request(request)
+
+    async def _handle_websocket(self, scope: dict, receive: Callable, send: Callable) -> None:
+        route_table = self._route_table
+        if route_table is None:
+            route_table = self._compile()
+        if self._host_table is not None:
+            headers = Headers(scope.get("headers", []))
+            route_table = self._host_table.select(headers.get("host"), headers.get(self.version_header))
+        handler, params, pattern = route_table.match(scope["path"], WEBSOCKET)
+        if handler is None:
+            # Closing before accept makes the server reject the handshake (403)
+            await send({"type": "websocket.close", "code": 1000})
+            return
+        scope["route"] = pattern
+        from .websocket import WebSocket, run_websocket
+        websocket = WebSocket(scope, receive, send, handler._nasirpy_websocket_idle_timeout)
+        websocket.path_params = params
+        await run_websocket(handler, websocket)
+
+    def _get_background_limit(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._background_limit is None:
+            self._background_limit = asyncio.Semaphore(self.max_background_tasks)
+        return self._background_limit
     
     async def _dispatch(self, request: Request) -> Response:
         """
         Dispatch the request to the appropriate handler through middleware
         """
         try:
-            handler, params = self._get_handler(request.path, request.method)
+            route_table = self._route_table
+            if route_table is None:
+                route_table = self._compile()
+            if self._host_table is not None:
+                headers = request.headers
+                route_table = self._host_table.select(headers.get("host"), headers.get(self.version_header))
+            handler, params, pattern = route_table.match(request.path, request.method)
             if handler is None:
-                raise NotFoundError(f"No route found for {request.method} {request.path}")
+                # Unmatched routes are common (scanners, typos) and cheap to
+                # answer: build the exception for the handler, but don't raise it
+                allowed = [m for m in route_table.allowed_methods(request.path) if m != WEBSOCKET]
+                exc = MethodNotAllowedError(allowed) if allowed else NotFoundError()
+                return await self._handle_exception(request, exc)
 
-            # Set path parameters
-            request.path_params = params or {}
+            # Set path parameters, and the route for middleware that reports per route
+            request.path_params = params
+            request.scope["route"] = pattern
             
-            # Create the final handler that includes the route handler
-            async def final_handler(req: Request) -> Response:
-                return await handler(req)
+            # The route table stores each handler already wrapped in the
+            # middleware chain, so this runs middleware and handler in one call
+            return await handler(request)
             
-            # Process through middleware chain
-            response = await self.middleware_manager.process_request(request, final_handler)
-            return response
-            
-        except HTTPException as e:
-            return Response(
-                {"error": e.detail},
-                status_code=e.status_code
-            )
         except Exception as e:
-            return Response(
-                {"error": "Internal Server Error", "detail": str(e)},
-                status_code=500
-            )
+            return await self._handle_exception(request, e)
+
+    async def _handle_exception(self, request: Request, exc: Exception) -> Response:
+        handler = self._exception_handler_cache.get(type(exc))
+        if handler is None:
+            handler = self._resolve_exception_handler(type(exc))
+        result = handler(request, exc)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def _resolve_exception_handler(self, exc_class: type) -> Callable:
+        for cls in exc_class.__mro__:
+            if cls in self.exception_handlers:
+                handler = self._exception_handler_cache[exc_class] = self.exception_handlers[cls]
+                return handler
+        raise TypeError(f"No exception handler for {exc_class.__name__}")
+
+    def exception_handler(self, exc_class: type):
+        """
+        Register a handler for an exception class and its subclasses
+
+        The most specific registered class in the exception's MRO wins.
+        Handlers take ``(request, exc)`` and return a Response (sync or async).
+        Unmatched routes are passed as NotFoundError / MethodNotAllowedError.
+
+        Usage:
+            @app.exception_handler(PermissionError)
+            async def forbidden(request, exc):
+                return Response({"error": "Forbidden"}, status_code=403)
+        """
+        def decorator(handler: Callable) -> Callable:
+            self.exception_handlers[exc_class] = handler
+            self._exception_handler_cache.clear()
+            return handler
+        return decorator
     
-    def _get_handler(self, path: str, method: str) -> Tuple[Optional[Callable], Optional[Dict[str, str]]]:
+    def _compile(self) -> RouteTable:
         """
-        Get the handler function and extracted parameters for a given path and method
+        Build the route table with app routes first, then included routers
+
+        Routers bound to a host or version also get a HostTable, which
+        picks the table to match against from the request's headers.
+
+        With CORSMiddleware installed, routes without an OPTIONS handler get
+        one, so preflights reach the middleware instead of ending in 405.
         """
-        # First check app routes
-        for route_pattern, methods in self.routes:
-            params = match_route(route_pattern, path)
-            if params is not None and method in methods:
-                return methods[method], params
-        
-        # Then check included routers
-        for router in self.routers:
-            for route_pattern, methods in router.routes:
-                params = match_route(route_pattern, path)
-                if params is not None and method in methods:
-                    return methods[method], params
-        
-        return None, None
+        from .middleware import CORSMiddleware
+        groups = self._route_groups()
+        if any(isinstance(m, CORSMiddleware) for m in self.middleware_manager.middleware_stack):
+            groups = {
+                key: [(path, _with_preflight(methods)) for path, methods in routes]
+                for key, routes in groups.items()
+            }
+        endpoints: Dict[Callable, Callable] = {}
+
+        def wrap(handler: Callable) -> Callable:
+            # Shared between tables, so each handler's chain is built once
+            endpoint = endpoints.get(handler)
+            if endpoint is None:
+                endpoint = endpoints[handler] = self._build_endpoint(handler)
+            return endpoint
+
+        self._route_table = RouteTable(groups.get((None, None), []), wrap=wrap)
+        self._host_table = HostTable(groups, wrap=wrap) if set(groups) - {(None, None)} else None
+        return self._route_table
+
+    def _route_groups(self) -> RouteGroups:
+        groups: RouteGroups = {(None, None): list(self.routes)}
+        for prefix, router in self._included:
+            routes = groups.setdefault((router.host, router.version), [])
+            if prefix:
+                routes.extend((prefix + path, methods) for path, methods in router.routes)
+            else:
+                routes.extend(router.routes)
+        return groups
+
+    def _all_routes(self) -> List[Tuple[str, Dict[str, Callable]]]:
+        return [route for routes in self._route_groups().values() for route in routes]
+
+    def _build_endpoint(self, handler: Callable) -> Callable:
+        """
+        Wrap a handler in parameter resolution, its bulkhead and request
+        coalescing if any, the middleware chain, and finally its timeout /
+        disconnect guard
+        """
+        if hasattr(handler, "_nasirpy_websocket_idle_timeout"):
+            # WebSocket handlers take the WebSocket directly, outside HTTP middleware
+            return handler
+        from .admission import get_limiter
+        from .singleflight import get_single_flight
+        from .timeouts import get_timeout, guard, is_cancel_on_disconnect
+        endpoint = compile_endpoint(handler, self.dependencies)
+        limiter = get_limiter(handler)
+        if limiter is not None:
+            endpoint = limiter.wrap(endpoint)
+        flight = get_single_flight(handler)
+        if flight is not None:
+            # Outside the bulkhead, so coalesced requests don't take its slots
+            endpoint = flight.wrap(endpoint)
+        chain = self.middleware_manager.build_chain(endpoint)
+        seconds = get_timeout(handler)
+        if seconds is None:
+            seconds = self.request_timeout
+        cancel = self.cancel_on_disconnect or is_cancel_on_disconnect(handler)
+        return guard(chain, seconds, cancel)
+
+    def set_request_timeout(self, seconds: Optional[float]) -> None:
+        """Answer 504 for requests whose route takes longer than seconds (None disables)"""
+        self._check_not_started()
+        self.request_timeout = seconds
+
+    def set_cancel_on_disconnect(self, enabled: bool = True) -> None:
+        """Cancel handlers whose client disconnects before the response is ready"""
+        self._check_not_started()
+        self.cancel_on_disconnect = enabled
+
+    def limit_concurrency(self, max_concurrent: int, **options) -> "ConcurrencyLimiter":
+        """
+        Limit how many requests the app handles at once
+
+        Requests beyond the limit wait in a bounded queue (``max_queue``,
+        ``queue_timeout``); the rest are answered 503 with Retry-After
+        straight away. Takes the same options as ConcurrencyLimiter,
+        including ``target_latency`` for an adaptive limit.
+        """
+        from .admission import ConcurrencyLimiter
+        self._check_not_started()
+        self.admission = ConcurrencyLimiter(max_concurrent, **options)
+        return self.admission
+
+    def _check_not_started(self) -> None:
+        if self.started:
+            raise RuntimeError("Cannot modify routes or middleware after the application has started")
+        self._route_table = None
+
+    # Lifespan
+
+    def on_startup(self, handler: Callable) -> Callable:
+        """
+        Register a function to run before the app accepts requests
+
+        Usage:
+            @app.on_startup
+            async def open_pool():
+                await db.connect()
+        """
+        self.startup_handlers.append(handler)
+        return handler
+
+    def on_shutdown(self, handler: Callable) -> Callable:
+        """Register a function to run when the server shuts down"""
+        self.shutdown_handlers.append(handler)
+        return handler
+
+    async def startup(self) -> None:
+        """
+        Freeze the route table, compile middleware chains and run startup hooks
+
+        After startup routes and middleware can no longer be added, so the
+        compiled table built here is the one every request uses.
+        """
+        self._compile()
+        self.started = True
+        for app in self.mounts.values():
+            if isinstance(app, App):
+                await app.startup()
+        for handler in self.startup_handlers:
+            await self._run_hook(handler)
+        # Create app-scoped dependencies (connection pools, clients) up front
+        plans = [
+            get_plan(handler)
+            for _, methods in self._all_routes()
+            for handler in methods.values()
+        ]
+        await self.dependencies.startup(plans)
+
+    async def shutdown(self) -> None:
+        """Run shutdown hooks in reverse registration order, then release app-scoped dependencies"""
+        for handler in reversed(self.shutdown_handlers):
+            await self._run_hook(handler)
+        await self.dependencies.shutdown()
+        for app in self.mounts.values():
+            if isinstance(app, App):
+                await app.shutdown()
+
+    @staticmethod
+    async def _run_hook(handler: Callable) -> None:
+        result = handler()
+        if inspect.isawaitable(result):
+            await result
+
+    async def _handle_lifespan(self, receive: Callable, send: Callable) -> None:
+        """Speak the ASGI lifespan protocol"""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                try:
+                    await self.shutdown()
+                except Exception as e:
+                    await send({"type": "lifespan.shutdown.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.shutdown.complete"})
+                return
     
     def route(self, path: str, methods: List[str] = ["GET"]):
         """
         Route decorator for registering handlers
         """
         def decorator(handler: Callable):
+            self._check_not_started()
+            get_plan(handler)
             method_dict = {method.upper(): handler for method in methods}
             self.routes.append((path, method_dict))
             return handler
         return decorator
     
+    def websocket(self, path: str, idle_timeout: Optional[float] = None):
+        """
+        WebSocket route decorator
+
+        Usage:
+            @app.websocket("/ws/{room}")
+            async def room(websocket: WebSocket):
+                await websocket.accept()
+                ...
+        """
+        return super().websocket(path, idle_timeout)
+
     # Convenience decorators for common HTTP methods
     def get(self, path: str):
         return self.route(path, methods=["GET"])
@@ -103,22 +415,45 @@ class App(Router):
         return self.route(path, methods=["DELETE"])
     
     def include_router(self, router: Router, prefix: str = ""):
-        """Include a router with an optional prefix"""
-        if prefix:
-            router.prefix = prefix + router.prefix
+        """Include a router, with its routes under an optional extra prefix"""
+        self._check_not_started()
         self.routers.append(router)
+        self._included.append((self._normalize_prefix(prefix), router))
+        router._owners.append(self)
+
+    def mount(self, prefix: str, app: Callable) -> None:
+        """
+        Send every request under prefix to another ASGI app
+
+        Mounts are matched before the app's own routes, by longest prefix.
+        The mounted app receives a scope whose ``path`` is the part below
+        the prefix and whose ``root_path`` has the prefix appended. It runs
+        its own routing and middleware; this app's middleware doesn't apply.
+        Mounted nasirpy Apps are started and shut down with this one.
+
+        Usage:
+            admin = App()
+            app.mount("/admin", admin)
+        """
+        self._check_not_started()
+        prefix = self._normalize_prefix(prefix)
+        if not prefix:
+            raise ValueError("Mount prefix cannot be empty")
+        self.mounts[prefix] = app
+        self._mount_table = MountTable(self.mounts)
     
     # Middleware management methods
-    def add_middleware(self, middleware: Union[BaseMiddleware, Callable]) -> None:
+    def add_middleware(self, middleware: Union["BaseMiddleware", Callable]) -> None:
         """
         Add middleware to the application
         
         Args:
             middleware: Either a BaseMiddleware instance or a callable
         """
+        self._check_not_started()
         self.middleware_manager.add_middleware(middleware)
     
-    def middleware(self, middleware_class: Union[BaseMiddleware, Callable]):
+    def middleware(self, middleware_class: Union["BaseMiddleware", Callable]):
         """
         Decorator for adding middleware
         
@@ -136,3 +471,56 @@ class App(Router):
             # If it's already an instance or function, use directly
             self.add_middleware(middleware_class)
         return middleware_class
+
+
+# Default exception handlers
+
+# JSON bodies for HTTPExceptions raised with their default detail,
+# encoded once instead of on every error response
+_ERROR_BODIES: Dict[Tuple[int, str], bytes] = {
+    (status_code, detail): json.dumps({"error": detail}).encode()
+    for status_code, detail in DEFAULT_DETAILS.items()
+}
+
+
+# Allowed methods -> OPTIONS handler, shared by every route and every
+# compile so the dependency plan cache holds one entry per method set
+_preflight_handlers: Dict[Tuple[str, ...], Callable] = {}
+
+
+def _with_preflight(methods: Dict[str, Callable]) -> Dict[str, Callable]:
+    """A route's handlers plus an OPTIONS handler for CORSMiddleware to answer preflights through"""
+    allowed = tuple(sorted(method for method in methods if method != WEBSOCKET))
+    if not allowed or "OPTIONS" in methods:
+        return methods
+
+    preflight = _preflight_handlers.get(allowed)
+    if preflight is None:
+        async def preflight(request: Request) -> Response:
+            # CORSMiddleware answers preflights itself; any other OPTIONS gets here
+            raise MethodNotAllowedError(list(allowed))
+        _preflight_handlers[allowed] = preflight
+    return {**methods, "OPTIONS": preflight}
+
+
+def http_exception_handler(request: Request, exc: HTTPException) -> Response:
+    body = _ERROR_BODIES.get((exc.status_code, exc.detail))
+    if body is not None:
+        response = Response.from_encoded(body, exc.status_code)
+    else:
+        response = Response({"error": exc.detail}, status_code=exc.status_code)
+    if exc.headers:
+        for name, value in exc.headers.items():
+            response.headers[name] = value
+    return response
+
+
+def validation_exception_handler(request: Request, exc: RequestValidationError) -> Response:
+    return Response({"error": exc.detail, "errors": exc.errors}, status_code=exc.status_code)
+
+
+def server_error_handler(request: Request, exc: Exception) -> Response:
+    return Response(
+        {"error": "Internal Server Error", "detail": str(exc)},
+        status_code=500
+    )
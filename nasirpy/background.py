@@ -0,0 +1,67 @@
+"""
+Work that runs after the response has been sent
+
+Handlers hand post-processing (audit records, cache invalidation, emails)
+to a BackgroundTasks object instead of doing it before returning, so the
+client gets its response without waiting for it:
+
+    @app.post("/orders")
+    async def create_order(order: OrderIn, tasks: BackgroundTasks):
+        saved = await save(order)
+        tasks.add_task(write_audit_record, saved.id)
+        return saved
+
+A parameter annotated ``BackgroundTasks`` is injected per request;
+alternatively pass ``background=`` to a Response. App runs the tasks once
+``Response.send`` has completed, in the order they were added. Synchronous
+functions run in the thread pool (or the process pool for ``@cpu_bound``),
+failures are logged and don't stop later tasks, and an app-wide semaphore
+bounds how many tasks run at once.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, List, Optional, Tuple
+
+from .concurrency import is_async_callable, sync_runner
+
+logger = logging.getLogger("nasirpy.background")
+
+
+class BackgroundTasks:
+    """An ordered list of calls to make after the response is sent"""
+
+    __slots__ = ("tasks",)
+
+    def __init__(self):
+        self.tasks: List[Tuple[Callable, tuple, dict]] = []
+
+    def add_task(self, func: Callable, *args: Any, **kwargs: Any) -> None:
+        self.tasks.append((func, args, kwargs))
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    async def run(self, limit: Optional[asyncio.Semaphore] = None) -> None:
+        """
+        Run every task in order, logging (not raising) failures
+
+        Args:
+            limit: Semaphore held while each task runs, to bound concurrency
+        """
+        for func, args, kwargs in self.tasks:
+            try:
+                if limit is None:
+                    await _call(func, args, kwargs)
+                else:
+                    async with limit:
+                        await _call(func, args, kwargs)
+            except Exception:
+                logger.exception("Background task %s failed", getattr(func, "__qualname__", func))
+        self.tasks.clear()
+
+
+async def _call(func: Callable, args: tuple, kwargs: dict) -> None:
+    if is_async_callable(func):
+        await func(*args, **kwargs)
+    else:
+        await sync_runner(func)(func, *args, **kwargs)
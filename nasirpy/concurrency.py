@@ -0,0 +1,131 @@
+"""
+Running blocking code without stalling the event loop
+
+Plain ``def`` handlers and dependencies are detected when they are
+registered and run in a bounded thread pool, with the caller's context
+variables copied into the worker thread. Synchronous middleware has a pool
+of its own (see MiddlewareManager), since it blocks its thread while the
+rest of the chain runs. Functions marked ``@cpu_bound``
+run in a process pool instead, so pure-Python number crunching doesn't
+hold the GIL of the process serving requests.
+
+Usage:
+    from nasirpy.concurrency import configure, cpu_bound
+
+    configure(max_threads=16, max_processes=4)
+
+    @app.get("/report/{year}")
+    @cpu_bound
+    def build_report(year: int):
+        ...
+"""
+import asyncio
+import contextvars
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+if TYPE_CHECKING:  # pragma: no cover
+    from concurrent.futures import ProcessPoolExecutor
+
+_max_threads: Optional[int] = None
+_max_processes: Optional[int] = None
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional["ProcessPoolExecutor"] = None
+
+
+def configure(max_threads: Optional[int] = None, max_processes: Optional[int] = None) -> None:
+    """
+    Set the size of the shared thread and process pools
+
+    Pools are created on first use; calling this later replaces them for
+    subsequent calls (running work finishes on the old pool).
+
+    Args:
+        max_threads: Threads for synchronous handlers and dependencies
+            (defaults to ``concurrent.futures`` sizing: min(32, cpu_count + 4))
+        max_processes: Processes for ``@cpu_bound`` functions (defaults to cpu_count)
+    """
+    global _max_threads, _max_processes, _thread_pool, _process_pool
+    if max_threads is not None:
+        _max_threads = max_threads
+        if _thread_pool is not None:
+            _thread_pool.shutdown(wait=False)
+            _thread_pool = None
+    if max_processes is not None:
+        _max_processes = max_processes
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False)
+            _process_pool = None
+
+
+def shutdown_executors(wait: bool = True) -> None:
+    """Shut down the shared pools (they are recreated on next use)"""
+    global _thread_pool, _process_pool
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=wait)
+        _thread_pool = None
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=wait)
+        _process_pool = None
+
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=_max_threads, thread_name_prefix="nasirpy")
+    return _thread_pool
+
+
+def _get_process_pool() -> "ProcessPoolExecutor":
+    global _process_pool
+    if _process_pool is None:
+        # Imported here: it pulls in multiprocessing, which most apps never use
+        from concurrent.futures import ProcessPoolExecutor
+        _process_pool = ProcessPoolExecutor(max_workers=_max_processes)
+    return _process_pool
+
+
+def cpu_bound(func: Callable) -> Callable:
+    """
+    Mark a synchronous function to run in the process pool
+
+    The function and its arguments must be picklable, so it should be a
+    module-level function taking plain values (not the Request).
+    """
+    func._nasirpy_cpu_bound = True
+    return func
+
+
+def is_cpu_bound(func: Callable) -> bool:
+    return getattr(func, "_nasirpy_cpu_bound", False)
+
+
+def is_async_callable(obj: Any) -> bool:
+    """Whether calling obj returns an awaitable (async function or object with async __call__)"""
+    while isinstance(obj, functools.partial):
+        obj = obj.func
+    if inspect.iscoroutinefunction(obj):
+        return True
+    call = getattr(obj, "__call__", None)
+    return inspect.iscoroutinefunction(call)
+
+
+async def run_in_threadpool(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking function in the thread pool, propagating context variables"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await loop.run_in_executor(_get_thread_pool(), call)
+
+
+async def run_in_process_pool(func: Callable, *args, **kwargs) -> Any:
+    """Run a picklable function in the process pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_process_pool(), functools.partial(func, *args, **kwargs))
+
+
+def sync_runner(func: Callable) -> Callable:
+    """Pick the pool a synchronous function runs in (process pool if ``@cpu_bound``)"""
+    return run_in_process_pool if is_cpu_bound(func) else run_in_threadpool
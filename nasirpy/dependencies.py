@@ -0,0 +1,326 @@
+"""
+Dependency injection for route handlers
+
+Handlers declare what they need as parameters instead of digging it out
+of the request (a parameter annotated with a dataclass or other model type
+receives the decoded body, see validation.py):
+
+    async def get_db():
+        async with pool.acquire() as conn:
+            yield conn
+
+    @app.get("/users/{user_id}")
+    async def get_user(user_id: int, db=Depends(get_db), verbose: bool = Query(False)):
+        ...
+
+Each handler's signature is inspected once, when the route is registered,
+into a DependencyPlan. At request time the plan just walks a short list of
+pre-classified parameters. Dependencies with ``scope="app"`` are created
+once at startup and shared by every request; request-scoped dependencies
+are cached for the duration of one request, and generator or async
+context manager dependencies are closed after the response is sent.
+"""
+import asyncio
+import inspect
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .background import BackgroundTasks
+from .concurrency import is_async_callable, sync_runner
+from .exceptions import BadRequestError
+from .request import Request, _parse_bool
+from .response import Response
+from .validation import get_decoder, is_model_type
+
+_EMPTY = inspect.Parameter.empty
+
+
+class Depends:
+    """
+    Declare a parameter resolved by calling another function
+
+    Args:
+        dependency: Function, async function, async generator function, or
+            callable returning an async context manager
+        scope: "request" to call it per request, "app" to create it once at startup
+        use_cache: Reuse the value if the same dependency is needed twice in one request
+    """
+
+    def __init__(self, dependency: Callable, scope: str = "request", use_cache: bool = True):
+        if scope not in ("request", "app"):
+            raise ValueError(f"Unknown dependency scope: {scope!r}")
+        self.dependency = dependency
+        self.scope = scope
+        self.use_cache = use_cache
+
+
+class Query:
+    """Declare a query string parameter, optionally under another name"""
+
+    def __init__(self, default: Any = _EMPTY, alias: Optional[str] = None):
+        self.default = default
+        self.alias = alias
+
+
+class Header:
+    """Declare a request header; ``user_agent`` reads the ``user-agent`` header"""
+
+    def __init__(self, default: Any = _EMPTY, alias: Optional[str] = None):
+        self.default = default
+        self.alias = alias
+
+
+class Body:
+    """Declare the parsed JSON request body"""
+
+    def __init__(self, default: Any = _EMPTY):
+        self.default = default
+
+
+# Parameter kinds in a compiled plan
+REQUEST, PATH_OR_QUERY, QUERY, HEADER, BODY, DEPENDENCY, BACKGROUND = range(7)
+
+# Unannotated parameters with these names receive the Request
+_REQUEST_NAMES = ("request", "req")
+
+_CONVERTERS: Dict[Any, Callable[[str], Any]] = {
+    int: int,
+    float: float,
+    str: str,
+    # Anything but a recognised boolean is a 400, as with QueryParams.get_bool
+    bool: _parse_bool,
+}
+
+
+class DependencyPlan:
+    """
+    Pre-classified parameters of a handler or dependency
+
+    Attributes:
+        call: The function the plan belongs to
+        params: ``(name, kind, source, default, converter)`` per parameter
+        request_only: True when the only parameter is the request, so it
+            can be called without building a kwargs dict
+    """
+
+    def __init__(self, call: Callable):
+        self.call = call
+        self.params: List[Tuple[str, int, Any, Any, Optional[Callable]]] = []
+        self.is_async_gen = inspect.isasyncgenfunction(call)
+        self.is_coroutine = is_async_callable(call)
+        # Plain functions run off the event loop; classes are just constructed
+        self.run_sync = None
+        if not (self.is_coroutine or self.is_async_gen or inspect.isclass(call)):
+            self.run_sync = sync_runner(call)
+
+        for name, param in inspect.signature(call).parameters.items():
+            if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+                continue
+            default = param.default
+            annotation = param.annotation
+            converter = _CONVERTERS.get(annotation)
+            if isinstance(default, Depends):
+                self.params.append((name, DEPENDENCY, default, _EMPTY, None))
+            elif isinstance(default, Query):
+                self.params.append((name, QUERY, default.alias or name, default.default, converter))
+            elif isinstance(default, Header):
+                alias = default.alias or name.replace("_", "-")
+                self.params.append((name, HEADER, alias.lower(), default.default, converter))
+            elif isinstance(default, Body) or is_model_type(annotation):
+                # Model-typed bodies get a decoder compiled now, at registration
+                decoder = get_decoder(annotation) if is_model_type(annotation) else None
+                body_default = default.default if isinstance(default, Body) else default
+                self.params.append((name, BODY, None, body_default, decoder))
+            elif annotation is BackgroundTasks:
+                self.params.append((name, BACKGROUND, None, _EMPTY, None))
+            elif annotation is Request or (name in _REQUEST_NAMES and annotation is _EMPTY):
+                self.params.append((name, REQUEST, None, _EMPTY, None))
+            else:
+                self.params.append((name, PATH_OR_QUERY, name, default, converter))
+
+        self.request_only = len(self.params) == 1 and self.params[0][1] == REQUEST
+
+    async def solve(self, request: Optional[Request], container: "DependencyContainer") -> Dict[str, Any]:
+        """Resolve every parameter into a kwargs dict"""
+        values = {}
+        for name, kind, source, default, converter in self.params:
+            if kind == DEPENDENCY:
+                values[name] = await container.resolve(source, request)
+                continue
+            if request is None:
+                raise TypeError(
+                    f"{self.call.__qualname__} is app-scoped and can only depend on app-scoped dependencies"
+                )
+            if kind == REQUEST:
+                values[name] = request
+                continue
+            if kind == BACKGROUND:
+                if request._background is None:
+                    request._background = BackgroundTasks()
+                values[name] = request._background
+                continue
+            if kind == BODY:
+                if converter is None:
+                    values[name] = await request.json()
+                else:
+                    if "application/json" not in request.content_type:
+                        raise BadRequestError("Content-Type must be application/json")
+                    values[name] = converter(await request.body())
+                continue
+
+            if kind == HEADER:
+                raw = request.headers.get(source)
+                where = "header"
+            elif kind == PATH_OR_QUERY and source in request.path_params:
+                raw = request.path_params[source]
+                where = "path parameter"
+            else:
+                raw = request.query_params.get(source)
+                where = "query parameter"
+
+            if raw is None:
+                if default is _EMPTY:
+                    raise BadRequestError(f"Missing required {where} '{source}'")
+                values[name] = default
+            elif converter is not None:
+                try:
+                    values[name] = converter(raw)
+                except ValueError:
+                    raise BadRequestError(f"Invalid value for {where} '{source}'")
+            else:
+                values[name] = raw
+        return values
+
+    async def invoke(self, kwargs: Dict[str, Any], exit_stack: AsyncExitStack) -> Any:
+        """
+        Call the function, entering generator and context manager results
+        on ``exit_stack`` so they are released when it closes
+        """
+        if self.is_async_gen:
+            return await exit_stack.enter_async_context(asynccontextmanager(self.call)(**kwargs))
+        if self.run_sync is not None:
+            result = await self.run_sync(self.call, **kwargs)
+        else:
+            result = self.call(**kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        if hasattr(result, "__aenter__") and hasattr(result, "__aexit__"):
+            return await exit_stack.enter_async_context(result)
+        return result
+
+    def iter_dependencies(self):
+        """Yield every Depends marker reachable from this plan"""
+        for _, kind, source, _, _ in self.params:
+            if kind == DEPENDENCY:
+                yield source
+                yield from get_plan(source.dependency).iter_dependencies()
+
+
+_plans: Dict[Callable, DependencyPlan] = {}
+
+
+def get_plan(call: Callable) -> DependencyPlan:
+    """Return the (cached) plan for a handler or dependency"""
+    plan = _plans.get(call)
+    if plan is None:
+        plan = _plans[call] = DependencyPlan(call)
+    return plan
+
+
+class DependencyContainer:
+    """
+    Holds app-scoped dependency values and resolves request-scoped ones
+
+    Request-scoped values are cached on the request itself and released by
+    ``close_request`` once the response has been sent.
+    """
+
+    def __init__(self):
+        self.values: Dict[Callable, Any] = {}
+        self._exit_stack = AsyncExitStack()
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def startup(self, plans: List[DependencyPlan]) -> None:
+        """Create every app-scoped dependency used by the given plans"""
+        for plan in plans:
+            for dependency in plan.iter_dependencies():
+                if dependency.scope == "app":
+                    await self.resolve(dependency, None)
+
+    async def shutdown(self) -> None:
+        """Release app-scoped resources in reverse creation order"""
+        await self._exit_stack.aclose()
+        self._exit_stack = AsyncExitStack()
+        self.values.clear()
+
+    async def resolve(self, dependency: Depends, request: Optional[Request]) -> Any:
+        call = dependency.dependency
+        if dependency.scope == "app":
+            if call in self.values:
+                return self.values[call]
+            # Created lazily when the app runs without lifespan; make sure
+            # concurrent first requests don't build two pools.
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if call not in self.values:
+                    plan = get_plan(call)
+                    kwargs = await plan.solve(None, self)
+                    self.values[call] = await plan.invoke(kwargs, self._exit_stack)
+            return self.values[call]
+
+        if request is None:
+            raise TypeError(
+                f"App-scoped dependencies cannot depend on request-scoped {call.__qualname__}"
+            )
+        cache = request._dependency_cache
+        if cache is None:
+            cache = request._dependency_cache = {}
+        elif dependency.use_cache and call in cache:
+            return cache[call]
+        if request._exit_stack is None:
+            request._exit_stack = AsyncExitStack()
+        plan = get_plan(call)
+        kwargs = await plan.solve(request, self)
+        value = await plan.invoke(kwargs, request._exit_stack)
+        if dependency.use_cache:
+            cache[call] = value
+        return value
+
+    @staticmethod
+    async def close_request(request: Request) -> None:
+        """Release request-scoped resources after the response was sent"""
+        if request._exit_stack is not None:
+            await request._exit_stack.aclose()
+
+
+def compile_endpoint(handler: Callable, container: DependencyContainer) -> Callable[[Request], Awaitable[Response]]:
+    """
+    Build the coroutine that resolves a handler's parameters and calls it
+
+    Synchronous handlers run in the thread pool (or the process pool when
+    marked ``@cpu_bound``). Return values that aren't a Response are
+    wrapped in one.
+    """
+    plan = get_plan(handler)
+
+    if plan.request_only and plan.is_coroutine:
+        async def endpoint(request: Request) -> Response:
+            result = await handler(request)
+            return result if isinstance(result, Response) else Response(result)
+        return endpoint
+
+    if plan.run_sync is not None:
+        run_sync = plan.run_sync
+
+        async def endpoint(request: Request) -> Response:
+            result = await run_sync(handler, **await plan.solve(request, container))
+            return result if isinstance(result, Response) else Response(result)
+        return endpoint
+
+    async def endpoint(request: Request) -> Response:
+        result = handler(**await plan.solve(request, container))
+        if inspect.isawaitable(result):
+            result = await result
+        return result if isinstance(result, Response) else Response(result)
+    return endpoint
@@ -1,21 +1,47 @@
+from typing import Dict, List, Optional
+
+# Detail used when an HTTPException is raised without one. App pre-serializes
+# the error body for each of these, so raising e.g. HTTPException(401) costs
+# no JSON encoding.
+DEFAULT_DETAILS: Dict[int, str] = {
+    400: "Bad Request",
+    401: "Unauthorized",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    416: "Range Not Satisfiable",
+    422: "Unprocessable Entity",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
 class HTTPException(Exception):
-    def __init__(self, status_code: int, detail: str = None):
+    def __init__(self, status_code: int, detail: str = None, headers: Optional[Dict[str, str]] = None):
         self.status_code = status_code
         self.detail = detail if detail is not None else self._get_default_detail(status_code)
+        self.headers = headers
 
     def _get_default_detail(self, status_code: int) -> str:
-        return {
-            404: "Not Found",
-            400: "Bad Request",
-            401: "Unauthorized",
-            403: "Forbidden",
-            500: "Internal Server Error"
-        }.get(status_code, "Unknown Error")
+        return DEFAULT_DETAILS.get(status_code, "Unknown Error")
 
 class NotFoundError(HTTPException):
     def __init__(self, detail: str = None):
         super().__init__(404, detail)
 
+class MethodNotAllowedError(HTTPException):
+    def __init__(self, allowed: List[str], detail: str = None):
+        super().__init__(405, detail, headers={"Allow": ", ".join(allowed)})
+        self.allowed = allowed
+
 class BadRequestError(HTTPException):
     def __init__(self, detail: str = None):
         super().__init__(400, detail)
+
+class RequestValidationError(HTTPException):
+    """The request body didn't match the declared model; ``errors`` lists each field problem"""
+    def __init__(self, errors: list, detail: str = "Validation failed"):
+        super().__init__(422, detail)
+        self.errors = errors
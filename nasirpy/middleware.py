@@ -1,10 +1,17 @@
 from typing import Callable, List, Optional, Union, Dict, Any
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import functools
+import os
+import re
 import time
 import logging
-from datetime import datetime
+from collections import OrderedDict
 from .request import Request
-from .response import Response
+from .response import EncodedHeaders, Response
+from .concurrency import is_async_callable
 
 
 class BaseMiddleware(ABC):
@@ -26,10 +33,28 @@ class BaseMiddleware(ABC):
 
 
 class MiddlewareManager:
-    """Manages the middleware chain and execution order"""
+    """
+    Manages the middleware chain and execution order
+
+    Synchronous middleware runs in a thread pool of its own, not the one
+    synchronous handlers use: while its ``call_next`` is waiting, the
+    thread stays blocked, and if that pool were shared the handlers
+    further down the chain could be left without threads. Consecutive
+    synchronous middleware share one thread per request. Requests are
+    admitted to the synchronous part of the chain only while there are
+    threads for every such run of it, so a full pool makes requests wait
+    on the event loop rather than deadlock.
+
+    Args:
+        max_threads: Threads for synchronous middleware (defaults to
+            ``concurrent.futures`` sizing: min(32, cpu_count + 4))
+    """
     
-    def __init__(self):
+    def __init__(self, max_threads: Optional[int] = None):
         self.middleware_stack: List[Union[BaseMiddleware, Callable]] = []
+        self.max_threads = max_threads or min(32, (os.cpu_count() or 1) + 4)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._admission: Optional[asyncio.Semaphore] = None
     
     def add_middleware(self, middleware: Union[BaseMiddleware, Callable]) -> None:
         """Add middleware to the stack"""
@@ -37,65 +62,175 @@ class MiddlewareManager:
     
     async def process_request(self, request: Request, handler: Callable) -> Response:
         """Process request through middleware chain"""
-        if not self.middleware_stack:
-            return await handler(request)
-        
-        # Create the middleware chain
-        async def create_chain(index: int = 0):
-            if index >= len(self.middleware_stack):
-                # Reached the end, call the actual handler
-                return await handler(request)
-            
-            middleware = self.middleware_stack[index]
-            
-            async def call_next(req: Request = None):
-                return await create_chain(index + 1)
-            
-            # Call middleware
-            if isinstance(middleware, BaseMiddleware):
-                return await middleware(request, call_next)
+        return await self.build_chain(handler)(request)
+
+    def build_chain(self, handler: Callable) -> Callable:
+        """
+        Compose the middleware stack around a handler
+
+        The returned coroutine function takes a request and runs it through
+        every middleware in order before calling the handler. Building the
+        chain once per handler (as App does at startup) avoids recreating
+        the nested closures on every request.
+
+        Args:
+            handler: Final request handler
+
+        Returns:
+            Coroutine function ``chain(request) -> Response``
+        """
+        # Group consecutive synchronous middleware so each group takes one thread
+        groups: List[Union[Callable, List[Callable]]] = []
+        for middleware in self.middleware_stack:
+            if is_async_callable(middleware):
+                groups.append(middleware)
+            elif groups and isinstance(groups[-1], list):
+                groups[-1].append(middleware)
             else:
-                # Function-based middleware
-                return await middleware(request, call_next)
-        
-        return await create_chain()
+                groups.append([middleware])
+        sync_groups = [group for group in groups if isinstance(group, list)]
+
+        chain = handler
+        for group in reversed(groups):
+            if isinstance(group, list):
+                # Only the outermost group waits for admission; the inner
+                # ones run on threads reserved for the request by it
+                chain = self._sync_link(group, chain, admit=group is sync_groups[0], threads=len(sync_groups))
+            else:
+                chain = self._link(group, chain)
+        return chain
+
+    @staticmethod
+    def _link(middleware: Union[BaseMiddleware, Callable], next_link: Callable) -> Callable:
+        async def link(request: Request) -> Response:
+            async def call_next(req: Request = None):
+                return await next_link(request)
+            return await middleware(request, call_next)
+        return link
+
+    def _sync_link(self, group: List[Callable], next_link: Callable, admit: bool, threads: int) -> Callable:
+        def run(request: Request, loop: asyncio.AbstractEventLoop, index: int = 0) -> Response:
+            if index == len(group):
+                # The rest of the chain goes back to the event loop; this
+                # thread waits for it
+                return asyncio.run_coroutine_threadsafe(next_link(request), loop).result()
+
+            def call_next(req: Request = None):
+                return run(request, loop, index + 1)
+
+            return group[index](request, call_next)
+
+        async def sync_link(request: Request) -> Response:
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            call = functools.partial(context.run, run, request, loop)
+            if not admit:
+                return await loop.run_in_executor(self._get_executor(threads), call)
+            async with self._get_admission(threads):
+                return await loop.run_in_executor(self._get_executor(threads), call)
+        return sync_link
+
+    def _get_executor(self, threads: int) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(self.max_threads, threads), thread_name_prefix="nasirpy-middleware"
+            )
+        return self._executor
+
+    def _get_admission(self, threads: int) -> asyncio.Semaphore:
+        # Each admitted request can hold one thread per synchronous group
+        if self._admission is None:
+            self._admission = asyncio.Semaphore(max(1, self.max_threads // threads))
+        return self._admission
 
 
 # Built-in Middleware Classes
 
 class CORSMiddleware(BaseMiddleware):
-    """CORS (Cross-Origin Resource Sharing) middleware"""
+    """
+    CORS (Cross-Origin Resource Sharing) middleware
+
+    Exact origins are kept in a set. Entries with a ``*`` wildcard (such as
+    ``"https://*.example.com"``) and ``allow_origin_regex`` are compiled
+    into one regular expression. The headers for each origin are built and
+    encoded once, then kept in a bounded LRU cache, so a repeat origin
+    costs one dict lookup. Preflight requests are answered here without
+    calling the rest of the chain.
+    """
     
     def __init__(
         self,
         allow_origins: List[str] = ["*"],
         allow_methods: List[str] = ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
         allow_headers: List[str] = ["*"],
-        max_age: int = 86400
+        max_age: int = 86400,
+        allow_origin_regex: Optional[str] = None,
+        cache_size: int = 1024,
     ):
         self.allow_origins = allow_origins
         self.allow_methods = allow_methods
         self.allow_headers = allow_headers
         self.max_age = max_age
+        self.allow_all = "*" in allow_origins
+        self.origins = {origin for origin in allow_origins if "*" not in origin}
+        patterns = [
+            re.escape(origin).replace(r"\*", r"[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*")
+            for origin in allow_origins
+            if "*" in origin and origin != "*"
+        ]
+        if allow_origin_regex:
+            patterns.append(allow_origin_regex)
+        self.origin_regex = re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+        # Constant for every response, so joined and encoded once
+        self.static_headers = {
+            "Access-Control-Allow-Methods": ", ".join(allow_methods),
+            "Access-Control-Allow-Headers": ", ".join(allow_headers),
+            "Access-Control-Max-Age": str(max_age),
+        }
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Optional[str], EncodedHeaders]" = OrderedDict()
     
-    async def __call__(self, request: Request, call_next: Callable) -> Response:
-        # Handle preflight requests
-        if request.method == "OPTIONS":
-            response = Response({}, status_code=200)
+    def is_allowed_origin(self, origin: str) -> bool:
+        if self.allow_all or origin in self.origins:
+            return True
+        return self.origin_regex is not None and self.origin_regex.fullmatch(origin) is not None
+
+    def headers_for(self, origin: Optional[str]) -> EncodedHeaders:
+        """The (cached) CORS headers for a request from origin"""
+        headers = self._cache.get(origin)
+        if headers is not None:
+            self._cache.move_to_end(origin)
+            return headers
+
+        values = dict(self.static_headers)
+        if self.allow_all:
+            values["Access-Control-Allow-Origin"] = "*"
         else:
-            response = await call_next(request)
-        
-        # Add CORS headers
+            if origin and self.is_allowed_origin(origin):
+                values["Access-Control-Allow-Origin"] = origin
+            # Allowed or not, the answer depends on the Origin header, so
+            # caches must key on it
+            values["Vary"] = "Origin"
+        headers = self._cache[origin] = EncodedHeaders(values)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return headers
+
+    async def __call__(self, request: Request, call_next: Callable) -> Response:
         origin = request.headers.get("origin")
-        if origin and (self.allow_origins == ["*"] or origin in self.allow_origins):
-            response.headers["Access-Control-Allow-Origin"] = origin
-        elif self.allow_origins == ["*"]:
-            response.headers["Access-Control-Allow-Origin"] = "*"
-        
-        response.headers["Access-Control-Allow-Methods"] = ", ".join(self.allow_methods)
-        response.headers["Access-Control-Allow-Headers"] = ", ".join(self.allow_headers)
-        response.headers["Access-Control-Max-Age"] = str(self.max_age)
-        
+        headers = self.headers_for(origin)
+
+        # Preflight requests are answered without running the handler. The
+        # allowed methods and headers are fixed lists rather than echoes of
+        # the request, so the cached per-origin block is the whole answer.
+        if request.method == "OPTIONS" and "access-control-request-method" in request.headers:
+            return Response.from_encoded(b"", headers=headers)
+
+        response = await call_next(request)
+        vary = response.headers.get("vary")
+        response.headers.update_encoded(headers)
+        if vary and "vary" in headers.encoded and "origin" not in vary.lower():
+            response.headers["Vary"] = f"{vary}, Origin"
         return response
 
 
@@ -163,13 +298,13 @@ class SecurityHeadersMiddleware(BaseMiddleware):
         }
         if custom_headers:
             self.security_headers.update(custom_headers)
+        self.encoded_headers = EncodedHeaders(self.security_headers)
     
     async def __call__(self, request: Request, call_next: Callable) -> Response:
         response = await call_next(request)
         
         # Add security headers
-        for header, value in self.security_headers.items():
-            response.headers[header] = value
+        response.headers.update_encoded(self.encoded_headers)
         
         return response
 
@@ -181,6 +316,7 @@ class RateLimitMiddleware(BaseMiddleware):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
         self.clients: Dict[str, List[float]] = {}
+        self.limit_header = EncodedHeaders({"X-RateLimit-Limit": str(max_requests)})
     
     def _get_client_ip(self, request: Request) -> str:
         """Extract client IP from request"""
@@ -194,8 +330,9 @@ class RateLimitMiddleware(BaseMiddleware):
             return real_ip
         
         # Fallback to scope client if available
-        if hasattr(request, '_scope') and 'client' in request._scope:
-            return request._scope['client'][0]
+        client = request.client
+        if client:
+            return client[0]
         
         return "unknown"
     
@@ -227,7 +364,7 @@ class RateLimitMiddleware(BaseMiddleware):
         
         # Add rate limit headers
         remaining = max(0, self.max_requests - len(self.clients[client_ip]))
-        response.headers["X-RateLimit-Limit"] = str(self.max_requests)
+        response.headers.update_encoded(self.limit_header)
         response.headers["X-RateLimit-Remaining"] = str(remaining)
         response.headers["X-RateLimit-Reset"] = str(int(current_time + self.window_seconds))
         
@@ -0,0 +1,307 @@
+"""
+Streaming multipart/form-data parsing
+
+The body is fed to MultipartParser chunk by chunk as it arrives from the
+ASGI ``receive`` stream, so the full request is never held in memory.
+Ordinary fields are collected as strings; file parts are written to an
+UploadFile backed by a SpooledTemporaryFile, which stays in memory until
+it grows past ``spool_max_size`` and then moves to a temporary file on disk.
+
+Usage:
+    @app.post("/avatar")
+    async def upload(request):
+        form = await request.form()
+        avatar = form["avatar"][0]
+        data = await avatar.read()
+"""
+import re
+from tempfile import SpooledTemporaryFile
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .concurrency import run_in_threadpool
+from .exceptions import BadRequestError, HTTPException
+
+MAX_PARTS = 1000
+MAX_FIELD_SIZE = 1024 * 1024
+MAX_FILE_SIZE = 100 * 1024 * 1024
+MAX_SIZE = 100 * 1024 * 1024
+MAX_HEADER_SIZE = 16 * 1024
+SPOOL_MAX_SIZE = 1024 * 1024
+
+_PARAM = re.compile(r';\s*([\w*-]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^;]*)')
+
+# Parser states
+_PREAMBLE, _AFTER_BOUNDARY, _HEADERS, _DATA, _DONE = range(5)
+
+
+def parse_options_header(value: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Split a header like ``form-data; name="a"`` into its value and parameters
+
+    Returns:
+        The lowercased main value and a dict of lowercased parameter names
+        to unquoted values
+    """
+    main, _, rest = value.partition(";")
+    params = {}
+    for match in _PARAM.finditer(";" + rest):
+        key, param = match.group(1).lower(), match.group(2).strip()
+        if param[:1] == '"' and param[-1:] == '"':
+            param = param[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+        params[key] = param
+    return main.strip().lower(), params
+
+
+class UploadFile:
+    """
+    A file part of a multipart request
+
+    Attributes:
+        filename: Name sent by the client (not sanitised; don't use it as a path)
+        content_type: Content-Type of the part
+        headers: All part headers, lowercased names
+        file: The underlying SpooledTemporaryFile
+        size: Bytes written so far
+    """
+
+    def __init__(self, filename: str, content_type: str = "application/octet-stream",
+                 headers: Optional[Dict[str, str]] = None, spool_max_size: int = SPOOL_MAX_SIZE):
+        self.filename = filename
+        self.content_type = content_type
+        self.headers = headers or {}
+        self.file = SpooledTemporaryFile(max_size=spool_max_size)
+        self.size = 0
+
+    @property
+    def in_memory(self) -> bool:
+        """False once the file has been rolled over to disk"""
+        return not getattr(self.file, "_rolled", True)
+
+    async def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.in_memory:
+            self.file.write(data)
+        else:
+            await run_in_threadpool(self.file.write, data)
+
+    async def read(self, size: int = -1) -> bytes:
+        if self.in_memory:
+            return self.file.read(size)
+        return await run_in_threadpool(self.file.read, size)
+
+    async def seek(self, offset: int) -> None:
+        if self.in_memory:
+            self.file.seek(offset)
+        else:
+            await run_in_threadpool(self.file.seek, offset)
+
+    async def close(self) -> None:
+        if self.in_memory:
+            self.file.close()
+        else:
+            await run_in_threadpool(self.file.close)
+
+    def __repr__(self) -> str:
+        return f"UploadFile(filename={self.filename!r}, size={self.size})"
+
+
+class MultipartParser:
+    """
+    Incremental multipart/form-data parser
+
+    Like the HTTP parser in server.py it keeps one reusable buffer and calls
+    back into its handler as parts are found:
+
+        handler.on_part_begin(headers)   # dict of lowercased part headers
+        handler.on_part_data(chunk)      # zero or more times
+        handler.on_part_end()
+
+    Bytes that might be the start of the next boundary are held back, so
+    the buffer never grows beyond one chunk plus the boundary length
+    (or ``max_header_size`` while reading part headers).
+    """
+
+    def __init__(self, boundary: bytes, handler: Any, max_header_size: int = MAX_HEADER_SIZE):
+        self.delimiter = b"\r\n--" + boundary
+        self.handler = handler
+        self.max_header_size = max_header_size
+        # The first boundary has no preceding CRLF; pretend it has one
+        self.buffer = bytearray(b"\r\n")
+        self.state = _PREAMBLE
+
+    def feed_data(self, data: bytes) -> None:
+        buffer = self.buffer
+        buffer += data
+        delimiter = self.delimiter
+        pos = 0
+
+        while True:
+            state = self.state
+            if state == _DATA:
+                index = buffer.find(delimiter, pos)
+                if index < 0:
+                    safe = len(buffer) - len(delimiter) + 1
+                    if safe > pos:
+                        self.handler.on_part_data(bytes(buffer[pos:safe]))
+                        pos = safe
+                    break
+                if index > pos:
+                    self.handler.on_part_data(bytes(buffer[pos:index]))
+                self.handler.on_part_end()
+                pos = index + len(delimiter)
+                self.state = _AFTER_BOUNDARY
+
+            elif state == _HEADERS:
+                index = buffer.find(b"\r\n\r\n", pos)
+                if index < 0:
+                    if len(buffer) - pos > self.max_header_size:
+                        raise BadRequestError("Multipart part headers too large")
+                    break
+                headers = {}
+                for line in bytes(buffer[pos:index]).decode("utf-8", "replace").split("\r\n"):
+                    name, sep, value = line.partition(":")
+                    if not sep:
+                        raise BadRequestError("Invalid multipart part header")
+                    headers[name.strip().lower()] = value.strip()
+                self.handler.on_part_begin(headers)
+                pos = index + 4
+                self.state = _DATA
+
+            elif state == _AFTER_BOUNDARY:
+                if len(buffer) - pos < 2:
+                    break
+                marker = bytes(buffer[pos:pos + 2])
+                if marker == b"--":
+                    self.state = _DONE
+                    continue
+                if marker != b"\r\n":
+                    raise BadRequestError("Invalid multipart boundary")
+                pos += 2
+                self.state = _HEADERS
+
+            elif state == _PREAMBLE:
+                index = buffer.find(delimiter, pos)
+                if index < 0:
+                    pos = max(pos, len(buffer) - len(delimiter) + 1)
+                    break
+                pos = index + len(delimiter)
+                self.state = _AFTER_BOUNDARY
+
+            else:
+                # Epilogue after the closing boundary is ignored
+                pos = len(buffer)
+                break
+
+        del buffer[:pos]
+
+    def finish(self) -> None:
+        """Check that the closing boundary was seen"""
+        if self.state != _DONE:
+            raise BadRequestError("Incomplete multipart body")
+
+
+class _FormCollector:
+    """Turns parser callbacks into a list of events for parse_multipart"""
+
+    def __init__(self):
+        self.events: List[Tuple[str, Any]] = []
+
+    def on_part_begin(self, headers: Dict[str, str]) -> None:
+        self.events.append(("begin", headers))
+
+    def on_part_data(self, chunk: bytes) -> None:
+        self.events.append(("data", chunk))
+
+    def on_part_end(self) -> None:
+        self.events.append(("end", None))
+
+
+async def parse_multipart(
+    stream: AsyncIterator[bytes],
+    boundary: bytes,
+    max_parts: int = MAX_PARTS,
+    max_field_size: int = MAX_FIELD_SIZE,
+    max_file_size: int = MAX_FILE_SIZE,
+    max_size: int = MAX_SIZE,
+    spool_max_size: int = SPOOL_MAX_SIZE,
+) -> Dict[str, List[Any]]:
+    """
+    Parse a multipart/form-data body from a stream of chunks
+
+    Args:
+        stream: Async iterator of body chunks (``request.stream()``)
+        boundary: Boundary from the Content-Type header
+        max_parts: Maximum number of parts
+        max_field_size: Maximum size of a non-file field, held in memory
+        max_file_size: Maximum size of a single uploaded file
+        max_size: Maximum total size of the body
+        spool_max_size: File bytes kept in memory before spilling to disk
+
+    Returns:
+        Dict mapping field names to lists of values, like ``parse_qs``.
+        Fields are strings; file parts are UploadFile objects.
+
+    Raises:
+        BadRequestError: Malformed body or too many parts
+        HTTPException: 413 when a size limit is exceeded
+    """
+    collector = _FormCollector()
+    parser = MultipartParser(boundary, collector)
+    form: Dict[str, List[Any]] = {}
+    files: List[UploadFile] = []
+    parts = 0
+    total = 0
+    name: Optional[str] = None
+    current: Any = None
+
+    try:
+        async for chunk in stream:
+            total += len(chunk)
+            if total > max_size:
+                raise HTTPException(413, "Request body too large")
+            parser.feed_data(chunk)
+
+            for event, value in collector.events:
+                if event == "data":
+                    if isinstance(current, UploadFile):
+                        if current.size + len(value) > max_file_size:
+                            raise HTTPException(413, f"File '{current.filename}' too large")
+                        await current.write(value)
+                    else:
+                        if len(current) + len(value) > max_field_size:
+                            raise HTTPException(413, f"Form field '{name}' too large")
+                        current += value
+                elif event == "begin":
+                    parts += 1
+                    if parts > max_parts:
+                        raise BadRequestError("Too many multipart parts")
+                    disposition, params = parse_options_header(value.get("content-disposition", ""))
+                    if disposition != "form-data" or "name" not in params:
+                        raise BadRequestError("Invalid multipart Content-Disposition")
+                    name = params["name"]
+                    if "filename" in params:
+                        current = UploadFile(
+                            params["filename"],
+                            value.get("content-type", "application/octet-stream"),
+                            value,
+                            spool_max_size,
+                        )
+                        files.append(current)
+                    else:
+                        current = bytearray()
+                else:
+                    if isinstance(current, UploadFile):
+                        await current.seek(0)
+                        form.setdefault(name, []).append(current)
+                    else:
+                        form.setdefault(name, []).append(current.decode("utf-8", "replace"))
+                    current = None
+            collector.events.clear()
+
+        parser.finish()
+    except BaseException:
+        for upload in files:
+            await upload.close()
+        raise
+
+    return form
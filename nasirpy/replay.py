@@ -0,0 +1,315 @@
+"""
+Traffic recording and replay
+
+RecordingMiddleware writes a sample of real requests to an append-only
+file, one compact JSON object per line: arrival time, method, path, query
+string, headers, body, the matched route, status and handler time.
+
+    recorder = RecordingMiddleware("traffic.jsonl", sample_rate=0.05)
+    app.add_middleware(recorder)
+    app.on_shutdown(recorder.flush)
+
+``replay`` feeds a recording back into an app in-process (through
+TestClient) and returns per-route latencies. With ``speed`` the original
+arrival times are kept, scaled (``speed=10`` replays ten times faster);
+with ``speed=None`` requests are sent as fast as ``concurrency`` allows.
+Replaying the same recording against two versions of the code and passing
+both reports to ``compare`` shows the latency change per route:
+
+    before = await replay(old_app, "traffic.jsonl", speed=10)
+    after = await replay(new_app, "traffic.jsonl", speed=10)
+    print(format_comparison(compare(before, after)))
+
+Reports can be saved with ``ReplayReport.save`` and read back with
+``ReplayReport.load``, so the two runs can happen in different checkouts.
+``benchmarks/replay.py`` wraps all of this for the command line.
+
+Like all middleware, the recorder sees only requests that matched a route.
+Credentials (``authorization``, ``cookie`` and ``proxy-authorization`` by
+default) are not written, and requests with bodies over ``max_body`` bytes
+are skipped.
+"""
+import asyncio
+import base64
+import json
+import random
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from .concurrency import run_in_threadpool
+from .middleware import BaseMiddleware
+from .request import Request
+from .response import Response
+from .testclient import LoadReport, TestClient
+
+REDACTED_HEADERS = ("authorization", "cookie", "proxy-authorization")
+
+
+class RecordingMiddleware(BaseMiddleware):
+    """
+    Record a sample of requests to an append-only file
+
+    Args:
+        path: File to append to
+        sample_rate: Fraction of requests recorded (0 to 1)
+        max_body: Largest request body recorded; larger requests are skipped
+        redact_headers: Header names that are never written
+        buffer_size: Records kept in memory before being written out
+        seed: Seed for sampling, for repeatable recordings
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sample_rate: float = 1.0,
+        max_body: int = 64 * 1024,
+        redact_headers: Iterable[str] = REDACTED_HEADERS,
+        buffer_size: int = 100,
+        seed: Optional[int] = None,
+    ):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_body = max_body
+        self.redact_headers = {name.lower().encode("latin-1") for name in redact_headers}
+        self.buffer_size = buffer_size
+        self.recorded = 0
+        self.skipped = 0
+        self._random = random.Random(seed)
+        self._buffer: List[str] = []
+        self._writes: Set[asyncio.Future] = set()
+        self._started = time.monotonic()
+
+    async def __call__(self, request: Request, call_next: Callable) -> Response:
+        if self.sample_rate < 1.0 and self._random.random() >= self.sample_rate:
+            return await call_next(request)
+        length = request.headers.get("content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_body:
+            self.skipped += 1
+            return await call_next(request)
+
+        arrived = time.monotonic()
+        # Read (and cache) the body now; the handler gets it from the cache
+        body = await request.body()
+        status = None
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            if len(body) > self.max_body:
+                self.skipped += 1
+            else:
+                self._append(request, body, arrived, status)
+
+    def _append(self, request: Request, body: bytes, arrived: float, status: Optional[int]) -> None:
+        scope = request.scope
+        path = scope.get("root_path", "") + request.path
+        record = {
+            "t": round(arrived - self._started, 6),
+            "m": request.method,
+            "p": path,
+            "q": scope.get("query_string", b"").decode("latin-1"),
+            "h": [
+                [k.decode("latin-1"), v.decode("latin-1")]
+                for k, v in scope["headers"]
+                if k.lower() not in self.redact_headers
+            ],
+            # Set by App when the route matched
+            "r": scope.get("root_path", "") + scope.get("route", request.path),
+            "s": status,
+            "d": round(time.monotonic() - arrived, 6),
+        }
+        if body:
+            record["b"] = base64.b64encode(body).decode("ascii")
+        self._buffer.append(json.dumps(record, separators=(",", ":")))
+        self.recorded += 1
+        if len(self._buffer) >= self.buffer_size:
+            lines, self._buffer = self._buffer, []
+            # Writing can block on disk, so it happens off the event loop
+            write = asyncio.ensure_future(run_in_threadpool(self._write, lines))
+            self._writes.add(write)
+            write.add_done_callback(self._writes.discard)
+
+    async def flush(self) -> None:
+        """Write out buffered records and wait for pending writes (call on shutdown)"""
+        lines, self._buffer = self._buffer, []
+        if lines:
+            await run_in_threadpool(self._write, lines)
+        if self._writes:
+            await asyncio.gather(*self._writes)
+
+    def _write(self, lines: List[str]) -> None:
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+
+def load_recording(path: str) -> List[Dict[str, Any]]:
+    """Read a recording, ordered by arrival time"""
+    with open(path, encoding="utf-8") as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    # Buffers are written from worker threads, so lines may be slightly out of order
+    records.sort(key=lambda record: record["t"])
+    return records
+
+
+class ReplayReport:
+    """
+    Latencies from a replay, per route
+
+    Attributes:
+        routes: A LoadReport per ``"METHOD /route"``
+        wall_time: Seconds the replay took
+    """
+
+    def __init__(self):
+        self.routes: Dict[str, LoadReport] = {}
+        self.wall_time = 0.0
+
+    def route(self, key: str) -> LoadReport:
+        report = self.routes.get(key)
+        if report is None:
+            report = self.routes[key] = LoadReport()
+        return report
+
+    @property
+    def total(self) -> int:
+        return sum(report.total for report in self.routes.values())
+
+    def save(self, path: str) -> None:
+        data = {
+            "wall_time": self.wall_time,
+            "routes": {
+                key: {
+                    "latencies": report.latencies,
+                    "status_counts": report.status_counts,
+                    "exceptions": report.exceptions,
+                }
+                for key, report in self.routes.items()
+            },
+        }
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+
+    @classmethod
+    def load(cls, path: str) -> "ReplayReport":
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        report = cls()
+        report.wall_time = data["wall_time"]
+        for key, values in data["routes"].items():
+            route = report.route(key)
+            route.latencies = values["latencies"]
+            route.status_counts = {int(status): count for status, count in values["status_counts"].items()}
+            route.exceptions = values["exceptions"]
+            route.wall_time = report.wall_time
+        return report
+
+
+async def replay(
+    app: Callable,
+    recording: str,
+    speed: Optional[float] = 1.0,
+    concurrency: int = 50,
+    lifespan: bool = True,
+) -> ReplayReport:
+    """
+    Send recorded requests to an app and measure them per route
+
+    Args:
+        app: The ASGI application
+        recording: File written by RecordingMiddleware
+        speed: Pacing relative to the recording (2.0 is twice as fast);
+            None sends requests as fast as concurrency allows
+        concurrency: Requests in flight at once when speed is None
+        lifespan: Run the app's startup and shutdown around the replay
+
+    Returns:
+        A ReplayReport
+    """
+    records = load_recording(recording)
+    client = TestClient(app)
+    report = ReplayReport()
+
+    async def send(record: Dict[str, Any]) -> None:
+        latency = report.route(f"{record['m']} {record['r']}")
+        body = base64.b64decode(record["b"]) if "b" in record else None
+        start = time.perf_counter()
+        try:
+            response = await client.request(
+                record["m"], record["p"], query=record["q"] or None, headers=dict(record["h"]), body=body
+            )
+        except Exception as exc:
+            latency.record(time.perf_counter() - start, None, exc)
+        else:
+            latency.record(time.perf_counter() - start, response.status_code, None)
+
+    if lifespan:
+        await client.startup()
+    start = time.perf_counter()
+    try:
+        if speed is None:
+            queue = iter(records)
+
+            async def worker() -> None:
+                for record in queue:
+                    await send(record)
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        else:
+            # Open loop: each request starts at its (scaled) recorded time,
+            # however long the earlier ones take
+            origin = records[0]["t"] if records else 0.0
+            tasks = []
+            for record in records:
+                delay = (record["t"] - origin) / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.ensure_future(send(record)))
+            await asyncio.gather(*tasks)
+    finally:
+        report.wall_time = time.perf_counter() - start
+        for route in report.routes.values():
+            route.wall_time = report.wall_time
+        if lifespan:
+            await client.shutdown()
+    return report
+
+
+def compare(baseline: ReplayReport, candidate: ReplayReport) -> List[Dict[str, Any]]:
+    """
+    Per-route latency change between two replays of the same recording
+
+    Returns:
+        One row per route, slowest regression first, with p50 and p99 in
+        milliseconds for each run, their relative change, and error rates
+    """
+    rows = []
+    for key in sorted(set(baseline.routes) | set(candidate.routes)):
+        before = baseline.routes.get(key) or LoadReport()
+        after = candidate.routes.get(key) or LoadReport()
+        row: Dict[str, Any] = {"route": key, "count": (before.total, after.total)}
+        for p in (50, 99):
+            old, new = before.percentile(p) * 1000, after.percentile(p) * 1000
+            row[f"p{p}"] = (old, new)
+            row[f"p{p}_change"] = (new - old) / old if old else None
+        row["error_rate"] = (before.error_rate, after.error_rate)
+        rows.append(row)
+    rows.sort(key=lambda row: row["p50_change"] if row["p50_change"] is not None else 0.0, reverse=True)
+    return rows
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    """Render ``compare`` rows as a text table"""
+    def change(value: Optional[float]) -> str:
+        return "n/a" if value is None else f"{value:+.1%}"
+
+    width = max([len(row["route"]) for row in rows] + [5])
+    lines = [f"{'route':<{width}}  {'count':>11}  {'p50 ms':>17}  {'change':>8}  {'p99 ms':>17}  {'change':>8}  {'errors':>13}"]
+    for row in rows:
+        lines.append(
+            f"{row['route']:<{width}}  {'%d/%d' % row['count']:>11}"
+            f"  {'%.2f -> %.2f' % row['p50']:>17}  {change(row['p50_change']):>8}"
+            f"  {'%.2f -> %.2f' % row['p99']:>17}  {change(row['p99_change']):>8}"
+            f"  {'%.1f%% -> %.1f%%' % (row['error_rate'][0] * 100, row['error_rate'][1] * 100):>13}"
+        )
+    return "\n".join(lines)
@@ -1,16 +1,216 @@
-from typing import Any, Dict, Optional, Union
-from urllib.parse import parse_qs
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from collections.abc import Mapping
+from contextlib import AsyncExitStack
+import asyncio
+from urllib.parse import parse_qs, unquote_to_bytes
 import json
 from .exceptions import BadRequestError
 
+
+class Headers(Mapping):
+    """
+    Read-only, case-insensitive view over the raw ASGI header list
+
+    Nothing is decoded up front: a lookup scans the ``(bytes, bytes)``
+    pairs and decodes only the matching value, which is cheaper than
+    building a dict for requests that read one or two headers.
+    """
+
+    __slots__ = ("raw",)
+
+    def __init__(self, raw: List[Tuple[bytes, bytes]]):
+        self.raw = raw
+
+    def __getitem__(self, key: str) -> str:
+        name = key.lower().encode("latin-1")
+        for k, v in self.raw:
+            if k == name:
+                return v.decode("latin-1")
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        name = key.lower().encode("latin-1")
+        for k, v in self.raw:
+            if k == name:
+                return v.decode("latin-1")
+        return default
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str):
+            return False
+        name = key.lower().encode("latin-1")
+        for k, _ in self.raw:
+            if k == name:
+                return True
+        return False
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def keys(self) -> List[str]:
+        return [k.decode("latin-1") for k, _ in self.raw]
+
+    def items(self) -> List[Tuple[str, str]]:
+        return [(k.decode("latin-1"), v.decode("latin-1")) for k, v in self.raw]
+
+    def getlist(self, key: str) -> List[str]:
+        """All values of a repeated header"""
+        name = key.lower().encode("latin-1")
+        return [v.decode("latin-1") for k, v in self.raw if k == name]
+
+    def __repr__(self) -> str:
+        return f"Headers({self.items()!r})"
+
+
+def _unquote_plus(raw: bytes) -> str:
+    if b"%" in raw or b"+" in raw:
+        raw = unquote_to_bytes(raw.replace(b"+", b" "))
+    return raw.decode("utf-8", "replace")
+
+
+class QueryParams(Mapping):
+    """
+    Immutable multi-value view of a query string
+
+    The raw bytes are parsed once. Mapping access returns the first value
+    for a key; ``getlist`` returns all of them. Blank values are kept
+    (``?flag=`` gives ``""``).
+
+    Parsing is bounded so hostile URLs can't make it arbitrarily expensive:
+    query strings longer than ``max_length`` bytes or with more than
+    ``max_params`` parameters are rejected with 400 Bad Request.
+    """
+
+    __slots__ = ("_list", "_first")
+
+    max_length = 65536
+    max_params = 1000
+
+    def __init__(self, query_string: bytes = b""):
+        if len(query_string) > self.max_length:
+            raise BadRequestError("Query string too long")
+        if query_string.count(b"&") >= self.max_params:
+            raise BadRequestError("Too many query parameters")
+
+        self._list: List[Tuple[str, str]] = []
+        self._first: Dict[str, str] = {}
+        for part in query_string.split(b"&"):
+            if not part:
+                continue
+            key, _, value = part.partition(b"=")
+            key = _unquote_plus(key)
+            value = _unquote_plus(value)
+            self._list.append((key, value))
+            if key not in self._first:
+                self._first[key] = value
+
+    def __getitem__(self, key: str) -> str:
+        return self._first[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._first
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._first)
+
+    def __len__(self) -> int:
+        return len(self._first)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._first.get(key, default)
+
+    def getlist(self, key: str) -> List[str]:
+        """All values given for key, in order"""
+        return [v for k, v in self._list if k == key]
+
+    def multi_items(self) -> List[Tuple[str, str]]:
+        """Every (key, value) pair, including repeats"""
+        return list(self._list)
+
+    def get_int(self, key: str, default: Optional[int] = None) -> Optional[int]:
+        """First value as an int; 400 Bad Request if it isn't one"""
+        return self._typed(key, default, int, "an integer")
+
+    def get_float(self, key: str, default: Optional[float] = None) -> Optional[float]:
+        """First value as a float; 400 Bad Request if it isn't one"""
+        return self._typed(key, default, float, "a number")
+
+    def get_bool(self, key: str, default: Optional[bool] = None) -> Optional[bool]:
+        """First value as a bool ("1", "true", "yes", "on" / "0", "false", "no", "off", "")"""
+        return self._typed(key, default, _parse_bool, "a boolean")
+
+    def _typed(self, key: str, default: Any, convert: Callable, description: str) -> Any:
+        value = self._first.get(key)
+        if value is None:
+            return default
+        try:
+            return convert(value)
+        except ValueError:
+            raise BadRequestError(f"Query parameter '{key}' must be {description}")
+
+    def __repr__(self) -> str:
+        return f"QueryParams({self._list!r})"
+
+
+def _parse_bool(value: str) -> bool:
+    value = value.lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off", ""):
+        return False
+    raise ValueError(value)
+
+
 class Request:
+    """
+    Incoming HTTP request
+
+    Values derived from the ASGI scope (the headers view, query parameters)
+    are built on first access and cached; method, path and client are plain
+    scope lookups. ``__slots__`` keeps each instance free of a ``__dict__``,
+    so per-request data set by middleware goes in ``request.state``.
+    """
+
+    __slots__ = (
+        "scope",
+        "receive",
+        "path_params",
+        "_body",
+        "_stream_consumed",
+        "_json",
+        "_form",
+        "_headers",
+        "_query_params",
+        "_dependency_cache",
+        "_exit_stack",
+        "_background",
+        "_disconnected",
+        "_receive_task",
+        "_state",
+    )
+
     def __init__(self, scope: dict, receive: Any):
         self.scope = scope
         self.receive = receive
         self._body: Optional[bytes] = None
+        self._stream_consumed = False
         self._json: Optional[Dict] = None
         self._form: Optional[Dict] = None
+        self._headers: Optional[Headers] = None
+        self._query_params: Optional[QueryParams] = None
         self.path_params: Dict[str, str] = {}
+        # Request-scoped dependency values and their cleanup (see dependencies.py)
+        self._dependency_cache: Optional[Dict] = None
+        self._exit_stack = None
+        # BackgroundTasks injected into the handler, if any
+        self._background = None
+        # Set once http.disconnect has been seen (see is_disconnected / timeouts.py)
+        self._disconnected = False
+        self._receive_task: Optional[asyncio.Future] = None
+        self._state: Optional[Dict[str, Any]] = None
         
     @property
     def method(self) -> str:
@@ -21,31 +221,103 @@ class Request:
         return self.scope["path"]
         
     @property
-    def query_params(self) -> Dict[str, list]:
-        return parse_qs(self.scope["query_string"].decode())
+    def query_params(self) -> QueryParams:
+        if self._query_params is None:
+            self._query_params = QueryParams(self.scope.get("query_string", b""))
+        return self._query_params
         
     @property
-    def headers(self) -> Dict[str, str]:
-        return {
-            k.decode(): v.decode()
-            for k, v in self.scope["headers"]
-        }
+    def headers(self) -> Headers:
+        if self._headers is None:
+            self._headers = Headers(self.scope["headers"])
+        return self._headers
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        """Free-form per-request storage for middleware and handlers"""
+        if self._state is None:
+            self._state = {}
+        return self._state
+
+    @property
+    def client(self) -> Optional[Tuple[str, int]]:
+        """(host, port) of the client if the server provided it"""
+        return self.scope.get("client")
     
     @property
     def content_type(self) -> str:
         return self.headers.get('content-type', '').lower()
 
+    async def stream(self) -> AsyncIterator[bytes]:
+        """
+        Yield the body in chunks as they arrive, without buffering it
+
+        The stream can only be read once; after that only ``body()`` works,
+        and only if it was the one that read it.
+        """
+        if self._body is not None:
+            if self._body:
+                yield self._body
+            return
+        if self._stream_consumed:
+            raise RuntimeError("Request body has already been consumed")
+        self._stream_consumed = True
+        while True:
+            message = await self.receive()
+            chunk = message.get("body", b"")
+            if chunk:
+                yield chunk
+            if not message.get("more_body", False):
+                break
+
     async def body(self) -> bytes:
         if self._body is None:
-            body = b""
-            while True:
-                message = await self.receive()
-                body += message.get("body", b"")
-                if not message.get("more_body", False):
-                    break
-            self._body = body
+            chunks = [chunk async for chunk in self.stream()]
+            self._body = b"".join(chunks)
         return self._body
 
+    async def is_disconnected(self) -> bool:
+        """
+        Whether the client has gone away, for long-running handlers to check
+
+        Doesn't block. If the body hasn't been read yet it is read (and
+        cached for ``body()``) first, since the disconnect message can only
+        arrive after it. A body being consumed through ``stream()`` can't
+        be skipped, so until it has been this reports only what is known.
+        """
+        if self._disconnected:
+            return True
+        if self._body is None:
+            if self._stream_consumed:
+                return False
+            await self.body()
+
+        task = self._receive_task
+        if task is None:
+            task = self._receive_task = asyncio.ensure_future(self.receive())
+        # Give the pending receive() one turn of the event loop
+        await asyncio.sleep(0)
+        if task.done():
+            self._receive_task = None
+            if not task.cancelled() and task.result().get("type") == "http.disconnect":
+                self._disconnected = True
+        return self._disconnected
+
+    async def _receive_pending(self) -> Dict:
+        """receive() for after the handler, taking over a pending is_disconnected() poll"""
+        task = self._receive_task
+        if task is None:
+            return await self.receive()
+        # The poll may already hold the http.disconnect message
+        self._receive_task = None
+        return await task
+
+    def _cancel_receive(self) -> None:
+        """Drop a pending is_disconnected() poll once the request is finished"""
+        if self._receive_task is not None:
+            self._receive_task.cancel()
+            self._receive_task = None
+
     async def json(self) -> Dict:
         """Parse and return JSON body"""
         if self._json is None:
@@ -58,11 +330,38 @@ class Request:
                 raise BadRequestError("Invalid JSON")
         return self._json
 
-    async def form(self) -> Dict[str, str]:
-        """Parse and return form data"""
+    async def form(self, **limits: int) -> Dict[str, list]:
+        """
+        Parse and return form data as a dict of value lists
+
+        URL-encoded bodies are read in full and parsed with ``parse_qs``.
+        multipart/form-data bodies are parsed as they stream in; file parts
+        become UploadFile objects, closed after the response is sent.
+
+        Args:
+            **limits: Overrides for ``parse_multipart`` limits
+                (max_parts, max_field_size, max_file_size, max_size, spool_max_size)
+        """
         if self._form is None:
-            if 'application/x-www-form-urlencoded' not in self.content_type:
-                raise BadRequestError("Content-Type must be application/x-www-form-urlencoded")
-            body = await self.body()
-            self._form = parse_qs(body.decode())
+            # Imported on first use: it pulls in tempfile, which apps without forms don't need
+            from .multipart import parse_multipart, parse_options_header
+            content_type, params = parse_options_header(self.headers.get("content-type", ""))
+            if content_type == "multipart/form-data":
+                boundary = params.get("boundary")
+                if not boundary:
+                    raise BadRequestError("Missing multipart boundary")
+                self._form = await parse_multipart(self.stream(), boundary.encode("latin-1"), **limits)
+                if self._exit_stack is None:
+                    self._exit_stack = AsyncExitStack()
+                for values in self._form.values():
+                    for value in values:
+                        if hasattr(value, "close"):
+                            self._exit_stack.push_async_callback(value.close)
+            elif content_type == "application/x-www-form-urlencoded":
+                body = await self.body()
+                self._form = parse_qs(body.decode())
+            else:
+                raise BadRequestError(
+                    "Content-Type must be application/x-www-form-urlencoded or multipart/form-data"
+                )
         return self._form
@@ -1,12 +1,45 @@
-from typing import Any, Dict, Optional, Union
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import asyncio
 import json
+import mimetypes
+import mmap
+import os
+from .background import BackgroundTasks
+from .concurrency import run_in_threadpool
+from .serialization import dumps, get_encoder
+
+class EncodedHeaders:
+    """
+    A fixed set of headers encoded to bytes once
+
+    Middleware that adds the same headers to every response builds one of
+    these at construction and merges it with ``response.headers.update_encoded``;
+    ``Response.send`` then emits the stored byte pairs instead of encoding
+    the strings again.
+    """
+
+    __slots__ = ("items", "encoded")
+
+    def __init__(self, headers: Dict[str, str]):
+        self.items: List[Tuple[str, str]] = [(k.lower(), v) for k, v in headers.items()]
+        # name -> (str value, (name bytes, value bytes)); send() checks the
+        # str value is still the same object before trusting the bytes
+        self.encoded: Dict[str, Tuple[str, Tuple[bytes, bytes]]] = {
+            k: (v, (k.encode("latin-1"), v.encode("latin-1"))) for k, v in self.items
+        }
+
 
 class CaseInsensitiveDict(dict):
     """Dictionary subclass that uses lowercase keys for case-insensitive lookups."""
+
+    __slots__ = ("_encoded",)
     
     def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._convert_keys()
+        super().__init__()
+        self._encoded: Optional[Dict[str, Tuple[str, Tuple[bytes, bytes]]]] = None
+        if args or kwargs:
+            # Lowercase while inserting instead of inserting and then re-keying
+            self.update(*args, **kwargs)
     
     def __getitem__(self, key: str) -> str:
         return super().__getitem__(key.lower())
@@ -22,59 +55,288 @@ class CaseInsensitiveDict(dict):
     
     def get(self, key: str, default=None):
         return super().get(key.lower(), default)
-    
-    def _convert_keys(self):
-        """Convert all keys to lowercase."""
-        for k in list(self.keys()):
-            v = super().pop(k)
-            self.__setitem__(k, v)
+
+    def update(self, *args, **kwargs) -> None:
+        for k, v in dict(*args, **kwargs).items():
+            super().__setitem__(k.lower(), v)
+
+    def update_encoded(self, headers: EncodedHeaders) -> None:
+        """Set every header in a pre-encoded block"""
+        dict.update(self, headers.items)
+        if self._encoded is None:
+            # Shared, not copied: the block is never mutated
+            self._encoded = headers.encoded
+        else:
+            self._encoded = {**self._encoded, **headers.encoded}
+
+    def raw(self) -> List[Tuple[bytes, bytes]]:
+        """Headers as ASGI byte pairs, reusing pre-encoded values that haven't been replaced"""
+        encoded = self._encoded
+        if encoded is None:
+            return [(k.encode("latin-1"), v.encode("latin-1")) for k, v in self.items()]
+        raw = []
+        for k, v in self.items():
+            cached = encoded.get(k)
+            if cached is not None and cached[0] is v:
+                raw.append(cached[1])
+            else:
+                raw.append((k.encode("latin-1"), v.encode("latin-1")))
+        return raw
+
+
+_CONTENT_TYPES = {
+    content_type: EncodedHeaders({"content-type": content_type})
+    for content_type in ("application/octet-stream", "application/json", "text/plain")
+}
 
 class Response:
+    __slots__ = ("status_code", "headers", "body", "background")
+
     def __init__(
         self,
-        content: Union[str, dict, bytes],
+        content: Any,
         status_code: int = 200,
-        headers: Optional[Dict[str, str]] = None
+        headers: Optional[Dict[str, str]] = None,
+        background: Optional[BackgroundTasks] = None,
     ):
         self.status_code = status_code
         self.headers = CaseInsensitiveDict(headers or {})
-        self._json = None
+        # Run by App after the response has been sent
+        self.background = background
         
         # Handle different content types
         if isinstance(content, bytes):
             self.body = content
-            if "content-type" not in self.headers:
-                self.headers["content-type"] = "application/octet-stream"
-        elif isinstance(content, dict):
-            self._json = content  # Store JSON directly if dict
-            self.body = json.dumps(content).encode()
-            if "content-type" not in self.headers:
-                self.headers["content-type"] = "application/json"
+            default_type = "application/octet-stream"
+        elif isinstance(content, (dict, list)) or (
+            not isinstance(content, (str, int, float)) and get_encoder(type(content)) is not None
+        ):
+            # Dataclasses, datetimes etc. go through the cached per-type encoders
+            self.body = dumps(content)
+            default_type = "application/json"
         else:
             self.body = str(content).encode()
-            if "content-type" not in self.headers:
-                self.headers["content-type"] = "text/plain"
+            default_type = "text/plain"
+        if headers is None or "content-type" not in self.headers:
+            self.headers.update_encoded(_CONTENT_TYPES[default_type])
     
+    @classmethod
+    def from_encoded(
+        cls,
+        body: bytes,
+        status_code: int = 200,
+        content_type: str = "application/json",
+        headers: Optional[EncodedHeaders] = None,
+    ) -> "Response":
+        """
+        Build a response around an already-encoded body, skipping serialization
+
+        Args:
+            body: Response body
+            status_code: HTTP status code
+            content_type: Content-Type, ignored when headers is given
+            headers: Pre-encoded headers to send (including Content-Type)
+        """
+        response = cls.__new__(cls)
+        response.status_code = status_code
+        response.body = body
+        response.background = None
+        response.headers = CaseInsensitiveDict()
+        encoded = headers if headers is not None else _CONTENT_TYPES.get(content_type)
+        if encoded is None:
+            encoded = EncodedHeaders({"content-type": content_type})
+        response.headers.update_encoded(encoded)
+        return response
+
     async def json(self) -> Dict:
-        """Get the response content as JSON."""
-        if self._json is not None:
-            return self._json
+        """Get the response content as JSON (decoded from the body on each call)."""
         if "application/json" not in self.headers.get("content-type", "").lower():
             raise ValueError("Response content type is not JSON")
-        self._json = json.loads(self.body.decode())
-        return self._json
+        return json.loads(self.body)
 
-    async def send(self, send: Any):
+    async def send(self, send: Any, receive: Optional[Callable] = None):
         await send({
             "type": "http.response.start",
             "status": self.status_code,
-            "headers": [
-                (k.encode(), v.encode())
-                for k, v in self.headers.items()
-            ]
+            "headers": self.headers.raw()
         })
         
         await send({
             "type": "http.response.body",
             "body": self.body
         })
+
+
+class StreamingResponse(Response):
+    """
+    A response whose body is sent in chunks as an iterator produces them
+
+    Each chunk is one ``http.response.body`` message with ``more_body`` set,
+    and the next chunk isn't pulled until ``send`` returns, so a client that
+    reads slowly holds back the producer instead of filling a buffer.
+    Synchronous iterators are advanced in the thread pool.
+
+    When App passes ``receive``, the response also listens for
+    ``http.disconnect`` and stops the iterator (running its ``finally``
+    blocks) once the client has gone.
+    """
+
+    __slots__ = ("content",)
+
+    def __init__(
+        self,
+        content: Union[AsyncIterable[Union[str, bytes]], Iterable[Union[str, bytes]]],
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTasks] = None,
+    ):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.background = background
+        self.body = b""
+        self.content = content
+        if media_type is not None:
+            self.headers["content-type"] = media_type
+        elif headers is None or "content-type" not in self.headers:
+            self.headers.update_encoded(_CONTENT_TYPES["application/octet-stream"])
+
+    async def send(self, send: Any, receive: Optional[Callable] = None):
+        if receive is None:
+            await self._stream(send)
+            return
+
+        stream = asyncio.ensure_future(self._stream(send))
+        listener = asyncio.ensure_future(_wait_for_disconnect(receive))
+        try:
+            await asyncio.wait((stream, listener), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            listener.cancel()
+            if not stream.done():
+                stream.cancel()
+                try:
+                    await stream
+                except asyncio.CancelledError:
+                    pass
+        if not stream.cancelled():
+            # Re-raise anything the iterator raised
+            stream.result()
+
+    async def _stream(self, send: Any) -> None:
+        content = self.content
+        iterator = content.__aiter__() if hasattr(content, "__aiter__") else _iterate_in_threadpool(iter(content))
+        try:
+            # Inside the try so the iterator is closed even if the client is already gone
+            await send({
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.headers.raw()
+            })
+            async for chunk in iterator:
+                if not isinstance(chunk, bytes):
+                    chunk = chunk.encode()
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+
+async def _wait_for_disconnect(receive: Callable) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def _iterate_in_threadpool(iterator: Iterator) -> AsyncIterator:
+    done = object()
+    while True:
+        chunk = await run_in_threadpool(next, iterator, done)
+        if chunk is done:
+            return
+        yield chunk
+
+
+class FileResponse(Response):
+    """
+    A response whose body is a file, or a byte range of one
+
+    With ``pathsend`` (when the server advertises the ASGI
+    ``http.response.pathsend`` extension) the server is handed the path and
+    writes the file itself, e.g. with ``sendfile``. Otherwise the file is
+    memory-mapped and sent in ``chunk_size`` slices of the mapping. ASGI
+    bodies must be bytes, so each slice is copied out of the page cache,
+    but no ``read`` call or intermediate buffer is needed.
+
+    Args:
+        path: File to send
+        status_code: HTTP status code
+        headers: Extra headers
+        media_type: Content-Type (guessed from the file name by default)
+        offset: First byte to send
+        count: Number of bytes to send (defaults to the rest of the file)
+        chunk_size: Bytes per body message
+        pathsend: Let the server send the file; the whole file is sent, so
+            this is ignored when offset is set
+        background: Tasks to run after the response is sent
+    """
+
+    __slots__ = ("path", "offset", "count", "chunk_size", "pathsend")
+
+    def __init__(
+        self,
+        path: str,
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+        media_type: Optional[str] = None,
+        offset: int = 0,
+        count: Optional[int] = None,
+        chunk_size: int = 256 * 1024,
+        pathsend: bool = False,
+        background: Optional[BackgroundTasks] = None,
+    ):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.background = background
+        self.body = b""
+        self.path = path
+        self.offset = offset
+        self.count = count if count is not None else os.stat(path).st_size - offset
+        self.chunk_size = chunk_size
+        # The extension has no offset, so ranges are always mapped
+        self.pathsend = pathsend and offset == 0
+        if media_type is None and "content-type" not in self.headers:
+            media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if media_type is not None:
+            self.headers["content-type"] = media_type
+        self.headers["content-length"] = str(self.count)
+
+    async def send(self, send: Any, receive: Optional[Callable] = None):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.headers.raw()
+        })
+        if self.pathsend:
+            await send({"type": "http.response.pathsend", "path": self.path})
+            return
+        if self.count <= 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        with open(self.path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            position, end = self.offset, self.offset + self.count
+            while position < end:
+                chunk_end = min(position + self.chunk_size, end)
+                await send({
+                    "type": "http.response.body",
+                    "body": mapped[position:chunk_end],
+                    "more_body": chunk_end < end,
+                })
+                position = chunk_end
+        finally:
+            mapped.close()
@@ -1,12 +1,34 @@
-from typing import Callable, Dict, List, Optional, Tuple, Union
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple, Union
 from .response import Response
+from .utils import parse_route_pattern
+from .dependencies import get_plan
 import re
 
+if TYPE_CHECKING:  # pragma: no cover
+    from .staticfiles import StaticFiles
+
+# Pseudo-method WebSocket routes are stored under in the route tables;
+# "<" and ">" aren't allowed in HTTP method tokens
+WEBSOCKET = "<websocket>"
+
 class Router:
-    def __init__(self, prefix: str = ""):
+    def __init__(self, prefix: str = "", host: Optional[str] = None, version: Optional[str] = None):
+        """
+        Args:
+            prefix: Path prefix for every route
+            host: Only match requests for this host, either exact
+                (``"api.example.com"``) or a wildcard for its subdomains
+                (``"*.example.com"``)
+            version: Only match requests whose API version header
+                (``App.version_header``) has this value
+        """
         self.prefix = self._normalize_prefix(prefix)
+        self.host = normalize_host(host) if host else None
+        self.version = version
         self.routes: List[Tuple[str, Dict[str, Callable]]] = []
         self.middleware: List[Callable] = []
+        # Apps that included this router; their route tables are rebuilt when it changes
+        self._owners: List["Router"] = []
 
     def _normalize_prefix(self, prefix: str) -> str:
         """Normalize the prefix to start with / and not end with /"""
@@ -15,11 +37,17 @@ class Router:
         prefix = "/" + prefix.strip("/")
         return prefix
 
+    def _check_not_started(self) -> None:
+        for owner in self._owners:
+            owner._check_not_started()
+
     def route(self, path: str, methods: List[str] = ["GET"]):
         """Route decorator for registering handlers"""
         full_path = f"{self.prefix}{path}"
         
         def decorator(handler: Callable):
+            self._check_not_started()
+            get_plan(handler)  # inspect the signature now so mistakes surface at import
             method_dict = {method.upper(): handler for method in methods}
             self.routes.append((full_path, method_dict))
             return handler
@@ -43,12 +71,48 @@ class Router:
     def options(self, path: str):
         return self.route(path, methods=["OPTIONS"])
     
+    def websocket(self, path: str, idle_timeout: Optional[float] = None):
+        """
+        WebSocket route decorator; the handler takes a single WebSocket
+
+        Args:
+            path: Route pattern, with the same syntax as HTTP routes
+            idle_timeout: Close the connection after this many seconds
+                without a client message
+        """
+        full_path = f"{self.prefix}{path}"
+
+        def decorator(handler: Callable):
+            self._check_not_started()
+            handler._nasirpy_websocket_idle_timeout = idle_timeout
+            self.routes.append((full_path, {WEBSOCKET: handler}))
+            return handler
+        return decorator
+
+    def static(self, path: str, directory: str, **options) -> "StaticFiles":
+        """
+        Serve the files in directory under path
+
+        Accepts the same options as StaticFiles. GET and HEAD requests for
+        ``{path}/<file>`` are answered from the directory.
+
+        Returns:
+            The StaticFiles handler
+        """
+        from .staticfiles import StaticFiles
+        handler = StaticFiles(directory, **options)
+        self.route(f"{path.rstrip('/')}/{{path:path}}", methods=["GET", "HEAD"])(handler)
+        return handler
+
     def add_middleware(self, middleware: Callable) -> None:
         """Add middleware to this router"""
         self.middleware.append(middleware)
     
     def include_router(self, router: "Router", prefix: str = "") -> None:
         """Include another router with optional prefix"""
+        if router.host is not None or router.version is not None:
+            raise ValueError("Routers bound to a host or version must be included in the App directly")
+        self._check_not_started()
         combined_prefix = f"{self.prefix}{prefix}{router.prefix}"
         
         # Add all routes from the included router with the combined prefix
@@ -88,3 +152,174 @@ class Router:
                 return methods[method], params
         
         return None, {}
+
+
+
+class RouteTable:
+    """
+    Compiled, read-only view of a list of ``(pattern, methods)`` routes
+
+    Patterns without parameters go into a dict keyed by path; the rest are
+    compiled to regexes once. Lookups return the same handler a linear scan
+    in registration order would, so an earlier ``/users/{id}`` still wins
+    over a later ``/users/me``.
+    """
+
+    def __init__(self, routes: List[Tuple[str, Dict[str, Callable]]], wrap: Optional[Callable] = None):
+        """
+        Args:
+            routes: Routes in match priority order
+            wrap: Optional function applied once to every handler (e.g. to
+                build its middleware chain); lookups return the wrapped value
+        """
+        wrapped: Dict[Callable, Callable] = {}
+
+        def prepare(handler: Callable) -> Callable:
+            if wrap is None:
+                return handler
+            if handler not in wrapped:
+                wrapped[handler] = wrap(handler)
+            return wrapped[handler]
+
+        self.size = len(routes)
+        self.static: Dict[str, Dict[str, Tuple[int, Callable, str]]] = {}
+        self.dynamic: List[Tuple[int, "re.Pattern", List[str], Dict[str, Callable], str]] = []
+        for index, (pattern, methods) in enumerate(routes):
+            methods = {method: prepare(handler) for method, handler in methods.items()}
+            regex_pattern, param_names = parse_route_pattern(pattern)
+            if param_names:
+                self.dynamic.append((index, re.compile(regex_pattern), param_names, methods, pattern))
+            else:
+                # Same normalization parse_route_pattern applies (empty segments dropped)
+                path = "/" + "/".join(part for part in pattern.split("/") if part)
+                entry = self.static.setdefault(path, {})
+                for method, handler in methods.items():
+                    entry.setdefault(method, (index, handler, pattern))
+
+    def lookup(self, path: str, method: str) -> Tuple[Optional[Callable], Optional[Dict[str, str]]]:
+        """Return the (possibly wrapped) handler and path parameters, or (None, None)"""
+        handler, params, _ = self.match(path, method)
+        return handler, params
+
+    def match(self, path: str, method: str) -> Tuple[Optional[Callable], Optional[Dict[str, str]], Optional[str]]:
+        """Like lookup, plus the pattern of the matched route (``/users/{id}``)"""
+        static = self.static.get(path)
+        found = static.get(method) if static else None
+        limit = found[0] if found else self.size
+        for index, regex, param_names, methods, pattern in self.dynamic:
+            if index > limit:
+                break
+            if method in methods:
+                match = regex.match(path)
+                if match:
+                    return methods[method], dict(zip(param_names, match.groups())), pattern
+        if found:
+            return found[1], {}, found[2]
+        return None, None, None
+
+    def allowed_methods(self, path: str) -> List[str]:
+        """Methods registered for any route matching path (used to tell 405 from 404)"""
+        allowed = set(self.static.get(path, ()))
+        for _, regex, _, methods, _ in self.dynamic:
+            if regex.match(path):
+                allowed.update(methods)
+        return sorted(allowed)
+
+
+class MountTable:
+    """
+    Mounted ASGI apps keyed by path prefix
+
+    A prefix matches whole path segments (``/api`` matches ``/api`` and
+    ``/api/users`` but not ``/apix``), and the longest matching prefix wins.
+    Matching slices the request path at each segment boundary, deepest
+    first, and looks the slice up in a dict, so the cost depends on the
+    depth of the deepest mount rather than on how many apps are mounted.
+    """
+
+    def __init__(self, mounts: Dict[str, Callable]):
+        self.mounts = dict(mounts)
+        self.max_depth = max((prefix.count("/") for prefix in self.mounts), default=0)
+
+    def match(self, path: str) -> Tuple[Optional[str], Optional[Callable]]:
+        """Return the matching (prefix, app), or (None, None)"""
+        parts = path.split("/", self.max_depth + 1)
+        mounts = self.mounts
+        for depth in range(min(len(parts) - 1, self.max_depth), 0, -1):
+            prefix = "/".join(parts[:depth + 1])
+            app = mounts.get(prefix)
+            if app is not None:
+                return prefix, app
+        return None, None
+
+
+def normalize_host(host: str) -> str:
+    """Lowercase a Host header value and drop the port and any trailing dot"""
+    host = host.lower()
+    if host.startswith("["):
+        # IPv6 literal, "[::1]:8000"
+        return host[:host.find("]") + 1]
+    return host.partition(":")[0].rstrip(".")
+
+
+RouteGroups = Dict[Tuple[Optional[str], Optional[str]], List[Tuple[str, Dict[str, Callable]]]]
+
+
+class HostTable:
+    """
+    Route tables chosen by host and API version before any path matching
+
+    Routes are grouped by the ``(host, version)`` of the router they came
+    from. Each host/version pair gets its own RouteTable holding, in
+    priority order, its own routes, the host's unversioned routes, the
+    version's host-less routes and finally the routes bound to neither. A
+    request is therefore matched against a single table however many
+    tenants there are.
+
+    Exact hosts are a dict lookup. Wildcard hosts (``*.example.com``) are
+    stored by suffix and found by looking up each suffix of the request
+    host, longest first.
+    """
+
+    def __init__(self, groups: RouteGroups, wrap: Optional[Callable] = None):
+        hosts = {host for host, _ in groups}
+        hosts.add(None)
+        versions = {version for _, version in groups}
+        versions.add(None)
+
+        self.exact: Dict[str, Dict[Optional[str], RouteTable]] = {}
+        self.wildcard: Dict[str, Dict[Optional[str], RouteTable]] = {}
+        self.default: Dict[Optional[str], RouteTable] = {}
+        for host in hosts:
+            tables = {}
+            for version in versions:
+                keys = dict.fromkeys([(host, version), (host, None), (None, version), (None, None)])
+                routes = [route for key in keys for route in groups.get(key, ())]
+                tables[version] = RouteTable(routes, wrap=wrap)
+            if host is None:
+                self.default = tables
+            elif host.startswith("*."):
+                self.wildcard[host[1:]] = tables
+            else:
+                self.exact[host] = tables
+
+    def select(self, host: Optional[str], version: Optional[str]) -> RouteTable:
+        """The table for a request's Host header and version header values"""
+        tables = self.default
+        if host:
+            host = normalize_host(host)
+            found = self.exact.get(host)
+            if found is None and self.wildcard:
+                index = host.find(".")
+                while index != -1:
+                    found = self.wildcard.get(host[index:])
+                    if found is not None:
+                        break
+                    index = host.find(".", index + 1)
+            if found is not None:
+                tables = found
+        if version is not None:
+            table = tables.get(version)
+            if table is not None:
+                return table
+        return tables[None]
@@ -0,0 +1,112 @@
+"""
+JSON serialization of dataclasses and other non-JSON types
+
+The standard ``json`` encoder (like orjson and msgspec) handles dicts,
+lists, strings and numbers natively and calls a ``default`` hook only for
+objects it doesn't know. ``default`` here looks up an encoder for the
+object's type in a cache, building it the first time that type is seen:
+
+- dataclasses: the field names are resolved once, and each instance is
+  turned into a shallow dict with a single ``attrgetter`` call (nested
+  values are handed back to the JSON encoder, which calls ``default`` again
+  for them), instead of recursing through ``dataclasses.asdict`` each time
+- datetime, date and time: ``isoformat()``
+- UUID and Decimal: ``str()``
+- Enum: its value
+- set and frozenset: a list
+- objects with a pydantic-style ``model_dump``: ``model_dump(mode="json")``
+
+Other types can be added with ``register_serializer``, which also applies
+to subclasses:
+
+    register_serializer(Money, lambda m: {"amount": str(m.amount), "currency": m.currency})
+
+``default`` works as the hook of any JSON backend:
+
+    orjson.dumps(data, default=default)
+"""
+import dataclasses
+import json
+import sys
+from datetime import date, datetime, time
+from enum import Enum
+from operator import attrgetter
+from typing import Any, Callable, Dict, Optional
+
+Encoder = Callable[[Any], Any]
+
+_registered: Dict[type, Encoder] = {}
+_encoders: Dict[type, Optional[Encoder]] = {}
+
+
+def register_serializer(cls: type, encoder: Encoder) -> None:
+    """
+    Serialize instances of cls (and its subclasses) with encoder
+
+    The encoder returns a JSON-compatible value; it may contain other
+    objects that need serializing.
+    """
+    _registered[cls] = encoder
+    _encoders.clear()
+
+
+def get_encoder(cls: type) -> Optional[Encoder]:
+    """Return the cached encoder for a type, or None if it isn't serializable"""
+    try:
+        return _encoders[cls]
+    except KeyError:
+        encoder = _encoders[cls] = _build_encoder(cls)
+        return encoder
+
+
+def default(obj: Any) -> Any:
+    """``default`` hook for json.dumps and compatible encoders"""
+    encoder = get_encoder(type(obj))
+    if encoder is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return encoder(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode obj as JSON bytes"""
+    return json.dumps(obj, default=default).encode()
+
+
+def is_loaded_subclass(cls: Any, module: str, name: str) -> bool:
+    """
+    Whether cls is a subclass of ``module.name``, without importing module
+
+    If the module has never been imported no class can derive from it, so
+    optional types (UUID, Decimal, ...) are checked without paying for
+    their import at startup.
+    """
+    loaded = sys.modules.get(module)
+    return loaded is not None and isinstance(cls, type) and issubclass(cls, getattr(loaded, name))
+
+
+def _build_encoder(cls: type) -> Optional[Encoder]:
+    for base in cls.__mro__:
+        if base in _registered:
+            return _registered[base]
+
+    if dataclasses.is_dataclass(cls):
+        names = tuple(field.name for field in dataclasses.fields(cls))
+        if len(names) == 1:
+            name = names[0]
+            return lambda obj: {name: getattr(obj, name)}
+        if not names:
+            return lambda obj: {}
+        getter = attrgetter(*names)
+        return lambda obj: dict(zip(names, getter(obj)))
+
+    if issubclass(cls, Enum):
+        return attrgetter("value")
+    if issubclass(cls, (datetime, date, time)):
+        return cls.isoformat
+    if is_loaded_subclass(cls, "uuid", "UUID") or is_loaded_subclass(cls, "decimal", "Decimal"):
+        return str
+    if issubclass(cls, (set, frozenset)):
+        return list
+    if callable(getattr(cls, "model_dump", None)):
+        return lambda obj: obj.model_dump(mode="json")
+    return None
@@ -0,0 +1,1009 @@
+"""
+Built-in HTTP/1.1 server for running a nasirpy App without an external ASGI server.
+
+The server speaks just enough HTTP/1.1 to drive an ASGI application:
+keep-alive connections, pipelined requests (answered in order), chunked
+request and response bodies, and the ASGI ``http.response.pathsend``
+extension (the file is written with ``sendfile``). For multi-core
+deployments it pre-forks worker processes that each run their own event
+loop. On Linux every worker binds its own ``SO_REUSEPORT`` socket so the
+kernel balances new connections between them; elsewhere the workers share
+the listening socket inherited from the master.
+
+Requests are parsed incrementally from one reusable ``bytearray`` per
+connection, or by ``httptools`` when it is installed. Responses are
+written with a single ``writelines`` call per message.
+
+Usage:
+    from nasirpy.server import run
+    run(app, host="0.0.0.0", port=8000, workers=4, max_requests=10000)
+"""
+import asyncio
+import logging
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import time
+from collections import deque
+from http import HTTPStatus
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import unquote
+
+from .concurrency import shutdown_executors
+
+try:
+    import httptools
+except ImportError:  # pragma: no cover - optional dependency
+    httptools = None
+
+logger = logging.getLogger("nasirpy.server")
+
+Headers = List[Tuple[bytes, bytes]]
+
+STATUS_LINES: Dict[int, bytes] = {
+    status.value: f"HTTP/1.1 {status.value} {status.phrase}\r\n".encode()
+    for status in HTTPStatus
+}
+
+# Stop reading from a connection while this much request body is waiting
+# for the app, or this many pipelined requests are queued.
+HIGH_WATER_BODY = 65536
+HIGH_WATER_PIPELINE = 16
+
+# Exit status of a worker that failed before serving anything
+WORKER_BOOT_ERROR = 3
+
+_BAD_REQUEST = STATUS_LINES[400] + b"content-length: 0\r\nconnection: close\r\n\r\n"
+_INTERNAL_ERROR_HEADERS = [(b"content-type", b"text/plain")]
+
+
+def _status_line(status_code: int) -> bytes:
+    line = STATUS_LINES.get(status_code)
+    if line is None:
+        line = f"HTTP/1.1 {status_code} \r\n".encode()
+    return line
+
+
+def parse_request_head(
+    buffer: bytes, start: int = 0, end: Optional[int] = None
+) -> Tuple[str, bytes, str, Headers]:
+    """
+    Parse the request line and headers of an HTTP/1.x request
+
+    Only the method, target and each header name/value are copied out of
+    ``buffer``; lines are located by index, so the connection buffer can be
+    parsed in place.
+
+    Args:
+        buffer: Bytes-like object holding the request head
+        start: Offset of the request line
+        end: Offset of the terminating blank line (defaults to the first CRLFCRLF)
+
+    Returns:
+        Tuple of (method, target, http_version, headers) where headers are
+        lowercased ``(name, value)`` byte pairs as used in ASGI scopes
+
+    Raises:
+        ValueError: If the request head is malformed
+    """
+    if end is None:
+        end = buffer.find(b"\r\n\r\n", start)
+        if end < 0:
+            end = len(buffer)
+    line_end = buffer.find(b"\r\n", start, end)
+    if line_end < 0:
+        line_end = end
+    first_space = buffer.find(b" ", start, line_end)
+    second_space = buffer.find(b" ", first_space + 1, line_end)
+    if (
+        first_space <= start
+        or second_space < 0
+        or buffer.find(b" ", second_space + 1, line_end) >= 0
+        or buffer[second_space + 1:second_space + 6] != b"HTTP/"
+    ):
+        raise ValueError("Malformed request line")
+
+    with memoryview(buffer) as view:
+        method = str(view[start:first_space], "ascii")
+        target = bytes(view[first_space + 1:second_space])
+        http_version = str(view[second_space + 6:line_end], "ascii")
+
+        headers = []
+        pos = line_end + 2
+        while pos < end:
+            line_end = buffer.find(b"\r\n", pos, end)
+            if line_end < 0:
+                line_end = end
+            colon = buffer.find(b":", pos, line_end)
+            if colon <= pos:
+                raise ValueError("Malformed header line")
+            value_start = colon + 1
+            while value_start < line_end and buffer[value_start] in (32, 9):
+                value_start += 1
+            value_end = line_end
+            while value_end > value_start and buffer[value_end - 1] in (32, 9):
+                value_end -= 1
+            headers.append((bytes(view[pos:colon]).lower(), bytes(view[value_start:value_end])))
+            pos = line_end + 2
+    return method, target, http_version, headers
+
+
+def _keep_alive(http_version: str, headers: Headers) -> bool:
+    for name, value in headers:
+        if name == b"connection":
+            value = value.lower()
+            if b"close" in value:
+                return False
+            if b"keep-alive" in value:
+                return True
+    return http_version == "1.1"
+
+
+class HTTPParser:
+    """
+    Incremental HTTP/1.1 request parser
+
+    Data is appended to one ``bytearray`` that lives as long as the
+    connection; consumed bytes are dropped from its front after each feed.
+    Parsed pieces are reported to the protocol through ``on_headers``,
+    ``on_body`` and ``on_message_complete``, the same callbacks the
+    httptools-based parser drives.
+    """
+
+    HEAD, BODY, CHUNK_SIZE, CHUNK_DATA, CHUNK_END, TRAILERS = range(6)
+
+    def __init__(self, protocol: "HTTPProtocol", max_head_size: int = 65536):
+        self.protocol = protocol
+        self.max_head_size = max_head_size
+        self.buffer = bytearray()
+        self._state = self.HEAD
+        self._remaining = 0
+
+    def feed_data(self, data: bytes) -> None:
+        """
+        Parse as much of the buffered data as possible
+
+        Raises:
+            ValueError: If the request is malformed
+        """
+        buffer = self.buffer
+        buffer += data
+        size = len(buffer)
+        pos = 0
+        protocol = self.protocol
+        try:
+            while pos < size or self._state == self.BODY and self._remaining == 0:
+                state = self._state
+                if state == self.HEAD:
+                    end = buffer.find(b"\r\n\r\n", pos)
+                    if end < 0:
+                        if size - pos > self.max_head_size:
+                            raise ValueError("Request head too large")
+                        break
+                    method, target, http_version, headers = parse_request_head(buffer, pos, end)
+                    pos = end + 4
+                    content_length, chunked = self._body_framing(headers)
+                    protocol.on_headers(method, target, http_version, headers, _keep_alive(http_version, headers))
+                    if chunked:
+                        self._state = self.CHUNK_SIZE
+                    else:
+                        self._state = self.BODY
+                        self._remaining = content_length
+                elif state == self.BODY or state == self.CHUNK_DATA:
+                    count = min(self._remaining, size - pos)
+                    if count:
+                        with memoryview(buffer) as view:
+                            protocol.on_body(bytes(view[pos:pos + count]))
+                        pos += count
+                        self._remaining -= count
+                    if self._remaining == 0:
+                        if state == self.BODY:
+                            self._state = self.HEAD
+                            protocol.on_message_complete()
+                        else:
+                            self._state = self.CHUNK_END
+                    else:
+                        break
+                elif state == self.CHUNK_END:
+                    if size - pos < 2:
+                        break
+                    if buffer[pos:pos + 2] != b"\r\n":
+                        raise ValueError("Malformed chunk")
+                    pos += 2
+                    self._state = self.CHUNK_SIZE
+                else:
+                    end = buffer.find(b"\r\n", pos)
+                    if end < 0:
+                        if size - pos > self.max_head_size:
+                            raise ValueError("Chunk header too large")
+                        break
+                    if state == self.CHUNK_SIZE:
+                        semicolon = buffer.find(b";", pos, end)
+                        chunk_size = int(buffer[pos:semicolon if semicolon >= 0 else end], 16)
+                        self._state = self.CHUNK_DATA if chunk_size else self.TRAILERS
+                        self._remaining = chunk_size
+                    elif end == pos:
+                        # Blank line after the (optional) trailers ends the message
+                        self._state = self.HEAD
+                        protocol.on_message_complete()
+                    pos = end + 2
+        finally:
+            del buffer[:pos]
+
+    @staticmethod
+    def _body_framing(headers: Headers) -> Tuple[int, bool]:
+        content_length = 0
+        chunked = False
+        for name, value in headers:
+            if name == b"content-length":
+                content_length = int(value)
+                if content_length < 0:
+                    raise ValueError("Negative Content-Length")
+            elif name == b"transfer-encoding" and b"chunked" in value.lower():
+                chunked = True
+        return content_length, chunked
+
+
+class HttptoolsParser:
+    """Adapter driving the same protocol callbacks from ``httptools``"""
+
+    def __init__(self, protocol: "HTTPProtocol"):
+        self.protocol = protocol
+        self.parser = httptools.HttpRequestParser(self)
+        self._url = b""
+        self._headers: Headers = []
+
+    def feed_data(self, data: bytes) -> None:
+        try:
+            self.parser.feed_data(data)
+        except httptools.HttpParserError as exc:
+            raise ValueError(str(exc)) from exc
+
+    # httptools callbacks
+
+    def on_message_begin(self) -> None:
+        self._url = b""
+        self._headers = []
+
+    def on_url(self, url: bytes) -> None:
+        self._url += url
+
+    def on_header(self, name: bytes, value: bytes) -> None:
+        self._headers.append((name.lower(), value))
+
+    def on_headers_complete(self) -> None:
+        parser = self.parser
+        self.protocol.on_headers(
+            parser.get_method().decode("ascii"),
+            self._url,
+            parser.get_http_version(),
+            self._headers,
+            parser.should_keep_alive(),
+        )
+
+    def on_body(self, body: bytes) -> None:
+        self.protocol.on_body(body)
+
+    def on_message_complete(self) -> None:
+        self.protocol.on_message_complete()
+
+
+class RequestCycle:
+    """ASGI receive/send pair for one request on a connection"""
+
+    def __init__(self, protocol: "HTTPProtocol", scope: dict, keep_alive: bool):
+        self.protocol = protocol
+        self.scope = scope
+        self.keep_alive = keep_alive
+        self.body_chunks: List[bytes] = []
+        self.body_size = 0
+        self.body_complete = False
+        self.request_complete = False
+        self.disconnected = False
+        self.response_started = False
+        self.response_complete = False
+        self.chunked = False
+        self.send_body = scope["method"] != "HEAD"
+        self.status = 500
+        self.headers: Headers = []
+        self._message_event = asyncio.Event()
+
+    # Called by the protocol
+
+    def feed_body(self, chunk: bytes) -> None:
+        self.body_chunks.append(chunk)
+        self.body_size += len(chunk)
+        self._message_event.set()
+
+    def complete_body(self) -> None:
+        self.body_complete = True
+        self._message_event.set()
+
+    def disconnect(self) -> None:
+        self.disconnected = True
+        self._message_event.set()
+
+    # ASGI interface
+
+    async def receive(self) -> dict:
+        if not self.request_complete:
+            while not (self.body_chunks or self.body_complete or self.disconnected):
+                self.protocol.resume_reading()
+                self._message_event.clear()
+                await self._message_event.wait()
+            if not self.disconnected:
+                chunks = self.body_chunks
+                body = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+                chunks.clear()
+                self.body_size = 0
+                self.request_complete = self.body_complete
+                self.protocol.resume_reading()
+                return {"type": "http.request", "body": body, "more_body": not self.body_complete}
+
+        # Nothing more will arrive for this request; wait for the client to
+        # go away or the response to finish before reporting a disconnect.
+        while not (self.disconnected or self.response_complete):
+            self._message_event.clear()
+            await self._message_event.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message: dict) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Delay writing the head until the first body message so a
+            # Content-Length can be added for single-message responses.
+            self.status = message["status"]
+            self.headers = list(message.get("headers", []))
+            return
+        if message_type == "http.response.pathsend":
+            await self._send_file(message["path"])
+            return
+        if message_type != "http.response.body" or self.response_complete or self.disconnected:
+            return
+
+        chunk = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        parts = []
+        if not self.response_started:
+            self._write_head(parts, None if more_body else len(chunk))
+
+        if self.send_body:
+            if self.chunked:
+                if chunk:
+                    parts += (b"%x\r\n" % len(chunk), chunk, b"\r\n")
+                if not more_body:
+                    parts.append(b"0\r\n\r\n")
+            elif chunk:
+                parts.append(chunk)
+        if not more_body:
+            self.response_complete = True
+            self._message_event.set()
+        if parts:
+            self.protocol.transport.writelines(parts)
+        await self.protocol.drain()
+
+    def _write_head(self, parts: List[bytes], length: Optional[int]) -> None:
+        """Add the status line and headers to parts; length None means chunked"""
+        self.response_started = True
+        headers = self.headers
+        has_length = False
+        for name, _ in headers:
+            if name.lower() == b"content-length":
+                has_length = True
+                break
+        if not has_length:
+            if length is None:
+                self.chunked = True
+                headers.append((b"transfer-encoding", b"chunked"))
+            else:
+                headers.append((b"content-length", str(length).encode()))
+        if not self.keep_alive or self.protocol.closing:
+            self.keep_alive = False
+            headers.append((b"connection", b"close"))
+        parts.append(_status_line(self.status))
+        for name, value in headers:
+            parts += (name, b": ", value, b"\r\n")
+        parts.append(b"\r\n")
+
+    async def _send_file(self, path: str) -> None:
+        # ASGI pathsend extension: the whole file is the body, written with
+        # sendfile(2) where the transport supports it
+        if self.response_started or self.response_complete or self.disconnected:
+            return
+        with open(path, "rb") as file:
+            parts: List[bytes] = []
+            self._write_head(parts, os.fstat(file.fileno()).st_size)
+            self.protocol.transport.writelines(parts)
+            if self.send_body and not self.protocol.transport.is_closing():
+                try:
+                    await self.protocol.loop.sendfile(self.protocol.transport, file)
+                except ConnectionError:
+                    self.keep_alive = False
+        self.response_complete = True
+        self._message_event.set()
+        await self.protocol.drain()
+
+    async def run(self, app: Callable) -> None:
+        try:
+            await app(self.scope, self.receive, self.send)
+        except Exception:
+            logger.exception("Exception in ASGI application")
+            if self.response_started:
+                self.keep_alive = False
+                return
+            await self._send_internal_error()
+        finally:
+            if not self.response_complete:
+                if self.response_started:
+                    self.keep_alive = False
+                else:
+                    await self._send_internal_error()
+            self.response_complete = True
+            self._message_event.set()
+
+    async def _send_internal_error(self) -> None:
+        self.status = 500
+        self.headers = list(_INTERNAL_ERROR_HEADERS)
+        await self.send({"type": "http.response.body", "body": b"Internal Server Error"})
+
+
+class HTTPProtocol(asyncio.Protocol):
+    """One client connection: parses requests and runs them in order"""
+
+    def __init__(self, server: "HTTPServer"):
+        self.server = server
+        self.loop = asyncio.get_running_loop()
+        self.parser = server.parser_class(self)
+        self.transport: Optional[asyncio.Transport] = None
+        self.pipeline: Deque[RequestCycle] = deque()
+        self.cycle: Optional[RequestCycle] = None
+        self.closing = False
+        self._task: Optional[asyncio.Task] = None
+        self._reading_paused = False
+        self._writing_paused = False
+        self._drain_waiter: Optional[asyncio.Future] = None
+        self._keep_alive_handle: Optional[asyncio.TimerHandle] = None
+        self._server_addr = None
+        self._client_addr = None
+
+    # asyncio.Protocol interface
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+        sockname = transport.get_extra_info("sockname")
+        peername = transport.get_extra_info("peername")
+        self._server_addr = tuple(sockname[:2]) if isinstance(sockname, tuple) else None
+        self._client_addr = tuple(peername[:2]) if isinstance(peername, tuple) else None
+        self.server._protocols.add(self)
+        self._start_keep_alive_timer()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.server._protocols.discard(self)
+        self.closing = True
+        self._cancel_keep_alive_timer()
+        for cycle in self.pipeline:
+            cycle.disconnect()
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+
+    def data_received(self, data: bytes) -> None:
+        self._cancel_keep_alive_timer()
+        try:
+            self.parser.feed_data(data)
+        except ValueError:
+            if not self.pipeline:
+                self.transport.write(_BAD_REQUEST)
+            self.transport.close()
+            return
+        if self._task is None:
+            # Still idle (or waiting for the rest of a request head)
+            self._start_keep_alive_timer()
+
+    def pause_writing(self) -> None:
+        self._writing_paused = True
+
+    def resume_writing(self) -> None:
+        self._writing_paused = False
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+
+    # Parser callbacks
+
+    def on_headers(self, method: str, target: bytes, http_version: str, headers: Headers, keep_alive: bool) -> None:
+        path, _, query_string = target.partition(b"?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.3"},
+            "http_version": http_version,
+            "server": self._server_addr,
+            "client": self._client_addr,
+            "scheme": "http",
+            "method": method,
+            "root_path": "",
+            "path": unquote(path.decode("latin-1")),
+            "raw_path": path,
+            "query_string": query_string,
+            "headers": headers,
+            "extensions": {"http.response.pathsend": {}},
+        }
+        cycle = RequestCycle(self, scope, keep_alive)
+        self.cycle = cycle
+        self.pipeline.append(cycle)
+        if len(self.pipeline) > HIGH_WATER_PIPELINE:
+            self.pause_reading()
+        if self._task is None:
+            self._task = self.loop.create_task(self._run_pipeline())
+
+    def on_body(self, chunk: bytes) -> None:
+        cycle = self.cycle
+        cycle.feed_body(chunk)
+        if cycle.body_size > HIGH_WATER_BODY:
+            self.pause_reading()
+
+    def on_message_complete(self) -> None:
+        self.cycle.complete_body()
+        self.cycle = None
+
+    # Flow control
+
+    def pause_reading(self) -> None:
+        if not self._reading_paused and not self.transport.is_closing():
+            self._reading_paused = True
+            self.transport.pause_reading()
+
+    def resume_reading(self) -> None:
+        if self._reading_paused and len(self.pipeline) <= HIGH_WATER_PIPELINE:
+            self._reading_paused = False
+            self.transport.resume_reading()
+
+    async def drain(self) -> None:
+        if self._writing_paused and not self.transport.is_closing():
+            self._drain_waiter = self.loop.create_future()
+            await self._drain_waiter
+            self._drain_waiter = None
+
+    # Request processing
+
+    async def _run_pipeline(self) -> None:
+        server = self.server
+        try:
+            while self.pipeline:
+                cycle = self.pipeline[0]
+                if server._will_recycle():
+                    cycle.keep_alive = False
+                await cycle.run(server.app)
+                self.pipeline.popleft()
+                server._request_finished()
+                if not cycle.keep_alive or self.closing:
+                    self.transport.close()
+                    return
+                self.resume_reading()
+        finally:
+            self._task = None
+        if not self.closing:
+            self._start_keep_alive_timer()
+
+    def shutdown(self) -> None:
+        """Close now if idle, otherwise after the response in progress"""
+        self.closing = True
+        if self._task is None:
+            self.transport.close()
+
+    def _start_keep_alive_timer(self) -> None:
+        self._cancel_keep_alive_timer()
+        self._keep_alive_handle = self.loop.call_later(
+            self.server.keep_alive_timeout, self.transport.close
+        )
+
+    def _cancel_keep_alive_timer(self) -> None:
+        if self._keep_alive_handle is not None:
+            self._keep_alive_handle.cancel()
+            self._keep_alive_handle = None
+
+
+class LifespanCycle:
+    """
+    Runs the ASGI lifespan protocol for one process
+
+    Args:
+        app: ASGI application
+        mode: "on" requires lifespan support, "auto" tolerates apps without it
+    """
+
+    def __init__(self, app: Callable, mode: str = "auto"):
+        self.app = app
+        self.mode = mode
+        self.supported = True
+        self.startup_failed = False
+        self.shutdown_failed = False
+        self.error_message = ""
+        self._messages: "asyncio.Queue[dict]" = asyncio.Queue()
+        self._startup_done = asyncio.Event()
+        self._shutdown_done = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def startup(self) -> None:
+        """
+        Send lifespan.startup and wait for the app to answer
+
+        Raises:
+            RuntimeError: If the app reports startup failure
+        """
+        self._task = asyncio.get_running_loop().create_task(self._main())
+        await self._messages.put({"type": "lifespan.startup"})
+        await self._startup_done.wait()
+        if self.startup_failed:
+            raise RuntimeError(f"Application startup failed: {self.error_message}")
+
+    async def shutdown(self) -> None:
+        """Send lifespan.shutdown and wait for the app to answer"""
+        if self._task is None or not self.supported:
+            return
+        await self._messages.put({"type": "lifespan.shutdown"})
+        await self._shutdown_done.wait()
+        if self.shutdown_failed:
+            logger.error("Application shutdown failed: %s", self.error_message)
+
+    async def _main(self) -> None:
+        scope = {"type": "lifespan", "asgi": {"version": "3.0", "spec_version": "2.0"}}
+        try:
+            await self.app(scope, self._messages.get, self._send)
+        except Exception as exc:
+            if self.mode == "on" or self._startup_done.is_set():
+                logger.exception("Exception in lifespan protocol")
+                self.startup_failed = not self._startup_done.is_set()
+                self.error_message = str(exc)
+        finally:
+            if not self._startup_done.is_set():
+                # The app returned without answering: it doesn't do lifespan
+                self.supported = False
+                if self.mode == "on" and not self.startup_failed:
+                    self.startup_failed = True
+                    self.error_message = "application does not support lifespan"
+            self._startup_done.set()
+            self._shutdown_done.set()
+
+    async def _send(self, message: dict) -> None:
+        message_type = message["type"]
+        if message_type in ("lifespan.startup.complete", "lifespan.startup.failed"):
+            self.startup_failed = message_type.endswith("failed")
+            self.error_message = message.get("message", "")
+            self._startup_done.set()
+        elif message_type in ("lifespan.shutdown.complete", "lifespan.shutdown.failed"):
+            self.shutdown_failed = message_type.endswith("failed")
+            self.error_message = message.get("message", "")
+            self._shutdown_done.set()
+
+
+class HTTPServer:
+    """
+    Minimal asyncio HTTP/1.1 server hosting an ASGI application
+
+    Args:
+        app: ASGI application (usually a nasirpy App)
+        host: Interface to bind
+        port: Port to bind
+        workers: Number of worker processes; 1 serves in the current process
+        backlog: Listen backlog passed to ``listen()``
+        keep_alive_timeout: Seconds an idle keep-alive connection stays open
+        max_requests: Recycle a worker after it served this many requests (0 disables)
+        max_requests_jitter: Random extra requests added per worker so they don't all restart together
+        graceful_timeout: Seconds to wait for in-flight requests when stopping
+        reuse_port: Bind one ``SO_REUSEPORT`` socket per worker (defaults to True on Linux)
+        http_parser: "httptools", "python", or "auto" to use httptools when installed
+        lifespan: "on", "off", or "auto" to run the ASGI lifespan protocol if the app supports it
+    """
+
+    def __init__(
+        self,
+        app: Callable,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        workers: int = 1,
+        backlog: int = 2048,
+        keep_alive_timeout: float = 5.0,
+        max_requests: int = 0,
+        max_requests_jitter: int = 0,
+        graceful_timeout: float = 30.0,
+        reuse_port: Optional[bool] = None,
+        http_parser: str = "auto",
+        lifespan: str = "auto",
+    ):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.backlog = backlog
+        self.keep_alive_timeout = keep_alive_timeout
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        if reuse_port is None:
+            reuse_port = sys.platform.startswith("linux") and hasattr(socket, "SO_REUSEPORT")
+        self.reuse_port = reuse_port
+        self.lifespan = lifespan
+        if http_parser == "auto":
+            http_parser = "httptools" if httptools is not None else "python"
+        if http_parser == "httptools":
+            if httptools is None:
+                raise RuntimeError("http_parser='httptools' requires the httptools package")
+            self.parser_class = HttptoolsParser
+        elif http_parser == "python":
+            self.parser_class = HTTPParser
+        else:
+            raise ValueError(f"Unknown http_parser: {http_parser!r}")
+
+        self.requests_served = 0
+        self.sockets: List[socket.socket] = []
+        self._request_limit = 0
+        self._stop_event: Optional[asyncio.Event] = None
+        self._started_event: Optional[asyncio.Event] = None
+        self._protocols: Set[HTTPProtocol] = set()
+
+        # Master process state
+        self._worker_pids: Set[int] = set()
+        self._retiring_pids: Set[int] = set()
+        self._reload_requested = False
+        self._stop_requested = False
+        self._recycling = False
+        self._notify_fds: Optional[Tuple[int, int]] = None
+        self._replacing: Dict[int, int] = {}
+
+    # Socket setup
+
+    def create_socket(self, reuse_port: bool = False) -> socket.socket:
+        """Create, bind and listen on the server socket"""
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.backlog)
+        sock.setblocking(False)
+        sock.set_inheritable(True)
+        return sock
+
+    # Single-process serving
+
+    async def serve(self, sock: Optional[socket.socket] = None) -> None:
+        """
+        Accept connections until shutdown() is called
+
+        Args:
+            sock: Listening socket to use; one is created if not given
+        """
+        self._stop_event = asyncio.Event()
+        self._started_event = self._started_event or asyncio.Event()
+        self._recycling = False
+        self._request_limit = 0
+        if self.max_requests > 0:
+            self._request_limit = self.max_requests + random.randint(0, self.max_requests_jitter)
+
+        lifespan = None
+        if self.lifespan != "off":
+            # Startup hooks run before the socket is served so the first
+            # request already sees open pools and compiled routes.
+            lifespan = LifespanCycle(self.app, self.lifespan)
+            await lifespan.startup()
+
+        if sock is None:
+            sock = self.create_socket(reuse_port=self.reuse_port and self.workers > 1)
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(lambda: HTTPProtocol(self), sock=sock)
+        self.sockets = list(server.sockets)
+        self._started_event.set()
+        self._notify_master(b"ready")
+
+        await self._stop_event.wait()
+
+        # Stop accepting, drop idle keep-alive connections, let in-flight requests finish
+        server.close()
+        for protocol in list(self._protocols):
+            protocol.shutdown()
+        deadline = loop.time() + self.graceful_timeout
+        while self._protocols and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        for protocol in list(self._protocols):
+            protocol.transport.abort()
+        await server.wait_closed()
+        if lifespan is not None:
+            await lifespan.shutdown()
+
+    async def wait_started(self) -> None:
+        """Wait until serve() is accepting connections"""
+        if self._started_event is None:
+            self._started_event = asyncio.Event()
+        await self._started_event.wait()
+
+    def shutdown(self) -> None:
+        """Begin a graceful shutdown of serve()"""
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    def _recycle(self) -> None:
+        """Retire this process after reaching max_requests"""
+        if self._recycling:
+            return
+        self._recycling = True
+        logger.info("Worker %d served %d requests, recycling", os.getpid(), self.requests_served)
+        if self._notify_fds is None:
+            self.shutdown()
+        else:
+            # Keep accepting until the master has a replacement listening
+            # and sends SIGTERM, so no connections are refused meanwhile.
+            self._notify_master(b"recycle")
+
+    def _will_recycle(self) -> bool:
+        """Whether the request about to run is the last one this process serves"""
+        return self._recycling or bool(
+            self._request_limit and self.requests_served + 1 >= self._request_limit
+        )
+
+    def _request_finished(self) -> None:
+        self.requests_served += 1
+        if self._request_limit and self.requests_served >= self._request_limit:
+            self._recycle()
+
+    def _notify_master(self, event: bytes) -> None:
+        if self._notify_fds is not None:
+            os.write(self._notify_fds[1], b"%s %d\n" % (event, os.getpid()))
+
+    # Multi-process serving
+
+    def run(self) -> None:
+        """Serve until interrupted, pre-forking workers if configured"""
+        if self.workers == 1:
+            self._run_worker(self.create_socket())
+        else:
+            self._run_master()
+
+    def _run_worker(self, sock: Optional[socket.socket]) -> None:
+        async def main():
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(sig, self.shutdown)
+            await self.serve(sock)
+
+        try:
+            asyncio.run(main())
+        finally:
+            shutdown_executors()
+
+    def _spawn_worker(self, sock: Optional[socket.socket]) -> int:
+        pid = os.fork()
+        if pid:
+            self._worker_pids.add(pid)
+            return pid
+
+        # Child process
+        exit_code = 0
+        try:
+            os.close(self._notify_fds[0])
+            for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, signal.SIG_DFL)
+            if sock is None:
+                sock = self.create_socket(reuse_port=True)
+            logger.info("Worker %d listening on %s:%d", os.getpid(), self.host, self.port)
+            self._run_worker(sock)
+        except Exception:
+            logger.exception("Worker %d crashed", os.getpid())
+            exit_code = 1 if self.requests_served else WORKER_BOOT_ERROR
+        finally:
+            os._exit(exit_code)
+
+    def _run_master(self) -> None:
+        """
+        Supervise worker processes
+
+        Workers report over a pipe when they are accepting ("ready") and
+        when they reach max_requests ("recycle"). A recycling worker keeps
+        serving until its replacement is ready and only then gets SIGTERM.
+        SIGHUP replaces every worker the same way; SIGTERM/SIGINT stop
+        everything. Workers that exit unexpectedly are restarted.
+        """
+        shared_sock = None if self.reuse_port else self.create_socket()
+        self._notify_fds = os.pipe()
+        notify_buffer = b""
+
+        def request_reload(signum, frame):
+            self._reload_requested = True
+
+        def request_stop(signum, frame):
+            self._stop_requested = True
+
+        signal.signal(signal.SIGHUP, request_reload)
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        logger.info("Master %d starting %d workers on %s:%d", os.getpid(), self.workers, self.host, self.port)
+        for _ in range(self.workers):
+            self._spawn_worker(shared_sock)
+
+        while not self._stop_requested:
+            if self._reload_requested:
+                self._reload_requested = False
+                for pid in self._worker_pids - self._retiring_pids:
+                    self._replace_worker(pid, shared_sock)
+
+            readable, _, _ = select.select([self._notify_fds[0]], [], [], 0.1)
+            if readable:
+                notify_buffer += os.read(self._notify_fds[0], 4096)
+                *lines, notify_buffer = notify_buffer.split(b"\n")
+                for line in lines:
+                    event, _, pid = line.partition(b" ")
+                    pid = int(pid)
+                    if event == b"recycle" and pid not in self._retiring_pids:
+                        self._replace_worker(pid, shared_sock)
+                    elif event == b"ready" and pid in self._replacing:
+                        self._signal_workers({self._replacing.pop(pid)}, signal.SIGTERM)
+
+            for pid in self._reap_workers():
+                self._retiring_pids.discard(pid)
+                for new_pid, old_pid in list(self._replacing.items()):
+                    if pid in (new_pid, old_pid):
+                        del self._replacing[new_pid]
+                        if pid == new_pid:
+                            # Replacement died before becoming ready; retire the old one anyway
+                            self._signal_workers({old_pid}, signal.SIGTERM)
+            while len(self._worker_pids - self._retiring_pids) < self.workers:
+                self._spawn_worker(shared_sock)
+
+        self._signal_workers(self._worker_pids, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self._worker_pids and time.monotonic() < deadline:
+            self._reap_workers()
+            time.sleep(0.1)
+        self._signal_workers(self._worker_pids, signal.SIGKILL)
+        while self._worker_pids:
+            pid, _ = os.waitpid(-1, 0)
+            self._worker_pids.discard(pid)
+        for fd in self._notify_fds:
+            os.close(fd)
+
+    def _replace_worker(self, pid: int, sock: Optional[socket.socket]) -> None:
+        """Start a replacement for pid; pid is stopped once the replacement is ready"""
+        self._retiring_pids.add(pid)
+        self._replacing[self._spawn_worker(sock)] = pid
+
+    def _reap_workers(self) -> List[int]:
+        exited = []
+        while self._worker_pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._worker_pids.clear()
+                break
+            if pid == 0:
+                break
+            self._worker_pids.discard(pid)
+            if os.WIFEXITED(status) and os.WEXITSTATUS(status) == WORKER_BOOT_ERROR:
+                # Restarting would just fail again (e.g. a startup hook raised)
+                logger.error("Worker %d failed to boot, stopping", pid)
+                self._stop_requested = True
+            exited.append(pid)
+        return exited
+
+    @staticmethod
+    def _signal_workers(pids: Set[int], sig: int) -> None:
+        for pid in list(pids):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+
+def run(app: Callable, host: str = "127.0.0.1", port: int = 8000, **kwargs) -> None:
+    """
+    Run an ASGI app on the built-in server
+
+    Args:
+        app: ASGI application (usually a nasirpy App)
+        host: Interface to bind
+        port: Port to bind
+        **kwargs: Additional HTTPServer options (workers, max_requests, ...)
+    """
+    HTTPServer(app, host=host, port=port, **kwargs).run()
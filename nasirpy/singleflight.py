@@ -0,0 +1,152 @@
+"""
+Request coalescing (single-flight)
+
+When many identical GETs arrive while the first is still being handled,
+only that first one runs the handler; the rest wait for its Response and
+each gets a copy of it. A cache miss on a popular resource then costs one
+trip to the database instead of hundreds.
+
+    @app.get("/products/{product_id}")
+    @single_flight(query=["currency"], headers=["accept-language"])
+    async def product(request):
+        ...
+
+Requests are identical when they share the method, the path, the chosen
+query parameters (all of the query string by default) and the chosen
+headers. Only GET and HEAD are coalesced. Anything that changes the
+response, such as the user behind an ``Authorization`` header, must be
+part of the key.
+
+Each waiter gets its own copy of the status and headers, so middleware
+changing one response doesn't affect the others. The body bytes are
+shared. Background tasks attached to the response run once, with the
+request that ran the handler. Exceptions reach every waiter. Streaming and
+file responses can't be shared, so waiters that get one run the handler
+themselves.
+
+The handler runs with the first request. If that request is cancelled
+while others are waiting, the handler keeps running for them; it is
+cancelled only once nobody is waiting. ``get_single_flight(handler)``
+returns the SingleFlight, whose ``executions`` and ``coalesced`` counters
+show how much work was saved.
+"""
+import asyncio
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from .request import Request
+from .response import CaseInsensitiveDict, Response
+
+_COALESCED_METHODS = frozenset(("GET", "HEAD"))
+
+
+class SingleFlight:
+    """
+    Share one handler call between identical concurrent requests
+
+    Args:
+        query: Query parameters in the key (None for the whole query string)
+        headers: Header names in the key
+
+    Attributes:
+        executions: Handler calls made
+        coalesced: Requests answered with another request's response
+    """
+
+    def __init__(self, query: Optional[Iterable[str]] = None, headers: Iterable[str] = ()):
+        self.query = tuple(query) if query is not None else None
+        self.headers = tuple(name.lower() for name in headers)
+        self.executions = 0
+        self.coalesced = 0
+        self._calls: Dict[Tuple, "_Call"] = {}
+
+    @property
+    def in_flight(self) -> int:
+        """Distinct keys whose handler is running"""
+        return len(self._calls)
+
+    def key(self, request: Request) -> Tuple:
+        if self.query is None:
+            query = request.scope.get("query_string", b"")
+        else:
+            params = request.query_params
+            query = tuple(tuple(params.getlist(name)) for name in self.query)
+        headers = request.headers
+        return (request.method, request.path, query, tuple(tuple(headers.getlist(name)) for name in self.headers))
+
+    def wrap(self, endpoint: Callable) -> Callable:
+        """Coalesce concurrent identical calls to an endpoint coroutine function"""
+        async def coalesced(request: Request) -> Response:
+            if request.method not in _COALESCED_METHODS:
+                return await endpoint(request)
+            key = self.key(request)
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                self.executions += 1
+                call = self._calls[key] = _Call(asyncio.ensure_future(endpoint(request)))
+                call.task.add_done_callback(lambda _: self._forget(key, call))
+            else:
+                self.coalesced += 1
+
+            call.waiters += 1
+            try:
+                # Shielded: one waiter being cancelled mustn't cancel the call for the rest
+                response = await asyncio.shield(call.task)
+            finally:
+                call.waiters -= 1
+                if call.waiters == 0 and not call.task.done():
+                    # Nobody is left to answer; a new request starts afresh
+                    self._forget(key, call)
+                    call.task.cancel()
+
+            if type(response) is not Response:
+                if leader:
+                    return response
+                # Streams and files can only be sent once
+                self.coalesced -= 1
+                self.executions += 1
+                return await endpoint(request)
+            return _copy(response, leader)
+        return coalesced
+
+    def _forget(self, key: Tuple, call: "_Call") -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+def _copy(response: Response, keep_background: bool) -> Response:
+    copy = Response.__new__(Response)
+    copy.status_code = response.status_code
+    copy.body = response.body
+    copy.background = response.background if keep_background else None
+    headers = copy.headers = CaseInsensitiveDict()
+    dict.update(headers, response.headers)
+    # The encoded block is never mutated, so it can be shared
+    headers._encoded = response.headers._encoded
+    return copy
+
+
+def single_flight(query: Optional[Iterable[str]] = None, headers: Iterable[str] = ()) -> Callable[[Callable], Callable]:
+    """
+    Coalesce identical concurrent GET/HEAD requests to a route handler
+
+    Args:
+        query: Query parameters that distinguish requests (None for all of them)
+        headers: Header names that distinguish requests
+    """
+    def decorator(handler: Callable) -> Callable:
+        handler._nasirpy_single_flight = SingleFlight(query, headers)
+        return handler
+    return decorator
+
+
+def get_single_flight(handler: Callable) -> Optional[SingleFlight]:
+    return getattr(handler, "_nasirpy_single_flight", None)
@@ -0,0 +1,253 @@
+"""
+Server-Sent Events
+
+An EventSourceResponse streams events from an async iterator to a browser
+``EventSource``:
+
+    @app.get("/jobs/{job_id}/progress")
+    async def progress(job_id: str):
+        async def events():
+            async for percent in watch_job(job_id):
+                yield ServerSentEvent({"percent": percent}, event="progress")
+        return EventSourceResponse(events(), ping=15)
+
+The iterator may yield ServerSentEvent objects, already-encoded ``bytes``
+(passed through untouched) or plain values, which become the ``data`` of
+an unnamed event (strings as-is, anything else as JSON). When no event has
+been sent for ``ping`` seconds a comment line is sent, which keeps proxies
+and load balancers from closing the idle connection. The stream stops,
+and the iterator's ``finally`` blocks run, once the client disconnects.
+
+EventPublisher shares one stream of updates between many clients: each
+published event is encoded once, and the same bytes go into every
+subscriber's bounded queue without waiting. A subscriber that falls
+``max_queue`` events behind loses its oldest pending event.
+
+    prices = EventPublisher()
+
+    @app.get("/prices")
+    async def stream_prices(request):
+        return prices.response()
+
+    prices.publish({"symbol": "ACME", "price": 42}, event="price")
+"""
+import asyncio
+import json
+from collections import deque
+from typing import Any, AsyncIterable, AsyncIterator, Deque, Dict, Optional, Set
+
+from .background import BackgroundTasks
+from .response import EncodedHeaders, StreamingResponse
+from .serialization import default
+
+PING = b": ping\n\n"
+
+_HEADERS = EncodedHeaders({
+    "content-type": "text/event-stream; charset=utf-8",
+    "cache-control": "no-cache",
+    # Stop nginx from buffering the stream
+    "x-accel-buffering": "no",
+})
+
+
+class ServerSentEvent:
+    """
+    One event in an event stream
+
+    Attributes:
+        data: Event payload; strings are sent as-is, anything else as JSON
+        event: Event type, dispatched to ``addEventListener(event, ...)``
+        id: Sets the client's ``Last-Event-ID`` for reconnects
+        retry: Reconnection delay for the client, in milliseconds
+        comment: A comment line, ignored by clients
+    """
+
+    __slots__ = ("data", "event", "id", "retry", "comment")
+
+    def __init__(
+        self,
+        data: Any = None,
+        event: Optional[str] = None,
+        id: Optional[str] = None,
+        retry: Optional[int] = None,
+        comment: Optional[str] = None,
+    ):
+        self.data = data
+        self.event = event
+        self.id = id
+        self.retry = retry
+        self.comment = comment
+
+    def encode(self) -> bytes:
+        lines = []
+        if self.comment is not None:
+            lines.extend(f": {line}" for line in self.comment.splitlines())
+        if self.event is not None:
+            lines.append(f"event: {self.event}")
+        if self.id is not None:
+            lines.append(f"id: {self.id}")
+        if self.retry is not None:
+            lines.append(f"retry: {self.retry}")
+        if self.data is not None:
+            data = self.data if isinstance(self.data, str) else json.dumps(self.data, default=default)
+            # Multi-line data is one "data:" field per line
+            lines.extend(f"data: {line}" for line in data.split("\n"))
+        return ("\n".join(lines) + "\n\n").encode()
+
+
+def encode_event(item: Any) -> bytes:
+    """Encode one item yielded to an EventSourceResponse"""
+    if isinstance(item, bytes):
+        return item
+    if isinstance(item, ServerSentEvent):
+        return item.encode()
+    return ServerSentEvent(item).encode()
+
+
+class EventSourceResponse(StreamingResponse):
+    """
+    Stream Server-Sent Events from an async iterator
+
+    Args:
+        content: Async iterator of events
+        ping: Seconds without an event before a heartbeat comment is sent
+            (None disables heartbeats)
+        status_code: HTTP status code
+        headers: Extra headers
+        background: Tasks to run after the stream ends
+    """
+
+    __slots__ = ()
+
+    def __init__(
+        self,
+        content: AsyncIterable[Any],
+        ping: Optional[float] = 15.0,
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+        background: Optional[BackgroundTasks] = None,
+    ):
+        super().__init__(_events(content, ping), status_code, background=background)
+        self.headers.update_encoded(_HEADERS)
+        if headers:
+            self.headers.update(headers)
+
+
+async def _events(content: AsyncIterable[Any], ping: Optional[float]) -> AsyncIterator[bytes]:
+    iterator = content.__aiter__()
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            # Wait for the next event without cancelling it when a ping is due
+            done, _ = await asyncio.wait((pending,), timeout=ping)
+            if not done:
+                yield PING
+                continue
+            future, pending = pending, None
+            try:
+                item = future.result()
+            except StopAsyncIteration:
+                return
+            yield encode_event(item)
+    finally:
+        if pending is not None:
+            # Let the cancellation reach the iterator before closing it
+            pending.cancel()
+            await asyncio.wait((pending,))
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+class EventPublisher:
+    """
+    Publish events to every connected EventSource client
+
+    Args:
+        max_queue: Events buffered per subscriber before the oldest is dropped
+    """
+
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self.subscribers: Set["_Subscriber"] = set()
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self.subscribers)
+
+    def subscribe(self) -> "_Subscriber":
+        """
+        An async iterator of encoded events, registered immediately
+
+        Events published after this call are delivered even if iteration
+        starts later. Closing the iterator (``aclose``) unsubscribes.
+        """
+        subscriber = _Subscriber(self)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def response(self, ping: Optional[float] = 15.0, **kwargs: Any) -> EventSourceResponse:
+        """
+        An EventSourceResponse streaming this publisher's events
+
+        The client is subscribed when the response starts streaming, so a
+        response that is never sent (or fails before its first event)
+        doesn't stay registered. Events published before then are not sent.
+        """
+        return EventSourceResponse(_Subscriber(self, lazy=True), ping=ping, **kwargs)
+
+    def publish(self, data: Any = None, event: Optional[str] = None, id: Optional[str] = None) -> int:
+        """
+        Encode an event once and queue it for every subscriber without awaiting
+
+        Returns:
+            Number of subscribers the event was queued for
+        """
+        message = data.encode() if isinstance(data, ServerSentEvent) else ServerSentEvent(data, event, id).encode()
+        for subscriber in self.subscribers:
+            if subscriber.put(message):
+                self.dropped += 1
+        return len(self.subscribers)
+
+
+class _Subscriber:
+    __slots__ = ("publisher", "queue", "waiter", "lazy")
+
+    def __init__(self, publisher: EventPublisher, lazy: bool = False):
+        self.publisher = publisher
+        self.queue: Deque[bytes] = deque(maxlen=publisher.max_queue)
+        self.waiter: Optional[asyncio.Future] = None
+        # Register with the publisher on the first __anext__
+        self.lazy = lazy
+
+    def put(self, message: bytes) -> bool:
+        """Queue a message; True if the oldest one was dropped to make room"""
+        dropped = len(self.queue) == self.queue.maxlen
+        self.queue.append(message)
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+        return dropped
+
+    def __aiter__(self) -> "_Subscriber":
+        return self
+
+    async def __anext__(self) -> bytes:
+        if self.lazy:
+            self.lazy = False
+            self.publisher.subscribers.add(self)
+        while not self.queue:
+            if self not in self.publisher.subscribers:
+                raise StopAsyncIteration
+            self.waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self.waiter
+            finally:
+                self.waiter = None
+        return self.queue.popleft()
+
+    async def aclose(self) -> None:
+        self.lazy = False
+        self.publisher.subscribers.discard(self)
+        self.queue.clear()
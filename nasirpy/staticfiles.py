@@ -0,0 +1,301 @@
+"""
+Static file serving
+
+    router = Router()
+    router.static("/assets", "public", cache_control="public, max-age=3600")
+
+or, to register it yourself (``{path:path}`` matches the rest of the URL):
+
+    assets = StaticFiles("public")
+    app.route("/assets/{path:path}", methods=["GET", "HEAD"])(assets)
+
+A requested path is resolved inside ``directory`` and refused (404) if it
+ends up anywhere else, including through ``..`` segments or symlinks that
+point outside it. Each resolved file's ``stat`` result, its pre-encoded
+headers and, for files up to ``max_cached_file_size``, its contents are
+kept in a bounded LRU cache. A file is re-checked at most every
+``stat_ttl`` seconds, so a cache hit costs no system calls. The cache holds
+at most ``max_entries`` files and ``max_cache_bytes`` of contents.
+
+Larger files are sent as FileResponses: through the server's ``sendfile``
+when it supports the ASGI pathsend extension, otherwise as slices of a
+memory map.
+
+Responses carry ``ETag`` and ``Last-Modified``. ``If-None-Match`` and
+``If-Modified-Since`` are answered with 304. A single ``Range`` is answered
+with 206, subject to ``If-Range``, and an unsatisfiable one with 416.
+Requests for several ranges get the whole file.
+"""
+import mimetypes
+import os
+import stat
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from .concurrency import run_in_threadpool
+from .exceptions import HTTPException, MethodNotAllowedError, NotFoundError
+from .request import Request
+from .response import EncodedHeaders, FileResponse, Response
+
+
+class _File:
+    """A cache entry: one resolved file and its encoded headers"""
+
+    __slots__ = ("path", "size", "version", "etag", "last_modified", "mtime",
+                 "media_type", "headers", "validators", "body", "checked")
+
+    def __init__(self, path: str, st: os.stat_result, media_type: str, cache_control: Optional[str]):
+        self.path = path
+        self.size = st.st_size
+        self.version = (st.st_mtime_ns, st.st_size, st.st_ino)
+        self.etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        self.last_modified = formatdate(st.st_mtime, usegmt=True)
+        self.mtime = int(st.st_mtime)
+        self.media_type = media_type
+        validators = {"etag": self.etag, "last-modified": self.last_modified, "accept-ranges": "bytes"}
+        if cache_control is not None:
+            validators["cache-control"] = cache_control
+        # Sent with 304s, which must repeat the validators but carry no body
+        self.validators = EncodedHeaders(validators)
+        self.headers = EncodedHeaders(
+            {"content-type": media_type, "content-length": str(st.st_size), **validators}
+        )
+        self.body: Optional[bytes] = None
+        self.checked = time.monotonic()
+
+
+class StaticFiles:
+    """
+    Serve files from a directory
+
+    Args:
+        directory: Directory to serve
+        index: File served for a directory path (None to answer 404)
+        cache_control: Cache-Control header for every file
+        max_entries: Files whose metadata is cached
+        max_cached_file_size: Largest file whose contents are cached
+        max_cache_bytes: Total size of cached contents
+        stat_ttl: Seconds before a cached file is checked for changes
+        chunk_size: Bytes per body message for files that aren't cached
+        pathsend: Use the server's pathsend extension when it has one
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        index: Optional[str] = "index.html",
+        cache_control: Optional[str] = None,
+        max_entries: int = 1024,
+        max_cached_file_size: int = 64 * 1024,
+        max_cache_bytes: int = 32 * 1024 * 1024,
+        stat_ttl: float = 1.0,
+        chunk_size: int = 256 * 1024,
+        pathsend: bool = True,
+    ):
+        self.directory = os.path.realpath(directory)
+        if not os.path.isdir(self.directory):
+            raise ValueError(f"Static directory does not exist: {directory!r}")
+        self.index = index
+        self.cache_control = cache_control
+        self.max_entries = max_entries
+        self.max_cached_file_size = max_cached_file_size
+        self.max_cache_bytes = max_cache_bytes
+        self.stat_ttl = stat_ttl
+        self.chunk_size = chunk_size
+        self.pathsend = pathsend
+        self.cache_bytes = 0
+        self._cache: "OrderedDict[str, _File]" = OrderedDict()
+
+    async def __call__(self, request: Request) -> Response:
+        if request.method not in ("GET", "HEAD"):
+            raise MethodNotAllowedError(["GET", "HEAD"])
+        entry = await self.lookup(request.path_params.get("path", ""))
+        if entry is None:
+            raise NotFoundError()
+        return self.respond(request, entry)
+
+    async def lookup(self, path: str) -> Optional[_File]:
+        """The cache entry for a request path, or None if there's no such file"""
+        entry = self._cache.get(path)
+        if entry is not None:
+            if time.monotonic() - entry.checked < self.stat_ttl:
+                self._cache.move_to_end(path)
+                return entry
+        # Resolving, stat and read can block on disk, so they run in the thread pool
+        fresh = await run_in_threadpool(self._load, path, entry)
+        if fresh is not entry:
+            self._evict(path)
+            if fresh is not None:
+                self._store(path, fresh)
+        return fresh
+
+    def respond(self, request: Request, entry: _File) -> Response:
+        """Build the 200, 206 or 304 response for a file"""
+        headers = request.headers
+        if self._not_modified(headers.get("if-none-match"), headers.get("if-modified-since"), entry):
+            return Response.from_encoded(b"", 304, headers=entry.validators)
+
+        byte_range = headers.get("range")
+        if byte_range is not None:
+            if_range = headers.get("if-range")
+            if if_range is None or if_range in (entry.etag, entry.last_modified):
+                span = parse_range(byte_range, entry.size)
+                if span is not None:
+                    return self._partial(entry, *span, head=request.method == "HEAD")
+
+        if request.method == "HEAD":
+            # The GET headers, Content-Length included, without opening the file
+            return Response.from_encoded(b"", headers=entry.headers)
+        if entry.body is not None:
+            return Response.from_encoded(entry.body, headers=entry.headers)
+        response = FileResponse(
+            entry.path,
+            media_type=entry.media_type,
+            count=entry.size,
+            chunk_size=self.chunk_size,
+            pathsend=self.pathsend and "http.response.pathsend" in request.scope.get("extensions", ()),
+        )
+        response.headers.update_encoded(entry.headers)
+        return response
+
+    def _partial(self, entry: _File, start: int, end: int, head: bool = False) -> Response:
+        count = end - start + 1
+        if head or entry.body is not None:
+            body = b"" if head else entry.body[start:end + 1]
+            response = Response.from_encoded(body, 206, headers=entry.validators)
+            response.headers["content-type"] = entry.media_type
+            response.headers["content-length"] = str(count)
+        else:
+            response = FileResponse(entry.path, 206, media_type=entry.media_type,
+                                    offset=start, count=count, chunk_size=self.chunk_size)
+            response.headers.update_encoded(entry.validators)
+        response.headers["content-range"] = f"bytes {start}-{end}/{entry.size}"
+        return response
+
+    @staticmethod
+    def _not_modified(if_none_match: Optional[str], if_modified_since: Optional[str], entry: _File) -> bool:
+        if if_none_match is not None:
+            # If-None-Match takes precedence; weak comparison per RFC 9110
+            if if_none_match.strip() == "*":
+                return True
+            for tag in if_none_match.split(","):
+                tag = tag.strip()
+                if tag.startswith("W/"):
+                    tag = tag[2:]
+                if tag == entry.etag:
+                    return True
+            return False
+        if if_modified_since is not None:
+            if if_modified_since == entry.last_modified:
+                return True
+            try:
+                return entry.mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _load(self, path: str, entry: Optional[_File]) -> Optional[_File]:
+        full_path = self._resolve(path)
+        if full_path is None:
+            return None
+        try:
+            st = os.stat(full_path)
+            if stat.S_ISDIR(st.st_mode):
+                if self.index is None:
+                    return None
+                full_path = os.path.join(full_path, self.index)
+                st = os.stat(full_path)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+
+        if entry is not None and entry.path == full_path and entry.version == (st.st_mtime_ns, st.st_size, st.st_ino):
+            # Unchanged; only the check time moves
+            entry.checked = time.monotonic()
+            return entry
+
+        fresh = _File(full_path, st, _guess_type(full_path), self.cache_control)
+        if st.st_size <= self.max_cached_file_size:
+            try:
+                with open(full_path, "rb") as file:
+                    fresh.body = file.read()
+            except OSError:
+                return None
+            if len(fresh.body) != fresh.size:
+                # Changed while being read; serve it from disk until it settles
+                fresh.body = None
+        return fresh
+
+    def _resolve(self, path: str) -> Optional[str]:
+        if "\x00" in path:
+            return None
+        full_path = os.path.realpath(os.path.join(self.directory, path))
+        if full_path != self.directory and not full_path.startswith(self.directory + os.sep):
+            return None
+        return full_path
+
+    def _store(self, path: str, entry: _File) -> None:
+        self._cache[path] = entry
+        if entry.body is not None:
+            self.cache_bytes += entry.size
+        while len(self._cache) > self.max_entries or self.cache_bytes > self.max_cache_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            if evicted.body is not None:
+                self.cache_bytes -= evicted.size
+
+    def _evict(self, path: str) -> None:
+        evicted = self._cache.pop(path, None)
+        if evicted is not None and evicted.body is not None:
+            self.cache_bytes -= evicted.size
+
+
+def parse_range(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``Range: bytes=...`` header into inclusive (start, end)
+
+    Returns None for headers that should be ignored (malformed, other
+    units or several ranges). Raises HTTPException(416) when the range
+    lies outside the file.
+    """
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if start < 0 or (last and int(last) < start):
+                return None
+        else:
+            # "bytes=-500" is the last 500 bytes
+            suffix = int(last)
+            if suffix < 0:
+                return None
+            start, end = max(0, size - suffix), size - 1
+            if suffix == 0:
+                start = size
+    except ValueError:
+        return None
+    if start >= size:
+        raise HTTPException(416, headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+_TYPES: Dict[str, str] = {}
+
+
+def _guess_type(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    media_type = _TYPES.get(extension)
+    if media_type is None:
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if media_type.startswith("text/"):
+            media_type += "; charset=utf-8"
+        media_type = _TYPES[extension] = media_type
+    return media_type
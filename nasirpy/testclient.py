@@ -0,0 +1,437 @@
+"""
+In-process test client and load harness
+
+TestClient calls an ASGI app directly, with no server or sockets, but
+with the same message flow a server produces. Request bodies can be split
+into chunks, ``receive`` reports ``http.disconnect`` only once the response
+is complete (or when a simulated disconnect is due), and each response
+keeps its body chunks for checking streaming.
+
+    async with TestClient(app) as client:        # runs lifespan startup/shutdown
+        response = await client.get("/users/1", query={"verbose": "1"})
+        assert response.status_code == 200
+        assert response.json() == {"id": 1}
+
+        response = await client.get("/events", disconnect_after=0.5)
+        assert response.disconnected
+
+``load`` fires many concurrent requests at the app to reproduce contention
+(rate limiting, caches, admission control) and reports throughput, latency
+percentiles and the error rate:
+
+    report = await client.load(
+        [(9, {"path": "/users/1"}), (1, {"method": "POST", "path": "/users", "json": {...}})],
+        requests=5000,
+        concurrency=100,
+    )
+    print(report)
+"""
+import asyncio
+import json as json_module
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import unquote, urlencode
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+class TestResponse:
+    """
+    What the app sent for one request
+
+    Attributes:
+        status_code: Response status
+        raw_headers: Header pairs as sent
+        headers: Header values by lowercase name (the last one wins)
+        body: The whole body
+        chunks: The body as it was sent, one entry per body message
+        disconnected: True when the client disconnected before the response finished
+        elapsed: Seconds from the first message to the app returning
+    """
+
+    __test__ = False  # not a pytest test class
+
+    def __init__(self):
+        self.status_code: Optional[int] = None
+        self.raw_headers: Headers = []
+        self.headers: Dict[str, str] = {}
+        self.chunks: List[bytes] = []
+        self.disconnected = False
+        self.elapsed = 0.0
+
+    @property
+    def body(self) -> bytes:
+        return b"".join(self.chunks)
+
+    @property
+    def text(self) -> str:
+        return self.body.decode()
+
+    def json(self) -> Any:
+        return json_module.loads(self.body)
+
+    def __repr__(self) -> str:
+        return f"<TestResponse {self.status_code}>"
+
+
+class TestClient:
+    """
+    Drive an ASGI app in-process
+
+    Args:
+        app: The ASGI application
+        headers: Headers sent with every request
+        client: The ``client`` address put in the scope
+        raise_app_exceptions: Re-raise exceptions that escape the app. When
+            False, a request that fails before the response starts gets a
+            500, and one that fails later returns what was sent so far
+            (``load`` always counts exceptions as errors)
+    """
+
+    __test__ = False  # not a pytest test class
+
+    def __init__(
+        self,
+        app: Callable,
+        headers: Optional[Dict[str, str]] = None,
+        client: Tuple[str, int] = ("testclient", 50000),
+        raise_app_exceptions: bool = True,
+    ):
+        self.app = app
+        self.headers = {"host": "testserver", "user-agent": "testclient", **(headers or {})}
+        self.client = client
+        self.raise_app_exceptions = raise_app_exceptions
+        self._lifespan: Optional[asyncio.Task] = None
+        self._lifespan_receive: Optional[asyncio.Queue] = None
+        self._lifespan_send: Optional[asyncio.Queue] = None
+
+    # Lifespan
+
+    async def __aenter__(self) -> "TestClient":
+        await self.startup()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.shutdown()
+
+    async def startup(self) -> None:
+        """Send ``lifespan.startup`` and wait for the app to finish starting"""
+        self._lifespan_receive, self._lifespan_send = asyncio.Queue(), asyncio.Queue()
+        scope = {"type": "lifespan", "asgi": {"version": "3.0", "spec_version": "2.0"}}
+        self._lifespan = asyncio.ensure_future(
+            self.app(scope, self._lifespan_receive.get, self._lifespan_send.put)
+        )
+        await self._lifespan_step("lifespan.startup")
+
+    async def shutdown(self) -> None:
+        """Send ``lifespan.shutdown`` and wait for the app to finish shutting down"""
+        if self._lifespan is None:
+            return
+        try:
+            await self._lifespan_step("lifespan.shutdown")
+            await self._lifespan
+        finally:
+            self._lifespan = None
+
+    async def _lifespan_step(self, message_type: str) -> None:
+        await self._lifespan_receive.put({"type": message_type})
+        reply = asyncio.ensure_future(self._lifespan_send.get())
+        await asyncio.wait((reply, self._lifespan), return_when=asyncio.FIRST_COMPLETED)
+        if not reply.done():
+            reply.cancel()
+            # The app returned (or raised) without answering
+            self._lifespan.result()
+            raise RuntimeError(f"App exited during {message_type}")
+        message = reply.result()
+        if message["type"] == f"{message_type}.failed":
+            raise RuntimeError(message.get("message", f"{message_type} failed"))
+
+    # Requests
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        query: Optional[Union[str, Dict[str, Any], Sequence[Tuple[str, Any]]]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        body: Optional[Union[bytes, str]] = None,
+        json: Any = None,
+        form: Optional[Dict[str, Any]] = None,
+        chunk_size: Optional[int] = None,
+        disconnect_after: Optional[float] = None,
+    ) -> TestResponse:
+        """
+        Send one request and collect the response
+
+        Args:
+            method: HTTP method
+            path: Request path, optionally with a query string
+            query: Query parameters (a string, dict or list of pairs)
+            headers: Extra headers for this request
+            body: Raw request body
+            json: Body to send as JSON
+            form: Body to send URL-encoded
+            chunk_size: Split the body into messages of this size
+            disconnect_after: Seconds after which the client disconnects,
+                as seen through ``receive``
+
+        Returns:
+            The TestResponse
+        """
+        scope, chunks = self._build(method, path, query, headers, body, json, form, chunk_size)
+        response = TestResponse()
+        complete = asyncio.Event()
+        disconnected = asyncio.Event()
+        pending = list(reversed(chunks))
+
+        async def receive() -> dict:
+            if pending:
+                chunk = pending.pop()
+                if pending:
+                    # Let other tasks run between chunks, as a network would
+                    await asyncio.sleep(0)
+                return {"type": "http.request", "body": chunk, "more_body": bool(pending)}
+            # The whole body has been read; like a server, report the
+            # disconnect only when it happens or the response is done
+            if not (complete.is_set() or disconnected.is_set()):
+                waiters = [asyncio.ensure_future(complete.wait()), asyncio.ensure_future(disconnected.wait())]
+                try:
+                    await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    for waiter in waiters:
+                        waiter.cancel()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict) -> None:
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                if response.status_code is not None:
+                    raise RuntimeError("http.response.start sent twice")
+                response.status_code = message["status"]
+                response.raw_headers = [(bytes(k), bytes(v)) for k, v in message.get("headers", [])]
+                response.headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in response.raw_headers}
+                return
+            if response.status_code is None:
+                raise RuntimeError(f"{message_type} sent before http.response.start")
+            if complete.is_set() or disconnected.is_set():
+                return
+            if message_type == "http.response.pathsend":
+                with open(message["path"], "rb") as file:
+                    response.chunks.append(file.read())
+                complete.set()
+            elif message_type == "http.response.body":
+                chunk = message.get("body", b"")
+                if chunk:
+                    response.chunks.append(bytes(chunk))
+                if not message.get("more_body", False):
+                    complete.set()
+
+        timer = None
+        if disconnect_after is not None:
+            def disconnect() -> None:
+                if not complete.is_set():
+                    response.disconnected = True
+                    disconnected.set()
+            timer = asyncio.get_running_loop().call_later(disconnect_after, disconnect)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        except Exception:
+            if self.raise_app_exceptions:
+                raise
+            if response.status_code is None:
+                # What a server would send in its place
+                response.status_code = 500
+                response.headers = {"content-type": "text/plain; charset=utf-8"}
+                response.raw_headers = [(b"content-type", b"text/plain; charset=utf-8")]
+                response.chunks = [b"Internal Server Error"]
+        finally:
+            response.elapsed = time.perf_counter() - start
+            if timer is not None:
+                timer.cancel()
+        if response.status_code is None and not response.disconnected:
+            raise RuntimeError("App returned without sending a response")
+        return response
+
+    def _build(self, method, path, query, headers, body, json, form, chunk_size) -> Tuple[dict, List[bytes]]:
+        path, _, query_string = path.partition("?")
+        if query is not None:
+            extra = query if isinstance(query, str) else urlencode(query, doseq=True)
+            query_string = f"{query_string}&{extra}" if query_string else extra
+
+        request_headers = dict(self.headers)
+        if headers:
+            request_headers.update({k.lower(): v for k, v in headers.items()})
+        if json is not None:
+            body = json_module.dumps(json).encode()
+            request_headers.setdefault("content-type", "application/json")
+        elif form is not None:
+            body = urlencode(form, doseq=True).encode()
+            request_headers.setdefault("content-type", "application/x-www-form-urlencoded")
+        if isinstance(body, str):
+            body = body.encode()
+        body = body or b""
+        if body:
+            request_headers.setdefault("content-length", str(len(body)))
+
+        if chunk_size and len(body) > chunk_size:
+            chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+        else:
+            chunks = [body]
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.3"},
+            "http_version": "1.1",
+            "method": method.upper(),
+            "scheme": "http",
+            "path": unquote(path),
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": query_string.encode(),
+            "headers": [(k.lower().encode("latin-1"), str(v).encode("latin-1")) for k, v in request_headers.items()],
+            "client": self.client,
+            "server": ("testserver", 80),
+        }
+        return scope, chunks
+
+    async def get(self, path: str, **kwargs: Any) -> TestResponse:
+        return await self.request("GET", path, **kwargs)
+
+    async def head(self, path: str, **kwargs: Any) -> TestResponse:
+        return await self.request("HEAD", path, **kwargs)
+
+    async def post(self, path: str, **kwargs: Any) -> TestResponse:
+        return await self.request("POST", path, **kwargs)
+
+    async def put(self, path: str, **kwargs: Any) -> TestResponse:
+        return await self.request("PUT", path, **kwargs)
+
+    async def patch(self, path: str, **kwargs: Any) -> TestResponse:
+        return await self.request("PATCH", path, **kwargs)
+
+    async def delete(self, path: str, **kwargs: Any) -> TestResponse:
+        return await self.request("DELETE", path, **kwargs)
+
+    async def options(self, path: str, **kwargs: Any) -> TestResponse:
+        return await self.request("OPTIONS", path, **kwargs)
+
+    # Load
+
+    async def load(
+        self,
+        mix: Union[Dict[str, Any], Sequence[Tuple[float, Dict[str, Any]]]],
+        requests: int = 1000,
+        concurrency: int = 50,
+        duration: Optional[float] = None,
+        seed: Optional[int] = None,
+    ) -> "LoadReport":
+        """
+        Send many requests from concurrent workers and summarize them
+
+        Args:
+            mix: ``request()`` keyword arguments (``method`` defaults to GET),
+                or a list of ``(weight, kwargs)`` pairs picked at random
+                in proportion to their weights
+            requests: Total requests to send
+            concurrency: Requests in flight at once
+            duration: Stop starting new requests after this many seconds
+            seed: Seed for picking from the mix, for repeatable runs
+
+        Returns:
+            A LoadReport
+        """
+        if isinstance(mix, dict):
+            mix = [(1, mix)]
+        weights = [weight for weight, _ in mix]
+        specs = [spec for _, spec in mix]
+        rng = random.Random(seed)
+        report = LoadReport()
+        remaining = requests
+        deadline = time.perf_counter() + duration if duration is not None else None
+
+        async def worker() -> None:
+            nonlocal remaining
+            while remaining > 0 and (deadline is None or time.perf_counter() < deadline):
+                remaining -= 1
+                spec = dict(rng.choices(specs, weights)[0])
+                method = spec.pop("method", "GET")
+                path = spec.pop("path")
+                start = time.perf_counter()
+                try:
+                    response = await self.request(method, path, **spec)
+                except Exception as exc:
+                    report.record(time.perf_counter() - start, None, exc)
+                else:
+                    report.record(time.perf_counter() - start, response.status_code, None)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        report.wall_time = time.perf_counter() - start
+        return report
+
+
+class LoadReport:
+    """
+    Results of TestClient.load
+
+    Attributes:
+        latencies: Seconds per request, in completion order
+        status_counts: Responses per status code
+        exceptions: Requests that raised, by exception type name
+        wall_time: Seconds from the first request to the last response
+    """
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.status_counts: Dict[int, int] = {}
+        self.exceptions: Dict[str, int] = {}
+        self.wall_time = 0.0
+
+    def record(self, latency: float, status: Optional[int], exc: Optional[BaseException]) -> None:
+        self.latencies.append(latency)
+        if exc is not None:
+            name = type(exc).__name__
+            self.exceptions[name] = self.exceptions.get(name, 0) + 1
+        else:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    @property
+    def total(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def errors(self) -> int:
+        """Requests that raised or got a 5xx"""
+        server_errors = sum(count for status, count in self.status_counts.items() if status >= 500)
+        return server_errors + sum(self.exceptions.values())
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.total if self.total else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Requests per second"""
+        return self.total / self.wall_time if self.wall_time else 0.0
+
+    def percentile(self, p: float) -> float:
+        """Latency in seconds at percentile p (0-100), nearest-rank"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        rank = max(1, -(-len(ordered) * p // 100))
+        return ordered[int(rank) - 1]
+
+    def __str__(self) -> str:
+        ms = [f"p{p}={self.percentile(p) * 1000:.2f}ms" for p in (50, 90, 99)]
+        statuses = ", ".join(f"{status}: {count}" for status, count in sorted(self.status_counts.items()))
+        lines = [
+            f"{self.total} requests in {self.wall_time:.3f}s ({self.throughput:.0f} req/s)",
+            f"latency {' '.join(ms)} max={max(self.latencies, default=0) * 1000:.2f}ms",
+            f"status {statuses}",
+            f"errors {self.errors} ({self.error_rate:.1%})",
+        ]
+        if self.exceptions:
+            lines.append("exceptions " + ", ".join(f"{name}: {count}" for name, count in self.exceptions.items()))
+        return "\n".join(lines)
@@ -0,0 +1,116 @@
+"""
+Request timeouts and cancellation when the client disconnects
+
+A handler that hangs would otherwise hold its coroutine forever, and one
+whose client has gone away keeps computing a response nobody will read.
+
+Timeouts wrap a route's whole middleware chain; a request that runs longer
+gets 504 Gateway Timeout:
+
+    app.set_request_timeout(10)        # every route
+
+    @app.get("/report")
+    @timeout(60)                       # this route
+    async def report(request):
+        ...
+
+With cancellation enabled (``app.set_cancel_on_disconnect()`` or
+``@cancel_on_disconnect`` per route) the chain runs in its own task next to
+a watcher that reads the ASGI ``receive`` channel on the handler's behalf.
+Body messages are queued for the handler (a handler that never reads its
+body mustn't stop the watcher seeing the disconnect behind it), and
+``http.disconnect`` cancels the handler task. Long-running handlers that don't enable it can
+still poll cooperatively with ``await request.is_disconnected()``.
+"""
+import asyncio
+from typing import Callable, Optional
+
+from .exceptions import HTTPException
+from .request import Request
+from .response import Response
+
+# Status nginx uses for "client closed request"; the client never sees it,
+# but it shows up in logs and middleware
+CLIENT_CLOSED_REQUEST = 499
+
+
+def timeout(seconds: float) -> Callable[[Callable], Callable]:
+    """Give a route handler its own timeout (overrides the app-wide one)"""
+    def decorator(handler: Callable) -> Callable:
+        handler._nasirpy_timeout = seconds
+        return handler
+    return decorator
+
+
+def cancel_on_disconnect(handler: Callable) -> Callable:
+    """Cancel this route's handler when the client disconnects"""
+    handler._nasirpy_cancel_on_disconnect = True
+    return handler
+
+
+def get_timeout(handler: Callable) -> Optional[float]:
+    return getattr(handler, "_nasirpy_timeout", None)
+
+
+def is_cancel_on_disconnect(handler: Callable) -> bool:
+    return getattr(handler, "_nasirpy_cancel_on_disconnect", False)
+
+
+def guard(chain: Callable, seconds: Optional[float], cancel: bool) -> Callable:
+    """
+    Wrap a compiled chain with a timeout and/or disconnect cancellation
+
+    Returns the chain unchanged when neither is enabled, so routes without
+    them pay nothing.
+    """
+    if cancel:
+        async def guarded(request: Request) -> Response:
+            return await _run_until_disconnect(request, chain, seconds)
+        return guarded
+
+    if seconds is None:
+        return chain
+
+    async def timed(request: Request) -> Response:
+        try:
+            return await asyncio.wait_for(chain(request), seconds)
+        except asyncio.TimeoutError:
+            raise HTTPException(504)
+    return timed
+
+
+async def _run_until_disconnect(request: Request, chain: Callable, seconds: Optional[float]) -> Response:
+    receive = request.receive
+    # Unbounded: the body can't be held back behind a handler that doesn't read it
+    messages: asyncio.Queue = asyncio.Queue()
+    request.receive = messages.get
+    task = asyncio.ensure_future(chain(request))
+
+    async def watch() -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                request._disconnected = True
+                task.cancel()
+                # Anything still reading the body sees the disconnect too
+                messages.put_nowait(message)
+                return
+            messages.put_nowait(message)
+
+    watcher = asyncio.ensure_future(watch())
+    try:
+        if seconds is None:
+            return await task
+        try:
+            return await asyncio.wait_for(task, seconds)
+        except asyncio.TimeoutError:
+            raise HTTPException(504)
+    except asyncio.CancelledError:
+        if request._disconnected:
+            return Response(b"", status_code=CLIENT_CLOSED_REQUEST)
+        raise
+    finally:
+        watcher.cancel()
+        # A poll left by is_disconnected() reads the queue, which is going away
+        request._cancel_receive()
+        request.receive = receive
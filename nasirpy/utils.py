@@ -6,6 +6,9 @@ def parse_route_pattern(pattern: str) -> Tuple[str, list]:
     Parse a route pattern and return a regex pattern and parameter names
     Example: "/users/{id}/posts/{post_id}" ->
         "^/users/([^/]+)/posts/([^/]+)$", ["id", "post_id"]
+
+    A ``{name:path}`` parameter matches the rest of the path, slashes
+    included: "/static/{file:path}" -> "^/static/(.*)$", ["file"]
     """
     params = []
     regex_parts = []
@@ -19,9 +22,9 @@ def parse_route_pattern(pattern: str) -> Tuple[str, list]:
         
         # Check if this is a parameter
         if part.startswith('{') and part.endswith('}'):
-            param_name = part[1:-1]
+            param_name, _, converter = part[1:-1].partition(':')
             params.append(param_name)
-            regex_parts.append('([^/]+)')
+            regex_parts.append('(.*)' if converter == 'path' else '([^/]+)')
         else:
             regex_parts.append(re.escape(part))
     
@@ -0,0 +1,323 @@
+"""
+Decoding request bodies into typed models
+
+A handler parameter annotated with a model type receives the request body
+decoded and validated into that type:
+
+    @dataclass
+    class UserIn:
+        name: str
+        age: Optional[int] = None
+
+    @app.post("/users")
+    async def create_user(user: UserIn):
+        ...
+
+Supported model types are dataclasses and TypedDicts, plus msgspec Structs
+and pydantic models when those libraries are installed. The decoder for a
+type is built once, when the route is registered, and cached:
+
+- With msgspec installed, dataclasses, TypedDicts and Structs are decoded
+  and validated from the raw bytes in a single pass by ``msgspec.json.Decoder``.
+- pydantic models use ``TypeAdapter.validate_json`` on the raw bytes.
+- Otherwise the body goes through ``json.loads`` once and a validator
+  compiled from the type hints walks the result, converting nested models
+  and collecting every field error.
+
+Invalid JSON is a 400; values that don't match the type are a 422 with a
+list of field errors.
+"""
+import dataclasses
+import json
+import sys
+import types
+import typing
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from .exceptions import BadRequestError, RequestValidationError
+from .serialization import is_loaded_subclass
+
+# msgspec is imported when the first decoder is built, not at import time
+_msgspec: Any = None
+
+# A validator takes (value, location, errors) and returns the converted
+# value; on failure it appends to errors and returns _INVALID.
+Validator = Callable[[Any, Tuple, List[Dict[str, Any]]], Any]
+
+_INVALID = object()
+_MISSING = dataclasses.MISSING
+
+_decoders: Dict[Any, Callable[[bytes], Any]] = {}
+_validators: Dict[Any, Validator] = {}
+
+
+def _is_typeddict(tp: Any) -> bool:
+    return isinstance(tp, type) and issubclass(tp, dict) and hasattr(tp, "__required_keys__")
+
+
+def _is_pydantic_model(tp: Any) -> bool:
+    # A pydantic model can only exist if its defining module imported pydantic
+    return is_loaded_subclass(tp, "pydantic", "BaseModel")
+
+
+def _get_msgspec() -> Any:
+    """msgspec if it is installed, else False; imported on first call"""
+    global _msgspec
+    if _msgspec is None:
+        try:
+            import msgspec
+        except ImportError:  # pragma: no cover - optional dependency
+            msgspec = False
+        _msgspec = msgspec
+    return _msgspec
+
+
+def is_model_type(tp: Any) -> bool:
+    """Whether a parameter annotation declares a request body model"""
+    if dataclasses.is_dataclass(tp) and isinstance(tp, type):
+        return True
+    if _is_typeddict(tp) or _is_pydantic_model(tp):
+        return True
+    return is_loaded_subclass(tp, "msgspec", "Struct")
+
+
+def get_decoder(tp: Any) -> Callable[[bytes], Any]:
+    """Return the cached bytes -> model decoder for a type"""
+    decoder = _decoders.get(tp)
+    if decoder is None:
+        decoder = _decoders[tp] = _build_decoder(tp)
+    return decoder
+
+
+def _build_decoder(tp: Any) -> Callable[[bytes], Any]:
+    if _is_pydantic_model(tp):
+        pydantic = sys.modules["pydantic"]
+        adapter = pydantic.TypeAdapter(tp)
+
+        def decode(raw: bytes) -> Any:
+            try:
+                return adapter.validate_json(raw)
+            except pydantic.ValidationError as e:
+                errors = e.errors(include_url=False)
+                if any(error["type"] == "json_invalid" for error in errors):
+                    raise BadRequestError("Invalid JSON")
+                raise RequestValidationError(
+                    [{"loc": ["body", *error["loc"]], "msg": error["msg"]} for error in errors]
+                )
+        return decode
+
+    msgspec = _get_msgspec()
+    if msgspec:
+        msgspec_decoder = msgspec.json.Decoder(tp)
+
+        def decode(raw: bytes) -> Any:
+            try:
+                return msgspec_decoder.decode(raw)
+            except msgspec.ValidationError as e:
+                raise RequestValidationError([{"loc": ["body"], "msg": str(e)}])
+            except msgspec.DecodeError:
+                raise BadRequestError("Invalid JSON")
+        return decode
+
+    validate = get_validator(tp)
+
+    def decode(raw: bytes) -> Any:
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            raise BadRequestError("Invalid JSON")
+        errors: List[Dict[str, Any]] = []
+        value = validate(data, ("body",), errors)
+        if errors:
+            raise RequestValidationError(errors)
+        return value
+    return decode
+
+
+def get_validator(tp: Any) -> Validator:
+    """Return the cached validator for a type, compiling it on first use"""
+    validator = _validators.get(tp)
+    if validator is None:
+        # Register a forwarding stub first so self-referencing models compile
+        def forward(value, loc, errors):
+            return _validators[tp](value, loc, errors)
+        _validators[tp] = forward
+        try:
+            validator = _validators[tp] = _compile(tp)
+        except BaseException:
+            # A stub left behind would forward to itself forever
+            del _validators[tp]
+            raise
+    return validator
+
+
+def _error(errors: List[Dict[str, Any]], loc: Tuple, msg: str) -> Any:
+    errors.append({"loc": list(loc), "msg": msg})
+    return _INVALID
+
+
+# ``int | None`` (PEP 604) has its own origin, types.UnionType, on Python 3.10+
+_UNION_ORIGINS = (typing.Union, types.UnionType) if hasattr(types, "UnionType") else (typing.Union,)
+
+
+def _compile(tp: Any) -> Validator:
+    if tp is Any or tp is typing.Any:
+        return lambda value, loc, errors: value
+    if dataclasses.is_dataclass(tp):
+        return _compile_fields(tp, _dataclass_fields(tp), lambda kwargs: tp(**kwargs))
+    if _is_typeddict(tp):
+        hints = typing.get_type_hints(tp)
+        fields = [(name, hint, name in tp.__required_keys__) for name, hint in hints.items()]
+        return _compile_fields(tp, fields, dict)
+
+    origin = typing.get_origin(tp)
+    args = typing.get_args(tp)
+    if origin in _UNION_ORIGINS:
+        return _compile_union([get_validator(arg) for arg in args])
+    if origin is typing.Literal:
+        allowed = set(args)
+
+        def validate_literal(value, loc, errors):
+            if value in allowed and type(value) in {type(arg) for arg in args}:
+                return value
+            return _error(errors, loc, f"must be one of {sorted(map(repr, args))}")
+        return validate_literal
+    if origin in (list, set, frozenset, tuple) or tp in (list, set, frozenset, tuple):
+        return _compile_sequence(origin or tp, args)
+    if origin is dict or tp is dict:
+        return _compile_mapping(args[1] if args else Any)
+
+    simple = _SIMPLE.get(tp)
+    if simple is not None:
+        return simple
+    if is_loaded_subclass(tp, "uuid", "UUID"):
+        return _string_parser(tp, "a UUID")
+    if tp is type(None):
+        return lambda value, loc, errors: value if value is None else _error(errors, loc, "must be null")
+
+    name = getattr(tp, "__name__", repr(tp))
+
+    def validate_instance(value, loc, errors):
+        if isinstance(value, tp):
+            return value
+        return _error(errors, loc, f"must be {name}")
+    return validate_instance
+
+
+def _dataclass_fields(tp: Any) -> List[Tuple[str, Any, bool]]:
+    hints = typing.get_type_hints(tp)
+    return [
+        (f.name, hints.get(f.name, Any), f.default is _MISSING and f.default_factory is _MISSING)
+        for f in dataclasses.fields(tp)
+        if f.init
+    ]
+
+
+def _compile_fields(tp: Any, fields: List[Tuple[str, Any, bool]], build: Callable) -> Validator:
+    compiled = [(name, get_validator(hint), required) for name, hint, required in fields]
+    type_name = tp.__name__
+
+    def validate_fields(value, loc, errors):
+        if not isinstance(value, dict):
+            return _error(errors, loc, f"must be an object ({type_name})")
+        kwargs = {}
+        failed = False
+        for name, validate, required in compiled:
+            if name in value:
+                item = validate(value[name], loc + (name,), errors)
+                if item is _INVALID:
+                    failed = True
+                else:
+                    kwargs[name] = item
+            elif required:
+                _error(errors, loc + (name,), "field required")
+                failed = True
+        return _INVALID if failed else build(kwargs)
+    return validate_fields
+
+
+def _compile_union(options: List[Validator]) -> Validator:
+    def validate_union(value, loc, errors):
+        for validate in options:
+            scratch: List[Dict[str, Any]] = []
+            result = validate(value, loc, scratch)
+            if not scratch:
+                return result
+        return _error(errors, loc, "does not match any allowed type")
+    return validate_union
+
+
+def _compile_sequence(container: type, args: Tuple) -> Validator:
+    if container is tuple and args and args[-1] is not Ellipsis:
+        items = [get_validator(arg) for arg in args]
+
+        def validate_tuple(value, loc, errors):
+            if not isinstance(value, list) or len(value) != len(items):
+                return _error(errors, loc, f"must be an array of {len(items)} items")
+            result = tuple(v(item, loc + (i,), errors) for i, (v, item) in enumerate(zip(items, value)))
+            return _INVALID if any(item is _INVALID for item in result) else result
+        return validate_tuple
+
+    validate_item = get_validator(args[0]) if args else _compile(Any)
+
+    def validate_sequence(value, loc, errors):
+        if not isinstance(value, list):
+            return _error(errors, loc, "must be an array")
+        result = [validate_item(item, loc + (i,), errors) for i, item in enumerate(value)]
+        if any(item is _INVALID for item in result):
+            return _INVALID
+        return result if container is list else container(result)
+    return validate_sequence
+
+
+def _compile_mapping(value_type: Any) -> Validator:
+    validate_value = get_validator(value_type)
+
+    def validate_mapping(value, loc, errors):
+        if not isinstance(value, dict):
+            return _error(errors, loc, "must be an object")
+        result = {key: validate_value(item, loc + (key,), errors) for key, item in value.items()}
+        return _INVALID if any(item is _INVALID for item in result.values()) else result
+    return validate_mapping
+
+
+def _validate_int(value, loc, errors):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return _error(errors, loc, "must be an integer")
+
+
+def _validate_float(value, loc, errors):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return _error(errors, loc, "must be a number")
+
+
+def _validate_str(value, loc, errors):
+    return value if isinstance(value, str) else _error(errors, loc, "must be a string")
+
+
+def _validate_bool(value, loc, errors):
+    return value if isinstance(value, bool) else _error(errors, loc, "must be a boolean")
+
+
+def _string_parser(parse: Callable[[str], Any], description: str) -> Validator:
+    def validate(value, loc, errors):
+        if isinstance(value, str):
+            try:
+                return parse(value)
+            except ValueError:
+                pass
+        return _error(errors, loc, f"must be {description}")
+    return validate
+
+
+_SIMPLE: Dict[Any, Validator] = {
+    int: _validate_int,
+    float: _validate_float,
+    str: _validate_str,
+    bool: _validate_bool,
+    datetime: _string_parser(datetime.fromisoformat, "an ISO 8601 datetime"),
+    date: _string_parser(date.fromisoformat, "an ISO 8601 date"),
+}
@@ -0,0 +1,288 @@
+"""
+WebSocket routes
+
+    @app.websocket("/ws/rooms/{room}")
+    async def room(websocket: WebSocket):
+        await websocket.accept()
+        async for message in websocket.iter_json():
+            await websocket.send_json({"room": websocket.path_params["room"], "echo": message})
+
+WebSocket routes live in the same route table as HTTP routes, under the
+pseudo-method ``"<websocket>"`` (``<`` and ``>`` can't appear in an HTTP
+method, so no HTTP request can match it). They share prefixes, routers
+and the static/dynamic index. HTTP middleware does not run for them.
+
+Sending awaits the server's ``send``, which is where ASGI servers apply
+backpressure, so a slow client slows down its own handler rather than
+growing a buffer. ``idle_timeout`` closes connections that send nothing for
+that long (protocol-level pings are the server's job, e.g. uvicorn's
+``ws_ping_interval``).
+
+Broadcast fans one message out to many connections: it encodes the message
+once and drops it into each subscriber's bounded queue without awaiting,
+and a writer task per subscriber drains its queue at that client's pace.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+
+from .request import Headers, QueryParams
+from .serialization import default
+
+logger = logging.getLogger("nasirpy.websocket")
+
+CONNECTING, CONNECTED, DISCONNECTED = range(3)
+
+
+class WebSocketDisconnect(Exception):
+    """The client closed the connection (or it timed out)"""
+
+    def __init__(self, code: int = 1000, reason: str = ""):
+        super().__init__(code, reason)
+        self.code = code
+        self.reason = reason
+
+
+class WebSocket:
+    """
+    A WebSocket connection wrapping the ASGI ``receive``/``send`` pair
+
+    Attributes:
+        scope: The ASGI websocket scope
+        path_params: Parameters extracted from the route pattern
+        idle_timeout: Seconds to wait for a client message before closing
+            with 1001 (None waits forever)
+    """
+
+    __slots__ = ("scope", "_receive", "_send", "path_params", "idle_timeout", "state",
+                 "client_state", "_headers", "_query_params")
+
+    def __init__(self, scope: dict, receive: Callable, send: Callable, idle_timeout: Optional[float] = None):
+        self.scope = scope
+        self._receive = receive
+        self._send = send
+        self.path_params: Dict[str, str] = {}
+        self.idle_timeout = idle_timeout
+        self.state: Dict[str, Any] = {}
+        self.client_state = CONNECTING
+        self._headers: Optional[Headers] = None
+        self._query_params: Optional[QueryParams] = None
+
+    @property
+    def path(self) -> str:
+        return self.scope["path"]
+
+    @property
+    def headers(self) -> Headers:
+        if self._headers is None:
+            self._headers = Headers(self.scope.get("headers", []))
+        return self._headers
+
+    @property
+    def query_params(self) -> QueryParams:
+        if self._query_params is None:
+            self._query_params = QueryParams(self.scope.get("query_string", b""))
+        return self._query_params
+
+    async def accept(self, subprotocol: Optional[str] = None,
+                     headers: Optional[List[Tuple[bytes, bytes]]] = None) -> None:
+        """Complete the handshake"""
+        if self.client_state != CONNECTING:
+            raise RuntimeError("WebSocket is already accepted or closed")
+        message = await self._receive()
+        if message["type"] != "websocket.connect":
+            raise RuntimeError(f"Expected websocket.connect, got {message['type']}")
+        await self._send({"type": "websocket.accept", "subprotocol": subprotocol, "headers": headers or []})
+        self.client_state = CONNECTED
+
+    async def receive(self) -> dict:
+        """
+        Receive the next message, raising WebSocketDisconnect on close
+
+        Returns:
+            The raw ASGI ``websocket.receive`` message
+        """
+        if self.client_state != CONNECTED:
+            raise RuntimeError("WebSocket is not connected")
+        if self.idle_timeout is None:
+            message = await self._receive()
+        else:
+            try:
+                message = await asyncio.wait_for(self._receive(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                await self.close(1001, "Idle timeout")
+                raise WebSocketDisconnect(1001, "Idle timeout")
+        if message["type"] == "websocket.disconnect":
+            self.client_state = DISCONNECTED
+            raise WebSocketDisconnect(message.get("code", 1000), message.get("reason") or "")
+        return message
+
+    async def receive_text(self) -> str:
+        message = await self.receive()
+        text = message.get("text")
+        return text if text is not None else message["bytes"].decode()
+
+    async def receive_bytes(self) -> bytes:
+        message = await self.receive()
+        data = message.get("bytes")
+        return data if data is not None else message["text"].encode()
+
+    async def receive_json(self) -> Any:
+        message = await self.receive()
+        return json.loads(message.get("text") or message.get("bytes"))
+
+    async def iter_text(self) -> AsyncIterator[str]:
+        """Yield text messages until the client disconnects"""
+        try:
+            while True:
+                yield await self.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    async def iter_json(self) -> AsyncIterator[Any]:
+        """Yield decoded JSON messages until the client disconnects"""
+        try:
+            while True:
+                yield await self.receive_json()
+        except WebSocketDisconnect:
+            pass
+
+    async def send(self, message: dict) -> None:
+        """Send a raw ASGI message; waits while the server applies backpressure"""
+        if self.client_state == DISCONNECTED:
+            raise WebSocketDisconnect(1006, "Connection is closed")
+        await self._send(message)
+
+    async def send_text(self, data: str) -> None:
+        await self.send({"type": "websocket.send", "text": data})
+
+    async def send_bytes(self, data: bytes) -> None:
+        await self.send({"type": "websocket.send", "bytes": data})
+
+    async def send_json(self, data: Any) -> None:
+        await self.send({"type": "websocket.send", "text": json.dumps(data, default=default)})
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        if self.client_state == DISCONNECTED:
+            return
+        self.client_state = DISCONNECTED
+        await self._send({"type": "websocket.close", "code": code, "reason": reason})
+
+
+class Broadcast:
+    """
+    Fan messages out to many WebSocket connections
+
+    ``publish`` encodes a message once and puts it on every subscriber's
+    queue with ``put_nowait``, so the publisher never waits on a client.
+    Each subscriber has a writer task that sends from its queue. When a
+    client falls ``max_queue`` messages behind, its oldest pending message
+    is dropped, or with ``on_full="close"`` the client is disconnected
+    with 1013 (try again later).
+
+    Usage:
+        updates = Broadcast()
+
+        @app.websocket("/ws/updates")
+        async def subscribe(websocket):
+            await websocket.accept()
+            async with updates.subscribe(websocket):
+                async for _ in websocket.iter_text():
+                    pass
+
+        updates.publish({"price": 42})
+    """
+
+    def __init__(self, max_queue: int = 100, on_full: str = "drop_oldest"):
+        if on_full not in ("drop_oldest", "close"):
+            raise ValueError(f"Unknown on_full policy: {on_full!r}")
+        self.max_queue = max_queue
+        self.on_full = on_full
+        self.subscribers: Dict[WebSocket, Tuple[asyncio.Queue, asyncio.Task]] = {}
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self.subscribers)
+
+    def subscribe(self, websocket: WebSocket) -> "_Subscription":
+        """Context manager that adds the connection for its duration"""
+        return _Subscription(self, websocket)
+
+    def add(self, websocket: WebSocket) -> None:
+        queue: asyncio.Queue = asyncio.Queue(self.max_queue)
+        task = asyncio.ensure_future(self._writer(websocket, queue))
+        self.subscribers[websocket] = (queue, task)
+
+    def remove(self, websocket: WebSocket) -> None:
+        entry = self.subscribers.pop(websocket, None)
+        if entry is not None:
+            entry[1].cancel()
+
+    def publish(self, data: Union[str, bytes, Any]) -> int:
+        """
+        Queue data for every subscriber without awaiting
+
+        Strings are sent as text, bytes as binary, anything else as JSON
+        (encoded once for all subscribers).
+
+        Returns:
+            Number of subscribers the message was queued for
+        """
+        if isinstance(data, bytes):
+            message = {"type": "websocket.send", "bytes": data}
+        else:
+            text = data if isinstance(data, str) else json.dumps(data, default=default)
+            message = {"type": "websocket.send", "text": text}
+
+        slow: List[WebSocket] = []
+        for websocket, (queue, _) in self.subscribers.items():
+            if queue.full():
+                self.dropped += 1
+                if self.on_full == "close":
+                    slow.append(websocket)
+                    continue
+                queue.get_nowait()
+            queue.put_nowait(message)
+        for websocket in slow:
+            self.remove(websocket)
+            asyncio.ensure_future(websocket.close(1013, "Too slow"))
+        return len(self.subscribers)
+
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue) -> None:
+        try:
+            while True:
+                await websocket.send(await queue.get())
+        except Exception:
+            # The client went away mid-send; stop writing to it
+            self.subscribers.pop(websocket, None)
+
+
+class _Subscription:
+    def __init__(self, broadcast: Broadcast, websocket: WebSocket):
+        self.broadcast = broadcast
+        self.websocket = websocket
+
+    async def __aenter__(self) -> WebSocket:
+        self.broadcast.add(self.websocket)
+        return self.websocket
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.broadcast.remove(self.websocket)
+
+
+async def run_websocket(handler: Callable, websocket: WebSocket) -> None:
+    """Run a WebSocket handler, closing the connection if it fails"""
+    try:
+        await handler(websocket)
+    except WebSocketDisconnect:
+        pass
+    except Exception:
+        logger.exception("Exception in WebSocket handler for %s", websocket.path)
+        if websocket.client_state == CONNECTED:
+            await websocket.close(1011, "Internal error")
+        elif websocket.client_state == CONNECTING:
+            await websocket.close(1011)
+        return
+    if websocket.client_state != DISCONNECTED:
+        await websocket.close()
@@ -22,6 +22,9 @@ setup(
     install_requires=[
         "uvicorn"
     ],
+    extras_require={
+        "speedups": ["httptools"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
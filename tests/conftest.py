@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+
+
+@pytest.fixture
+def make_scope():
+    """Create a factory for HTTP scopes."""
+    def make(path="/", method="GET", query_string=b"", headers=None):
+        return {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "query_string": query_string,
+            "headers": headers or [],
+        }
+    return make
+
+
+@pytest.fixture
+def make_receive():
+    """Create a factory for receive functions: the body, then http.disconnect once the event is set."""
+    def make(body=b"", disconnect=None):
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await (disconnect.wait() if disconnect else asyncio.Event().wait())
+            return {"type": "http.disconnect"}
+        return receive
+    return make
+
+
+@pytest.fixture
+def call(make_scope, make_receive):
+    """Run a request through an app and return (status, headers, body)."""
+    async def call(app, path="/", method="GET", query_string=b"", headers=None, body=b"", receive=None):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await app(make_scope(path, method, query_string, headers), receive or make_receive(body), send)
+        return (
+            messages[0]["status"],
+            dict(messages[0]["headers"]),
+            b"".join(message.get("body", b"") for message in messages[1:]),
+        )
+    return call
@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from nasirpy import App, Response, bulkhead
+from nasirpy.admission import ConcurrencyLimiter
+
+
+@pytest.mark.asyncio
+async def test_limiter_queue_and_deadline():
+    """Test admission, FIFO hand-off, queue bound and queue deadline."""
+    limiter = ConcurrencyLimiter(1, max_queue=1, queue_timeout=0.05)
+    assert await limiter.acquire()
+
+    waiting = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.queued == 1
+    assert not await limiter.acquire()  # queue full: shed immediately
+
+    limiter.release()
+    assert await waiting
+    assert limiter.in_flight == 1
+
+    assert not await limiter.acquire()  # waits 50ms, then gives up
+    assert limiter.queued == 0
+    assert limiter.rejected == 2
+
+
+def test_limiter_adapts():
+    """Test the AIMD limit: additive increase, multiplicative decrease."""
+    limiter = ConcurrencyLimiter(10, target_latency=0.1, min_limit=2, max_limit=11)
+    for _ in range(10):
+        limiter.in_flight += 1
+        limiter.release(0.01)
+    assert limiter.limit == 11
+
+    limiter.in_flight += 1
+    limiter.release(0.5)
+    assert limiter.limit == 9
+
+
+@pytest.mark.asyncio
+async def test_app_sheds_load_with_retry_after(call):
+    """Test that requests beyond the app-wide limit get 503 + Retry-After."""
+    app = App()
+    app.limit_concurrency(2, retry_after=5)
+    gate = asyncio.Event()
+
+    @app.get("/")
+    async def handler(request):
+        await gate.wait()
+        return Response("ok")
+
+    running = [asyncio.ensure_future(call(app)) for _ in range(2)]
+    await asyncio.sleep(0)
+    status, headers, _ = await call(app)
+    assert status == 503
+    assert headers[b"retry-after"] == b"5"
+
+    gate.set()
+    assert [status for status, _, _ in await asyncio.gather(*running)] == [200, 200]
+    assert app.admission.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_isolates_route(call):
+    """Test that a full bulkhead rejects its route but not the others."""
+    app = App()
+    gate = asyncio.Event()
+
+    @app.get("/slow")
+    @bulkhead(1)
+    async def slow(request):
+        await gate.wait()
+        return Response("slow")
+
+    @app.get("/fast")
+    async def fast(request):
+        return Response("fast")
+
+    first = asyncio.ensure_future(call(app, "/slow"))
+    await asyncio.sleep(0)
+    assert (await call(app, "/slow"))[0] == 503
+    assert (await call(app, "/fast"))[0] == 200
+
+    gate.set()
+    assert (await first)[0] == 200
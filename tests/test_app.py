@@ -59,7 +59,7 @@ async def test_app_route_not_found(app, mock_scope, mock_receive, mock_send):
     await app.handle_request(mock_scope, mock_receive, mock_send)
     
     assert mock_send.messages[0]["status"] == 404
-    assert b'"error": "No route found for GET /nonexistent"' in mock_send.messages[1]["body"]
+    assert mock_send.messages[1]["body"] == b'{"error": "Not Found"}'
 
 @pytest.mark.asyncio
 async def test_app_method_not_allowed(app, mock_scope, mock_receive, mock_send):
@@ -71,8 +71,9 @@ async def test_app_method_not_allowed(app, mock_scope, mock_receive, mock_send):
     mock_scope["method"] = "POST"
     await app.handle_request(mock_scope, mock_receive, mock_send)
     
-    assert mock_send.messages[0]["status"] == 404
-    assert b'"error": "No route found for POST /test"' in mock_send.messages[1]["body"]
+    assert mock_send.messages[0]["status"] == 405
+    assert (b"allow", b"GET") in mock_send.messages[0]["headers"]
+    assert mock_send.messages[1]["body"] == b'{"error": "Method Not Allowed"}'
 
 @pytest.mark.asyncio
 async def test_app_path_params(app, mock_scope, mock_receive, mock_send):
@@ -150,7 +151,7 @@ async def test_app_error_handling(app, mock_scope, mock_receive, mock_send):
 @pytest.mark.asyncio
 async def test_app_non_http_scope(app, mock_receive, mock_send):
     """Test handling of non-HTTP ASGI scopes."""
-    scope = {"type": "websocket"}  # Non-HTTP scope
+    scope = {"type": "custom"}  # Scope type the app doesn't handle
     await app.handle_request(scope, mock_receive, mock_send)
     assert len(mock_send.messages) == 0  # Should not send any response
 
@@ -175,4 +176,237 @@ async def test_app_multiple_methods(app, mock_scope, mock_receive, mock_send):
     # Test POST
     mock_scope["method"] = "POST"
     await app.handle_request(mock_scope, mock_receive, mock_send)
-    assert b'"method": "POST"' in mock_send.messages[1]["body"] 
\ No newline at end of file
+    assert b'"method": "POST"' in mock_send.messages[1]["body"] 
+
+@pytest.mark.asyncio
+async def test_app_lifespan(app, mock_scope, mock_receive, mock_send):
+    """Test lifespan startup/shutdown hooks and route freezing."""
+    events = []
+
+    @app.on_startup
+    async def startup():
+        events.append("startup")
+
+    @app.on_shutdown
+    def shutdown():
+        events.append("shutdown")
+
+    @app.get("/test")
+    async def test_handler(request):
+        return Response({"message": "ok"})
+
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+
+    async def receive():
+        return messages.pop(0)
+
+    await app({"type": "lifespan"}, receive, mock_send)
+    assert events == ["startup", "shutdown"]
+    assert [m["type"] for m in mock_send.messages] == [
+        "lifespan.startup.complete",
+        "lifespan.shutdown.complete",
+    ]
+
+    # Routes are frozen once the app has started
+    with pytest.raises(RuntimeError):
+        app.get("/late")(test_handler)
+
+    mock_send.messages.clear()
+    await app.handle_request(mock_scope, mock_receive, mock_send)
+    assert mock_send.messages[0]["status"] == 200
+
+@pytest.mark.asyncio
+async def test_app_lifespan_startup_failure(app, mock_send):
+    """Test that a failing startup hook reports lifespan.startup.failed."""
+    @app.on_startup
+    async def startup():
+        raise RuntimeError("database unavailable")
+
+    async def receive():
+        return {"type": "lifespan.startup"}
+
+    await app({"type": "lifespan"}, receive, mock_send)
+    assert mock_send.messages == [
+        {"type": "lifespan.startup.failed", "message": "database unavailable"}
+    ]
+
+@pytest.mark.asyncio
+async def test_app_exception_handlers(app, mock_scope, mock_receive, mock_send):
+    """Test custom exception handlers resolved through the MRO."""
+    class PaymentError(Exception):
+        pass
+
+    class CardDeclined(PaymentError):
+        pass
+
+    @app.exception_handler(PaymentError)
+    async def payment_error(request, exc):
+        return Response({"error": "payment", "type": type(exc).__name__}, status_code=402)
+
+    @app.exception_handler(NotFoundError)
+    def not_found(request, exc):
+        return Response({"error": f"nothing at {request.path}"}, status_code=404)
+
+    @app.get("/test")
+    async def test_handler(request):
+        raise CardDeclined()
+
+    await app.handle_request(mock_scope, mock_receive, mock_send)
+    assert mock_send.messages[0]["status"] == 402
+    assert mock_send.messages[1]["body"] == b'{"error": "payment", "type": "CardDeclined"}'
+    assert app._exception_handler_cache[CardDeclined] is payment_error
+
+    mock_send.messages.clear()
+    mock_scope["path"] = "/missing"
+    await app.handle_request(mock_scope, mock_receive, mock_send)
+    assert mock_send.messages[1]["body"] == b'{"error": "nothing at /missing"}'
+
+
+@pytest.mark.asyncio
+async def test_app_include_router_prefix(app, mock_scope, mock_receive, mock_send):
+    """Test that include_router's prefix applies without changing the router."""
+    router = Router(prefix="/items")
+
+    @router.get("/{item_id}")
+    async def get_item(request):
+        return {"id": request.path_params["item_id"]}
+
+    app.include_router(router, prefix="/v1")
+    app.include_router(router, prefix="/v2")
+    assert router.prefix == "/items"
+
+    for version in ("v1", "v2"):
+        mock_scope["path"] = f"/{version}/items/7"
+        await app.handle_request(mock_scope, mock_receive, mock_send)
+        assert mock_send.messages[-1]["body"] == b'{"id": "7"}'
+
+
+@pytest.mark.asyncio
+async def test_app_sees_routes_added_to_included_router(app, mock_scope, mock_receive, mock_send):
+    """Test that routes added to a router after the first request are matched."""
+    router = Router(prefix="/api")
+
+    @router.get("/a")
+    async def a(request):
+        return "a"
+
+    app.include_router(router)
+    mock_scope["path"] = "/api/a"
+    await app.handle_request(mock_scope, mock_receive, mock_send)
+    assert mock_send.messages[-1]["body"] == b"a"
+
+    @router.get("/b")
+    async def b(request):
+        return "b"
+
+    mock_scope["path"] = "/api/b"
+    await app.handle_request(mock_scope, mock_receive, mock_send)
+    assert mock_send.messages[-1]["body"] == b"b"
+
+    app.started = True
+    with pytest.raises(RuntimeError):
+        router.get("/c")(a)
+
+
+@pytest.mark.asyncio
+async def test_app_mount(app, mock_scope, mock_receive, mock_send):
+    """Test longest-prefix dispatch, scope rewriting and per-app middleware and lifespan."""
+    api, admin = App(), App()
+    started = []
+
+    @api.get("/users")
+    async def users(request):
+        return {"path": request.path, "root_path": request.scope["root_path"]}
+
+    @admin.get("/")
+    async def dashboard(request):
+        return "admin"
+
+    @admin.on_startup
+    def admin_started():
+        started.append("admin")
+
+    async def tag(request, call_next):
+        response = await call_next(request)
+        response.headers["X-App"] = "admin"
+        return response
+
+    admin.add_middleware(tag)
+
+    @app.get("/api-status")
+    async def status(request):
+        return "ok"
+
+    app.mount("/api", api)
+    app.mount("/api/admin", admin)
+    await app.startup()
+    assert started == ["admin"]
+
+    mock_scope["path"] = "/api/users"
+    await app.handle_request(mock_scope, mock_receive, mock_send)
+    assert mock_send.messages[-1]["body"] == b'{"path": "/users", "root_path": "/api"}'
+
+    mock_scope["path"] = "/api/admin"
+    await app.handle_request(mock_scope, mock_receive, mock_send)
+    assert mock_send.messages[-1]["body"] == b"admin"
+    assert (b"x-app", b"admin") in mock_send.messages[-2]["headers"]
+
+    # Prefixes match whole segments only
+    mock_scope["path"] = "/api-status"
+    await app.handle_request(mock_scope, mock_receive, mock_send)
+    assert mock_send.messages[-1]["body"] == b"ok"
+    assert mock_scope["path"] == "/api-status"
+
+    with pytest.raises(RuntimeError):
+        app.mount("/late", App())
+
+
+@pytest.mark.asyncio
+async def test_app_host_and_version_routing(app, mock_scope, mock_receive, mock_send):
+    """Test that routers bound to hosts and versions are chosen from the headers."""
+    acme = Router(host="acme.example.com")
+    tenants = Router(host="*.example.com")
+    v2 = Router(version="2")
+
+    @app.get("/users/{user_id}")
+    async def default_user(user_id: str):
+        return f"default {user_id}"
+
+    @app.get("/health")
+    async def health():
+        return "ok"
+
+    @acme.get("/users/{user_id}")
+    async def acme_user(user_id: str):
+        return f"acme {user_id}"
+
+    @tenants.get("/users/{user_id}")
+    async def tenant_user(user_id: str):
+        return f"tenant {user_id}"
+
+    @v2.get("/users/{user_id}")
+    async def v2_user(user_id: str):
+        return f"v2 {user_id}"
+
+    for router in (acme, tenants, v2):
+        app.include_router(router)
+
+    async def body(host=None, version=None, path="/users/1"):
+        mock_scope["path"] = path
+        mock_scope["headers"] = []
+        if host:
+            mock_scope["headers"].append((b"host", host.encode()))
+        if version:
+            mock_scope["headers"].append((b"x-api-version", version.encode()))
+        await app.handle_request(mock_scope, mock_receive, mock_send)
+        return mock_send.messages[-1]["body"]
+
+    assert await body() == b"default 1"
+    assert await body("ACME.example.com:8000") == b"acme 1"
+    assert await body("shop.eu.example.com") == b"tenant 1"
+    assert await body("example.com") == b"default 1"
+    assert await body(version="2") == b"v2 1"
+    assert await body(version="3") == b"default 1"
+    # Host routes outrank version routes, and unbound routes are still reachable
+    assert await body("acme.example.com", "2") == b"acme 1"
+    assert await body("acme.example.com", path="/health") == b"ok"
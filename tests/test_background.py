@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import threading
+import pytest
+from nasirpy import App, BackgroundTasks, Response
+
+
+@pytest.mark.asyncio
+async def test_tasks_run_after_response_sent(caplog, make_scope, make_receive):
+    """Test injected and response-attached tasks run in order after send."""
+    app = App()
+    events = []
+
+    async def audit(name):
+        events.append(f"audit {name}")
+
+    def invalidate(key):
+        events.append(f"invalidate {key} in {threading.current_thread().name[:7]}")
+
+    def broken():
+        raise ValueError("boom")
+
+    @app.get("/")
+    async def handler(tasks: BackgroundTasks):
+        tasks.add_task(audit, "a")
+        tasks.add_task(broken)
+        extra = BackgroundTasks()
+        extra.add_task(invalidate, key="users")
+        return Response({"ok": True}, background=extra)
+
+    async def send(message):
+        events.append(message["type"])
+
+    with caplog.at_level(logging.ERROR, logger="nasirpy.background"):
+        await app(make_scope(), make_receive(), send)
+
+    assert events == [
+        "http.response.start",
+        "http.response.body",
+        "audit a",
+        "invalidate users in nasirpy",
+    ]
+    assert "Background task" in caplog.text and "broken" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_background_concurrency_limit(make_scope, make_receive):
+    """Test that the app-wide semaphore bounds concurrently running tasks."""
+    app = App()
+    app.max_background_tasks = 2
+    running = 0
+    peak = 0
+
+    async def slow():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    @app.get("/")
+    async def handler(tasks: BackgroundTasks):
+        tasks.add_task(slow)
+        return {}
+
+    async def send(message):
+        pass
+
+    await asyncio.gather(*(app(make_scope(), make_receive(), send) for _ in range(6)))
+    assert peak == 2
@@ -0,0 +1,125 @@
+import asyncio
+import contextvars
+import threading
+import time
+import pytest
+from nasirpy import App, Response
+from nasirpy.concurrency import cpu_bound, is_async_callable, run_in_threadpool
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+@cpu_bound
+def fibonacci(n: int):
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return {"fib": a}
+
+def test_is_async_callable():
+    """Test detection of async callables."""
+    async def async_func():
+        pass
+
+    def sync_func():
+        pass
+
+    class AsyncCallable:
+        async def __call__(self):
+            pass
+
+    assert is_async_callable(async_func)
+    assert is_async_callable(AsyncCallable())
+    assert not is_async_callable(sync_func)
+
+@pytest.mark.asyncio
+async def test_run_in_threadpool_propagates_context():
+    """Test that context variables are visible in the worker thread."""
+    request_id.set("abc")
+    main_thread = threading.get_ident()
+
+    def blocking():
+        return request_id.get(), threading.get_ident()
+
+    value, thread = await run_in_threadpool(blocking)
+    assert value == "abc"
+    assert thread != main_thread
+
+@pytest.mark.asyncio
+async def test_sync_handler_runs_in_thread(call):
+    """Test that a plain def handler runs off the event loop thread."""
+    app = App()
+    main_thread = threading.get_ident()
+
+    @app.get("/sync")
+    def sync_handler(request):
+        return Response({"off_loop": threading.get_ident() != main_thread})
+
+    status, _, body = await call(app, "/sync")
+    assert status == 200
+    assert body == b'{"off_loop": true}'
+
+@pytest.mark.asyncio
+async def test_sync_middleware(call):
+    """Test that synchronous middleware can wrap async handlers."""
+    app = App()
+
+    def add_header(request, call_next):
+        response = call_next()
+        response.headers["X-Sync"] = "yes"
+        return response
+
+    app.add_middleware(add_header)
+
+    @app.get("/")
+    async def handler(request):
+        return Response({"ok": True})
+
+    _, headers, _ = await call(app)
+    assert headers[b"x-sync"] == b"yes"
+
+@pytest.mark.asyncio
+async def test_sync_middleware_with_saturated_pool(monkeypatch, call):
+    """Test that sync middleware and sync handlers can't starve each other of threads."""
+    from nasirpy import concurrency
+
+    monkeypatch.setattr(concurrency, "_max_threads", 2)
+    concurrency.shutdown_executors()
+    try:
+        app = App()
+        app.middleware_manager.max_threads = 2
+
+        def outer(request, call_next):
+            time.sleep(0.01)
+            return call_next()
+
+        async def middle(request, call_next):
+            return await call_next(request)
+
+        def inner(request, call_next):
+            response = call_next()
+            response.headers["X-Inner"] = "yes"
+            return response
+
+        app.add_middleware(outer)
+        app.add_middleware(middle)
+        app.add_middleware(inner)
+
+        @app.get("/")
+        def handler():
+            time.sleep(0.01)
+            return {"ok": True}
+
+        results = await asyncio.wait_for(asyncio.gather(*(call(app, "/") for _ in range(8))), 5)
+        assert [(status, body) for status, _, body in results] == [(200, b'{"ok": true}')] * 8
+    finally:
+        concurrency.shutdown_executors()
+
+@pytest.mark.asyncio
+async def test_cpu_bound_handler(call):
+    """Test that @cpu_bound handlers run in the process pool."""
+    app = App()
+    app.get("/fib/{n}")(fibonacci)
+
+    status, _, body = await call(app, "/fib/10")
+    assert status == 200
+    assert body == b'{"fib": 55}'
@@ -0,0 +1,157 @@
+import pytest
+from nasirpy import App, Response, Request
+from nasirpy.dependencies import Depends, Query, Header, Body, get_plan, REQUEST, PATH_OR_QUERY
+
+@pytest.fixture
+def app():
+    """Create a test app instance."""
+    return App()
+
+def test_plan_classifies_parameters():
+    """Test that signatures are classified once into a plan."""
+    async def handler(request, user_id: int, q: str = Query("x")):
+        pass
+
+    plan = get_plan(handler)
+    assert plan is get_plan(handler)
+    assert [(name, kind) for name, kind, *_ in plan.params][:2] == [
+        ("request", REQUEST),
+        ("user_id", PATH_OR_QUERY),
+    ]
+    assert not plan.request_only
+
+@pytest.mark.asyncio
+async def test_path_query_and_header_params(app, call):
+    """Test resolving and converting path, query and header parameters."""
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int, limit: int = 10, tag: str = Query(None, alias="t"),
+                       user_agent: str = Header("unknown")):
+        return {"item_id": item_id, "limit": limit, "tag": tag, "agent": user_agent}
+
+    status, _, body = await call(
+        app, "/items/5", query_string=b"limit=3&t=new", headers=[(b"user-agent", b"pytest")]
+    )
+    assert status == 200
+    assert body == b'{"item_id": 5, "limit": 3, "tag": "new", "agent": "pytest"}'
+
+    status, _, body = await call(app, "/items/abc")
+    assert status == 400
+    assert b"Invalid value for path parameter 'item_id'" in body
+
+@pytest.mark.asyncio
+async def test_missing_required_query_param(app, call):
+    """Test that a missing required parameter returns 400."""
+    @app.get("/search")
+    async def search(q: str):
+        return Response({"q": q})
+
+    status, _, body = await call(app, "/search")
+    assert status == 400
+    assert b"Missing required query parameter 'q'" in body
+
+@pytest.mark.asyncio
+async def test_bare_req_parameter_gets_request(app, call):
+    """Test that only parameters named request or req default to the request."""
+    @app.get("/echo")
+    async def echo(req):
+        return Response({"path": req.path})
+
+    @app.get("/users/{user_id}")
+    async def get_user(user_id):
+        return Response({"user_id": user_id})
+
+    @app.get("/search")
+    async def search(q):
+        return Response({"q": q})
+
+    status, _, body = await call(app, "/echo")
+    assert status == 200
+    assert body == b'{"path": "/echo"}'
+
+    status, _, body = await call(app, "/users/5")
+    assert body == b'{"user_id": "5"}'
+
+    status, _, body = await call(app, "/search", query_string=b"q=nasir")
+    assert body == b'{"q": "nasir"}'
+    status, _, body = await call(app, "/search")
+    assert status == 400
+    assert b"Missing required query parameter 'q'" in body
+
+@pytest.mark.asyncio
+async def test_invalid_bool_param(app, call):
+    """Test that bool parameters reject values that aren't booleans."""
+    @app.get("/flags")
+    async def flags(flag: bool = False):
+        return Response({"flag": flag})
+
+    status, _, body = await call(app, "/flags", query_string=b"flag=off")
+    assert body == b'{"flag": false}'
+    status, _, body = await call(app, "/flags", query_string=b"flag=yes")
+    assert body == b'{"flag": true}'
+    status, _, body = await call(app, "/flags", query_string=b"flag=maybe")
+    assert status == 400
+    assert b"Invalid value for query parameter 'flag'" in body
+
+@pytest.mark.asyncio
+async def test_body_param(app, call):
+    """Test the parsed JSON body parameter."""
+    @app.post("/echo")
+    async def echo(data=Body()):
+        return data
+
+    status, _, body = await call(
+        app, "/echo", "POST", headers=[(b"content-type", b"application/json")], body=b'{"a": 1}'
+    )
+    assert status == 200
+    assert body == b'{"a": 1}'
+
+@pytest.mark.asyncio
+async def test_request_scoped_dependency_cached_and_released(app, call):
+    """Test that a generator dependency is shared within a request and closed after the response."""
+    events = []
+
+    async def get_connection():
+        events.append("open")
+        yield "conn"
+        events.append("close")
+
+    async def get_repo(conn=Depends(get_connection)):
+        return f"repo({conn})"
+
+    @app.get("/")
+    async def handler(request: Request, conn=Depends(get_connection), repo=Depends(get_repo)):
+        events.append("handler")
+        return {"conn": conn, "repo": repo}
+
+    status, _, body = await call(app)
+    assert status == 200
+    assert body == b'{"conn": "conn", "repo": "repo(conn)"}'
+    assert events == ["open", "handler", "close"]
+
+@pytest.mark.asyncio
+async def test_app_scoped_dependency(app, call):
+    """Test that app-scoped dependencies are created at startup and released at shutdown."""
+    events = []
+
+    class Pool:
+        async def __aenter__(self):
+            events.append("pool open")
+            return self
+
+        async def __aexit__(self, *exc_info):
+            events.append("pool close")
+
+    @app.get("/")
+    async def handler(pool=Depends(Pool, scope="app")):
+        return {"same": pool is app.dependencies.values[Pool]}
+
+    await app.startup()
+    assert events == ["pool open"]
+
+    for _ in range(2):
+        status, _, body = await call(app)
+        assert body == b'{"same": true}'
+    assert events == ["pool open"]
+
+    await app.shutdown()
+    assert events == ["pool open", "pool close"]
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def loaded_after(statement):
+    """Return the modules a fresh interpreter has loaded after running statement."""
+    code = f"import sys; {statement}; print(' '.join(sorted(sys.modules)))"
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True,
+        env=dict(os.environ, PYTHONPATH=ROOT),
+    ).stdout
+    return set(output.split())
+
+
+def test_import_is_lazy():
+    """Test that public names are only imported when first used."""
+    modules = loaded_after("import nasirpy")
+    assert not {m for m in modules if m.startswith("nasirpy.")}
+
+    modules = loaded_after("from nasirpy import App")
+    for optional in ("nasirpy.multipart", "nasirpy.staticfiles", "nasirpy.sse", "tempfile",
+                     "multiprocessing", "uuid", "decimal", "email.utils"):
+        assert optional not in modules, optional
+
+    # Loaded once an App is created, builds its route table or takes a connection
+    modules = loaded_after("import nasirpy; nasirpy.App")
+    for deferred in ("nasirpy.middleware", "nasirpy.websocket", "nasirpy.timeouts",
+                     "nasirpy.admission", "nasirpy.singleflight"):
+        assert deferred not in modules, deferred
+
+
+def test_lazy_attributes():
+    """Test that lazy names resolve to the defining module's objects."""
+    import nasirpy
+    from nasirpy.middleware import CORSMiddleware
+
+    assert nasirpy.CORSMiddleware is CORSMiddleware
+    assert "StaticFiles" in dir(nasirpy)
+    assert set(nasirpy.__all__) <= set(dir(nasirpy))
+    with pytest.raises(AttributeError):
+        nasirpy.missing
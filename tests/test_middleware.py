@@ -4,7 +4,9 @@ from nasirpy.middleware import (
     LoggingMiddleware, TimingMiddleware, SecurityHeadersMiddleware,
     RateLimitMiddleware
 )
+from nasirpy import App, dependencies
 from nasirpy.request import Request
+from nasirpy.testclient import TestClient
 from nasirpy.response import Response
 from nasirpy.exceptions import HTTPException
 import logging
@@ -173,4 +175,74 @@ async def test_middleware_chain_order(mock_request, mock_handler):
         "second_before",
         "second_after",
         "first_after"
-    ] 
\ No newline at end of file
+    ] 
+
+@pytest.mark.asyncio
+async def test_cors_origin_patterns_and_cache(mock_handler):
+    """Test wildcard origins, Vary: Origin and the cached preflight headers."""
+    cors = CORSMiddleware(allow_origins=["https://app.test", "https://*.example.com"], cache_size=2)
+
+    def make_request(method, origin, preflight=False):
+        headers = [(b"origin", origin.encode())]
+        if preflight:
+            headers.append((b"access-control-request-method", b"POST"))
+        scope = {"method": method, "path": "/test", "query_string": b"", "headers": headers}
+        return Request(scope, None)
+
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        return Response("ok", headers={"Vary": "Accept-Encoding"})
+
+    response = await cors(make_request("GET", "https://api.example.com"), handler)
+    assert response.headers["Access-Control-Allow-Origin"] == "https://api.example.com"
+    assert response.headers["Vary"] == "Accept-Encoding, Origin"
+
+    response = await cors(make_request("GET", "https://example.com.evil.test"), handler)
+    assert "Access-Control-Allow-Origin" not in response.headers
+    # Refusals vary on Origin too, so a cache doesn't replay them to allowed origins
+    assert response.headers["Vary"] == "Accept-Encoding, Origin"
+
+    response = await cors(make_request("OPTIONS", "https://app.test", preflight=True), handler)
+    assert response.status_code == 200
+    assert response.headers["Access-Control-Allow-Origin"] == "https://app.test"
+    assert response.headers["Vary"] == "Origin"
+    assert response.body == b""
+    assert len(calls) == 2
+
+    assert cors.headers_for("https://app.test") is cors.headers_for("https://app.test")
+    assert len(cors._cache) == 2
+
+@pytest.mark.asyncio
+async def test_cors_preflight_through_app():
+    """Test that a preflight to a GET-only route is answered by CORSMiddleware."""
+    app = App()
+    app.add_middleware(CORSMiddleware(allow_origins=["https://app.test"]))
+
+    @app.get("/items")
+    async def items(request):
+        return {"items": []}
+
+    client = TestClient(app)
+    response = await client.options("/items", headers={
+        "Origin": "https://app.test",
+        "Access-Control-Request-Method": "GET",
+    })
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == "https://app.test"
+    assert "access-control-allow-methods" in response.headers
+
+    # A plain OPTIONS still gets 405 for the route's methods
+    response = await client.options("/items")
+    assert response.status_code == 405
+    assert response.headers["allow"] == "GET"
+
+    response = await client.get("/items", headers={"Origin": "https://app.test"})
+    assert response.json() == {"items": []}
+    assert response.headers["access-control-allow-origin"] == "https://app.test"
+
+    # Rebuilding the route table reuses the same OPTIONS handler
+    plans = len(dependencies._plans)
+    app._compile()
+    assert len(dependencies._plans) == plans
@@ -0,0 +1,137 @@
+import pytest
+from nasirpy import App, Request, Response, HTTPException, BadRequestError
+from nasirpy.multipart import MultipartParser, UploadFile, parse_options_header
+
+BOUNDARY = b"----nasirpyboundary"
+
+BODY = (
+    b"preamble\r\n"
+    b"------nasirpyboundary\r\n"
+    b'Content-Disposition: form-data; name="title"\r\n\r\n'
+    b"Hello \xc3\xa9\r\n"
+    b"------nasirpyboundary\r\n"
+    b'Content-Disposition: form-data; name="upload"; filename="a.txt"\r\n'
+    b"Content-Type: text/plain\r\n\r\n"
+    + b"x" * 5000 + b"\r\n--not-a-boundary\r\n"
+    b"------nasirpyboundary\r\n"
+    b'Content-Disposition: form-data; name="title"\r\n\r\n'
+    b"second\r\n"
+    b"------nasirpyboundary--\r\n"
+)
+
+
+def make_request(body, chunk_size=7):
+    """Build a multipart request whose body arrives in small chunks."""
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+
+    async def receive():
+        chunk = chunks.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/",
+        "query_string": b"",
+        "headers": [(b"content-type", b"multipart/form-data; boundary=" + BOUNDARY)],
+    }
+    return Request(scope, receive)
+
+
+def test_parse_options_header():
+    """Test splitting Content-Disposition style headers."""
+    assert parse_options_header('form-data; name="a b"; filename="x\\"y.txt"') == (
+        "form-data", {"name": "a b", "filename": 'x"y.txt'}
+    )
+    assert parse_options_header("multipart/form-data; boundary=abc") == (
+        "multipart/form-data", {"boundary": "abc"}
+    )
+
+
+def test_parser_byte_by_byte():
+    """Test that boundaries split across chunks are found."""
+    events = []
+
+    class Recorder:
+        def on_part_begin(self, headers):
+            events.append(("begin", headers["content-disposition"]))
+
+        def on_part_data(self, chunk):
+            if events[-1][0] == "data":
+                events[-1] = ("data", events[-1][1] + chunk)
+            else:
+                events.append(("data", chunk))
+
+        def on_part_end(self):
+            events.append(("end",))
+
+    parser = MultipartParser(BOUNDARY, Recorder())
+    for i in range(len(BODY)):
+        parser.feed_data(BODY[i:i + 1])
+    parser.finish()
+
+    assert [e[0] for e in events] == ["begin", "data", "end"] * 3
+    assert events[1] == ("data", b"Hello \xc3\xa9")
+    assert events[4][1].endswith(b"x\r\n--not-a-boundary")
+    assert len(parser.buffer) <= len(BOUNDARY) + 4
+
+
+@pytest.mark.asyncio
+async def test_request_multipart_form():
+    """Test fields and spooled file uploads from a streamed body."""
+    request = make_request(BODY)
+    form = await request.form(spool_max_size=1024)
+
+    assert form["title"] == ["Hello é", "second"]
+    upload = form["upload"][0]
+    assert isinstance(upload, UploadFile)
+    assert upload.filename == "a.txt"
+    assert upload.content_type == "text/plain"
+    assert upload.size == 5018
+    assert not upload.in_memory
+    assert (await upload.read()).startswith(b"xxxx")
+
+    await request._exit_stack.aclose()
+    assert upload.file.closed
+
+
+@pytest.mark.asyncio
+async def test_request_multipart_limits():
+    """Test per-part, total size and part count limits."""
+    with pytest.raises(HTTPException) as exc_info:
+        await make_request(BODY).form(max_file_size=1000)
+    assert exc_info.value.status_code == 413
+
+    with pytest.raises(HTTPException) as exc_info:
+        await make_request(BODY).form(max_size=100)
+    assert exc_info.value.status_code == 413
+
+    with pytest.raises(BadRequestError, match="Too many multipart parts"):
+        await make_request(BODY).form(max_parts=2)
+
+    with pytest.raises(BadRequestError, match="Incomplete multipart body"):
+        await make_request(BODY[:-30]).form()
+
+
+@pytest.mark.asyncio
+async def test_uploads_closed_after_response():
+    """Test that the app closes uploaded files once the response is sent."""
+    app = App()
+    uploads = []
+
+    @app.post("/upload")
+    async def upload(request):
+        form = await request.form()
+        uploads.append(form["upload"][0])
+        return Response({"size": form["upload"][0].size})
+
+    request = make_request(BODY)
+    scope = dict(request.scope, path="/upload")
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, request.receive, send)
+    assert messages[1]["body"] == b'{"size": 5018}'
+    assert uploads[0].file.closed
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from nasirpy import App, Response
+from nasirpy.replay import (
+    RecordingMiddleware,
+    ReplayReport,
+    compare,
+    format_comparison,
+    load_recording,
+    replay,
+)
+from nasirpy.testclient import TestClient
+
+
+def make_app(delay=0.0, recorder=None):
+    app = App()
+    if recorder is not None:
+        app.add_middleware(recorder)
+
+    @app.get("/users/{user_id}")
+    async def get_user(request):
+        await asyncio.sleep(delay)
+        return Response({"id": request.path_params["user_id"]})
+
+    @app.get("/users/{user_id}/posts/{post_id}")
+    async def get_post(request):
+        return Response(request.path_params)
+
+    @app.post("/users")
+    async def create_user(request):
+        return Response(await request.json(), status_code=201)
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_recording(tmp_path):
+    """Test that sampled requests are written with body, route and status."""
+    path = str(tmp_path / "traffic.jsonl")
+    recorder = RecordingMiddleware(path, buffer_size=2)
+    client = TestClient(make_app(recorder=recorder))
+    await client.get("/users/1", query={"full": "1"}, headers={"Authorization": "secret"})
+    await client.post("/users", json={"name": "ada"})
+    await client.get("/users/users")
+    await client.get("/users/1/posts/1")
+    await recorder.flush()
+
+    records = load_recording(path)
+    assert [(r["m"], r["p"], r["r"], r["s"]) for r in records] == [
+        ("GET", "/users/1", "/users/{user_id}", 200),
+        ("POST", "/users", "/users", 201),
+        # The matched pattern, even when parameter values repeat or equal literals
+        ("GET", "/users/users", "/users/{user_id}", 200),
+        ("GET", "/users/1/posts/1", "/users/{user_id}/posts/{post_id}", 200),
+    ]
+    assert records[0]["q"] == "full=1"
+    assert "authorization" not in dict(records[0]["h"])
+    assert "b" in records[1] and "b" not in records[0]
+    assert records[0]["t"] <= records[1]["t"] <= records[2]["t"] <= records[3]["t"]
+
+    unsampled = RecordingMiddleware(path, sample_rate=0.0)
+    await TestClient(make_app(recorder=unsampled)).get("/users/3")
+    assert unsampled.recorded == 0
+
+
+@pytest.mark.asyncio
+async def test_replay_and_compare(tmp_path):
+    """Test replaying a recording against two versions and comparing them."""
+    path = str(tmp_path / "traffic.jsonl")
+    recorder = RecordingMiddleware(path)
+    client = TestClient(make_app(recorder=recorder))
+    for i in range(5):
+        await client.get(f"/users/{i}")
+        await client.post("/users", json={"name": str(i)})
+    await recorder.flush()
+
+    before = await replay(make_app(), path, speed=None, concurrency=4)
+    assert before.total == 10
+    assert before.routes["GET /users/{user_id}"].status_counts == {200: 5}
+    assert before.routes["POST /users"].status_counts == {201: 5}
+
+    after = await replay(make_app(delay=0.01), path, speed=100.0)
+    assert after.total == 10
+
+    saved = str(tmp_path / "before.json")
+    before.save(saved)
+    before = ReplayReport.load(saved)
+    rows = compare(before, after)
+    assert rows[0]["route"] == "GET /users/{user_id}"  # the regression sorts first
+    assert rows[0]["p50_change"] > 0
+    assert rows[0]["count"] == (5, 5)
+    assert "GET /users/{user_id}" in format_comparison(rows)
@@ -30,7 +30,8 @@ async def test_request_basic_properties(mock_scope, mock_receive):
     
     assert request.method == "GET"
     assert request.path == "/test"
-    assert request.query_params == {"name": ["John"], "age": ["25"]}
+    assert request.query_params == {"name": "John", "age": "25"}
+    assert request.query_params.getlist("name") == ["John"]
     assert request.headers["content-type"] == "application/json"
     assert request.headers["user-agent"] == "pytest"
     assert request.content_type == "application/json"
@@ -168,4 +169,49 @@ async def test_path_params():
     request = Request(scope, mock_receive)
     request.path_params = {"user_id": "123"}
     
-    assert request.path_params["user_id"] == "123"
\ No newline at end of file
+    assert request.path_params["user_id"] == "123"
+
+@pytest.mark.asyncio
+async def test_request_lazy_views(mock_scope, mock_receive):
+    """Test slotted request with lazily built, cached scope views."""
+    request = Request(mock_scope, mock_receive)
+
+    assert not hasattr(request, "__dict__")
+    assert request.headers is request.headers
+    assert request.query_params is request.query_params
+    assert request.headers["Content-Type"] == "application/json"
+    assert "USER-AGENT" in request.headers
+    assert request.headers.get("missing", "default") == "default"
+    assert dict(request.headers) == {"content-type": "application/json", "user-agent": "pytest"}
+    assert request.client is None
+
+    request.state["user"] = "alice"
+    assert request.state == {"user": "alice"}
+
+
+
+@pytest.mark.asyncio
+async def test_request_query_params_multi_value(mock_scope, mock_receive):
+    """Test first-value access, getlist and typed getters."""
+    mock_scope["query_string"] = b"tag=a&tag=b%20c&page=2&debug=true&q=x+y&empty="
+    request = Request(mock_scope, mock_receive)
+    params = request.query_params
+
+    assert params["tag"] == "a"
+    assert params.getlist("tag") == ["a", "b c"]
+    assert params["q"] == "x y"
+    assert params["empty"] == ""
+    assert params.get_int("page") == 2
+    assert params.get_int("missing", 1) == 1
+    assert params.get_bool("debug") is True
+    with pytest.raises(BadRequestError, match="must be an integer"):
+        params.get_int("tag")
+
+
+@pytest.mark.asyncio
+async def test_request_query_params_limits(mock_scope, mock_receive):
+    """Test that oversized query strings are rejected."""
+    mock_scope["query_string"] = b"&".join(b"a=1" for _ in range(2000))
+    request = Request(mock_scope, mock_receive)
+    with pytest.raises(BadRequestError, match="Too many query parameters"):
+        request.query_params
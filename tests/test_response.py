@@ -102,4 +102,82 @@ async def test_response_headers_case_insensitive():
     
     assert response.headers["content-type"] == "application/xml"
     assert response.headers["Content-Type"] == "application/xml"
-    assert response.headers["X-Custom-Header"] == "value1"
\ No newline at end of file
+    assert response.headers["X-Custom-Header"] == "value1"
+
+def test_case_insensitive_dict_constructor():
+    """Test that CaseInsensitiveDict takes the same arguments as dict and lowercases keys."""
+    from nasirpy.response import CaseInsensitiveDict
+
+    headers = CaseInsensitiveDict([("X-A", "1")], X_B="2")
+    assert dict(headers) == {"x-a": "1", "x_b": "2"}
+    assert CaseInsensitiveDict({"ETag": "x"})["etag"] == "x"
+    assert dict(CaseInsensitiveDict()) == {}
+
+@pytest.mark.asyncio
+async def test_response_is_slotted():
+    """Test that responses don't carry a per-instance __dict__ or a cached JSON copy."""
+    response = Response({"message": "Hello"})
+
+    assert not hasattr(response, "__dict__")
+    assert await response.json() == {"message": "Hello"}
+
+def test_response_pre_encoded_headers():
+    """Test that pre-encoded header blocks are emitted as stored and can be overridden."""
+    from nasirpy.response import EncodedHeaders
+
+    block = EncodedHeaders({"X-Frame-Options": "DENY", "X-Static": "1"})
+    response = Response("hi")
+    response.headers.update_encoded(block)
+    response.headers["X-Static"] = "2"
+
+    assert response.headers["x-frame-options"] == "DENY"
+    raw = response.headers.raw()
+    assert raw[1] is block.encoded["x-frame-options"][1]
+    assert (b"x-static", b"2") in raw
+    assert (b"content-type", b"text/plain") in raw
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_stops_on_disconnect():
+    """Test chunked sending and that a disconnect closes the iterator."""
+    import asyncio
+    from nasirpy.response import StreamingResponse
+
+    closed = []
+
+    async def numbers():
+        try:
+            i = 0
+            while True:
+                yield str(i)
+                i += 1
+                await asyncio.sleep(0.001)
+        finally:
+            closed.append(True)
+
+    messages = []
+    disconnect = asyncio.Event()
+
+    async def send(message):
+        messages.append(message)
+        if len(messages) == 4:
+            disconnect.set()
+
+    async def receive():
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    response = StreamingResponse(numbers(), media_type="text/plain")
+    await response.send(send, receive)
+
+    assert messages[0]["type"] == "http.response.start"
+    assert [m["body"] for m in messages[1:4]] == [b"0", b"1", b"2"]
+    assert all(m["more_body"] for m in messages[1:])
+    assert closed == [True]
+
+    # Sync iterators finish with an empty final message
+    messages.clear()
+    await StreamingResponse(iter([b"a", "b"])).send(send)
+    assert [(m.get("body"), m.get("more_body", False)) for m in messages[1:]] == [
+        (b"a", True), (b"b", True), (b"", False),
+    ]
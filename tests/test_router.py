@@ -157,4 +157,58 @@ async def test_router_dynamic_routes():
     # Test non-matching path
     handler, params = router.match_route("GET", "/users/123/comments/456")
     assert handler is None
-    assert params == {}
\ No newline at end of file
+    assert params == {}
+
+def test_route_table_path_parameter():
+    """Test that {name:path} matches the rest of the path, slashes included."""
+    from nasirpy.router import RouteTable
+
+    async def files(request):
+        return request.path_params
+
+    table = RouteTable([("/static/{file:path}", {"GET": files}), ("/users/{id:int}", {"GET": files})])
+    assert table.lookup("/static/css/site.css", "GET") == (files, {"file": "css/site.css"})
+    assert table.lookup("/users/7", "GET") == (files, {"id": "7"})
+    assert table.lookup("/users/7/posts", "GET") == (None, None)
+    assert table.match("/users/7", "GET") == (files, {"id": "7"}, "/users/{id:int}")
+
+
+def test_mount_table_longest_prefix():
+    """Test that mounts match whole segments and the deepest prefix wins."""
+    from nasirpy.router import MountTable
+
+    api, admin = object(), object()
+    table = MountTable({"/api": api, "/api/v1/admin": admin})
+    assert table.match("/api") == ("/api", api)
+    assert table.match("/api/v1/users") == ("/api", api)
+    assert table.match("/api/v1/admin/stats/today") == ("/api/v1/admin", admin)
+    assert table.match("/apix") == (None, None)
+    assert table.match("/") == (None, None)
+    assert MountTable({}).match("/api") == (None, None)
+
+
+def test_host_table_selection():
+    """Test exact, wildcard and default host tables and version fallback."""
+    from nasirpy.router import HostTable, normalize_host
+
+    assert normalize_host("API.Example.com.:443") == "api.example.com"
+    assert normalize_host("[::1]:8000") == "[::1]"
+
+    def handler(request):
+        return None
+
+    groups = {
+        (None, None): [("/a", {"GET": handler})],
+        ("api.example.com", None): [("/b", {"GET": handler})],
+        ("*.example.com", "2"): [("/c", {"GET": handler})],
+    }
+    table = HostTable(groups)
+    assert table.select("api.example.com", None).lookup("/b", "GET")[0] is handler
+    assert table.select("api.example.com", None).lookup("/a", "GET")[0] is handler
+    assert table.select("x.example.com", "2").lookup("/c", "GET")[0] is handler
+    assert table.select("x.example.com", None).lookup("/c", "GET")[0] is None
+    assert table.select("other.org", "2").lookup("/b", "GET")[0] is None
+    assert table.select(None, None) is table.default[None]
+
+    with pytest.raises(ValueError):
+        Router().include_router(Router(host="api.example.com"))
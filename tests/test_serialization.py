@@ -0,0 +1,74 @@
+import json
+import pytest
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from typing import List
+from uuid import UUID
+from nasirpy import Response
+from nasirpy.serialization import default, dumps, get_encoder, register_serializer
+
+
+class Color(Enum):
+    RED = "red"
+
+
+@dataclass
+class Item:
+    sku: str
+    price: Decimal
+    color: Color
+
+
+@dataclass
+class Order:
+    id: UUID
+    created: datetime
+    items: List[Item] = field(default_factory=list)
+
+
+class Money:
+    def __init__(self, cents):
+        self.cents = cents
+
+
+class Euro(Money):
+    pass
+
+
+def test_encoder_cached_per_type():
+    """Test that the encoder for a type is built once."""
+    assert get_encoder(Order) is get_encoder(Order)
+    assert get_encoder(object) is None
+
+
+def test_dumps_nested_dataclasses():
+    """Test serializing dataclasses containing other special types."""
+    order = Order(
+        UUID("12345678-1234-5678-1234-567812345678"),
+        datetime(2024, 1, 2, 3, 4, 5),
+        [Item("A1", Decimal("9.99"), Color.RED)],
+    )
+    assert json.loads(dumps([order])) == [{
+        "id": "12345678-1234-5678-1234-567812345678",
+        "created": "2024-01-02T03:04:05",
+        "items": [{"sku": "A1", "price": "9.99", "color": "red"}],
+    }]
+    assert json.loads(dumps({1, 2})) in ([1, 2], [2, 1])
+
+
+def test_register_serializer_applies_to_subclasses():
+    """Test custom serializers, found through the MRO."""
+    register_serializer(Money, lambda m: {"cents": m.cents})
+    assert json.loads(dumps({"price": Euro(250)})) == {"price": {"cents": 250}}
+
+    with pytest.raises(TypeError, match="not JSON serializable"):
+        default(object())
+
+
+def test_response_serializes_objects():
+    """Test that Response encodes lists and dataclasses as JSON."""
+    response = Response([Item("A1", Decimal("1"), Color.RED)])
+    assert response.headers["content-type"] == "application/json"
+    assert json.loads(response.body) == [{"sku": "A1", "price": "1", "color": "red"}]
@@ -0,0 +1,180 @@
+import asyncio
+import pytest
+from nasirpy import App, Response
+from nasirpy.server import HTTPServer, HTTPParser, parse_request_head, httptools
+
+PARSERS = ["python"] + (["httptools"] if httptools is not None else [])
+
+
+@pytest.fixture(params=PARSERS)
+def http_parser(request):
+    """Run server tests against every available parser."""
+    return request.param
+
+
+@pytest.fixture
+def app():
+    """Create an app with a couple of routes."""
+    app = App()
+
+    @app.get("/hello")
+    async def hello(request):
+        return Response({"message": "hello"})
+
+    @app.post("/echo")
+    async def echo(request):
+        return Response(await request.body())
+
+    @app.get("/started")
+    async def started(request):
+        return Response({"started": app.started})
+
+    return app
+
+
+async def start_server(app, http_parser, **kwargs):
+    """Start an HTTPServer on an ephemeral port and return it with its task."""
+    server = HTTPServer(app, port=0, http_parser=http_parser, **kwargs)
+    task = asyncio.create_task(server.serve(server.create_socket()))
+    await server.wait_started()
+    return server, task
+
+
+async def read_response(reader):
+    """Read one Content-Length delimited response."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.split(b"\r\n")
+    headers = dict(line.split(b": ", 1) for line in lines[1:] if line)
+    body = await reader.readexactly(int(headers[b"content-length"]))
+    return lines[0], headers, body
+
+
+def test_parse_request_head():
+    """Test parsing of the request line and headers."""
+    method, target, version, headers = parse_request_head(
+        b"GET /a?b=1 HTTP/1.1\r\nHost: example.com\r\nX-Test:  value \r\n\r\n"
+    )
+    assert method == "GET"
+    assert target == b"/a?b=1"
+    assert version == "1.1"
+    assert headers == [(b"host", b"example.com"), (b"x-test", b"value")]
+
+    with pytest.raises(ValueError):
+        parse_request_head(b"GARBAGE\r\n\r\n")
+
+
+def test_http_parser_incremental():
+    """Test feeding pipelined and chunked requests one byte at a time."""
+    events = []
+
+    class Recorder:
+        def on_headers(self, method, target, version, headers, keep_alive):
+            events.append(("headers", method, target, keep_alive))
+
+        def on_body(self, chunk):
+            events.append(("body", chunk))
+
+        def on_message_complete(self):
+            events.append(("complete",))
+
+    data = (
+        b"POST /a HTTP/1.1\r\nContent-Length: 3\r\n\r\nabc"
+        b"POST /b HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n2\r\nde\r\n0\r\n\r\n"
+        b"GET /c HTTP/1.0\r\n\r\n"
+    )
+    parser = HTTPParser(Recorder())
+    for i in range(len(data)):
+        parser.feed_data(data[i:i + 1])
+
+    assert [e for e in events if e[0] == "headers"] == [
+        ("headers", "POST", b"/a", True),
+        ("headers", "POST", b"/b", True),
+        ("headers", "GET", b"/c", False),
+    ]
+    assert b"".join(e[1] for e in events[:events.index(("complete",))] if e[0] == "body") == b"abc"
+    assert events.count(("complete",)) == 3
+    assert len(parser.buffer) == 0
+
+
+@pytest.mark.asyncio
+async def test_server_keep_alive_pipelining(app, http_parser):
+    """Test that pipelined requests on one connection are answered in order."""
+    server, task = await start_server(app, http_parser)
+    port = server.sockets[0].getsockname()[1]
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        b"GET /hello HTTP/1.1\r\nHost: test\r\n\r\n"
+        b"POST /echo HTTP/1.1\r\nHost: test\r\nContent-Length: 4\r\n\r\nping"
+    )
+    status1, _, body1 = await read_response(reader)
+    status2, _, body2 = await read_response(reader)
+    assert status1 == b"HTTP/1.1 200 OK"
+    assert body1 == b'{"message": "hello"}'
+    assert status2 == b"HTTP/1.1 200 OK"
+    assert body2 == b"ping"
+    writer.close()
+
+    server.shutdown()
+    await task
+    assert server.requests_served == 2
+
+
+@pytest.mark.asyncio
+async def test_server_chunked_request_and_close(app, http_parser):
+    """Test chunked request bodies and Connection: close."""
+    server, task = await start_server(app, http_parser)
+    port = server.sockets[0].getsockname()[1]
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        b"POST /echo HTTP/1.1\r\nTransfer-Encoding: chunked\r\nConnection: close\r\n\r\n"
+        b"3\r\nabc\r\n2\r\nde\r\n0\r\n\r\n"
+    )
+    status, headers, body = await read_response(reader)
+    assert status == b"HTTP/1.1 200 OK"
+    assert headers[b"connection"] == b"close"
+    assert body == b"abcde"
+    assert await reader.read() == b""
+    writer.close()
+
+    server.shutdown()
+    await task
+
+
+@pytest.mark.asyncio
+async def test_server_recycles_after_max_requests(app, http_parser):
+    """Test that serve() stops after max_requests."""
+    server, task = await start_server(app, http_parser, max_requests=1)
+    port = server.sockets[0].getsockname()[1]
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /hello HTTP/1.1\r\n\r\n")
+    status, headers, _ = await read_response(reader)
+    assert status == b"HTTP/1.1 200 OK"
+    assert headers[b"connection"] == b"close"
+    writer.close()
+
+    await asyncio.wait_for(task, timeout=5)
+
+
+@pytest.mark.asyncio
+async def test_server_runs_lifespan(app, http_parser):
+    """Test that the server runs startup before serving and shutdown after."""
+    events = []
+    app.on_startup(lambda: events.append("startup"))
+    app.on_shutdown(lambda: events.append("shutdown"))
+
+    server, task = await start_server(app, http_parser)
+    assert events == ["startup"]
+    port = server.sockets[0].getsockname()[1]
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /started HTTP/1.1\r\n\r\n")
+    _, _, body = await read_response(reader)
+    assert body == b'{"started": true}'
+    writer.close()
+
+    server.shutdown()
+    await task
+    assert events == ["startup", "shutdown"]
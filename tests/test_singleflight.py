@@ -0,0 +1,140 @@
+import asyncio
+import pytest
+from nasirpy import App, BackgroundTasks, Response, StreamingResponse, single_flight
+from nasirpy.singleflight import get_single_flight
+from nasirpy.testclient import TestClient
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_share_one_call():
+    """Test that concurrent identical GETs run the handler once."""
+    app = App()
+    calls = []
+    release = asyncio.Event()
+
+    @app.get("/items/{item_id}")
+    @single_flight(query=["currency"], headers=["accept-language"])
+    async def item(request):
+        calls.append((request.path_params["item_id"], request.query_params.get("currency")))
+        await release.wait()
+        return Response({"id": request.path_params["item_id"]})
+
+    async def tag(request, call_next):
+        response = await call_next(request)
+        response.headers["x-request"] = request.query_params.get("n", "")
+        return response
+
+    app.add_middleware(tag)
+
+    client = TestClient(app)
+    requests = [
+        client.get("/items/1", query={"currency": "EUR", "n": str(n)}) for n in range(5)
+    ] + [
+        client.get("/items/1", query={"currency": "USD"}),                   # other query value
+        client.get("/items/1", query={"currency": "EUR"}, headers={"Accept-Language": "de"}),
+        client.get("/items/2", query={"currency": "EUR"}),                   # other path
+    ]
+    tasks = [asyncio.ensure_future(request) for request in requests]
+    await asyncio.sleep(0.01)
+    flight = get_single_flight(item)
+    assert flight.in_flight == 4
+    release.set()
+    responses = await asyncio.gather(*tasks)
+
+    assert len(calls) == 4
+    assert flight.executions == 4
+    assert flight.coalesced == 4
+    assert flight.in_flight == 0
+    assert all(response.json()["id"] in ("1", "2") for response in responses)
+    # Middleware changed each copy, not a shared response
+    assert [response.headers["x-request"] for response in responses[:5]] == ["0", "1", "2", "3", "4"]
+
+
+@pytest.mark.asyncio
+async def test_errors_background_and_unshared_responses():
+    """Test exceptions fan out, background runs once and streams aren't shared."""
+    app = App()
+    ran = []
+    stream_calls = []
+
+    @app.get("/fail")
+    @single_flight()
+    async def fail(request):
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    @app.get("/bg")
+    @single_flight()
+    async def bg(request):
+        await asyncio.sleep(0.01)
+        tasks = BackgroundTasks()
+        tasks.add_task(ran.append, 1)
+        return Response("ok", background=tasks)
+
+    @app.get("/stream")
+    @single_flight()
+    async def stream(request):
+        stream_calls.append(1)
+        await asyncio.sleep(0.01)
+
+        async def body():
+            yield b"x"
+        return StreamingResponse(body())
+
+    @app.post("/bg")
+    @single_flight()
+    async def post(request):
+        return Response("posted")
+
+    client = TestClient(app)
+    responses = await asyncio.gather(*(client.get("/fail") for _ in range(3)))
+    assert [response.status_code for response in responses] == [500] * 3
+    assert get_single_flight(fail).executions == 1
+
+    responses = await asyncio.gather(*(client.get("/bg") for _ in range(3)))
+    assert [response.text for response in responses] == ["ok"] * 3
+    assert ran == [1]
+
+    responses = await asyncio.gather(*(client.get("/stream") for _ in range(3)))
+    assert [response.body for response in responses] == [b"x"] * 3
+    assert len(stream_calls) == 3
+
+    await asyncio.gather(*(client.post("/bg") for _ in range(3)))
+    assert get_single_flight(post).executions == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_keeps_call_for_waiters():
+    """Test that the call survives its first request being cancelled."""
+    app = App()
+    release = asyncio.Event()
+    calls = []
+
+    @app.get("/slow")
+    @single_flight()
+    async def slow(request):
+        calls.append(1)
+        await release.wait()
+        return Response("done")
+
+    client = TestClient(app)
+    leader = asyncio.ensure_future(client.get("/slow"))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(client.get("/slow"))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert (await follower).text == "done"
+    assert len(calls) == 1
+
+    # With nobody waiting the call is cancelled and the next request starts anew
+    release.clear()
+    lone = asyncio.ensure_future(client.get("/slow"))
+    await asyncio.sleep(0.01)
+    lone.cancel()
+    await asyncio.sleep(0)
+    assert get_single_flight(slow).in_flight == 0
+    release.set()
+    assert (await client.get("/slow")).text == "done"
+    assert len(calls) == 3
@@ -0,0 +1,129 @@
+import asyncio
+import pytest
+from nasirpy import App, EventSourceResponse, ServerSentEvent, EventPublisher
+
+
+def test_event_encoding():
+    """Test the wire format of events."""
+    event = ServerSentEvent("line one\nline two", event="update", id="7", retry=3000)
+    assert event.encode() == b"event: update\nid: 7\nretry: 3000\ndata: line one\ndata: line two\n\n"
+    assert ServerSentEvent({"n": 1}).encode() == b'data: {"n": 1}\n\n'
+    assert ServerSentEvent(comment="hi").encode() == b": hi\n\n"
+
+
+def test_event_source_header_overrides():
+    """Test that user headers replace the defaults case-insensitively."""
+    async def events():
+        yield "x"
+
+    response = EventSourceResponse(events(), headers={"Cache-Control": "no-store", "X-Custom": "1"})
+    raw = response.headers.raw()
+    assert [v for k, v in raw if k == b"cache-control"] == [b"no-store"]
+    assert "X-Custom" in response.headers
+    assert response.headers["content-type"] == "text/event-stream; charset=utf-8"
+
+
+@pytest.mark.asyncio
+async def test_event_source_route_with_heartbeat():
+    """Test headers, event formatting and pings while the source is idle."""
+    app = App()
+
+    @app.get("/events")
+    async def events(request):
+        async def source():
+            yield "hello"
+            await asyncio.sleep(0.05)
+            yield ServerSentEvent({"done": True}, event="end")
+        return EventSourceResponse(source(), ping=0.01)
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        await asyncio.sleep(10)
+
+    scope = {"type": "http", "method": "GET", "path": "/events", "query_string": b"", "headers": []}
+    await app(scope, receive, send)
+
+    headers = dict(messages[0]["headers"])
+    assert headers[b"content-type"] == b"text/event-stream; charset=utf-8"
+    assert headers[b"cache-control"] == b"no-cache"
+    bodies = [m["body"] for m in messages[1:]]
+    assert bodies[0] == b"data: hello\n\n"
+    assert b": ping\n\n" in bodies
+    assert bodies[-2] == b'event: end\ndata: {"done": true}\n\n'
+    assert bodies[-1] == b""
+
+
+@pytest.mark.asyncio
+async def test_publisher_encodes_once_and_unsubscribes():
+    """Test fan-out of shared bytes, dropping for slow subscribers and cleanup."""
+    publisher = EventPublisher(max_queue=2)
+    fast, slow = publisher.subscribe(), publisher.subscribe()
+
+    publisher.publish({"n": 1}, event="tick")
+    received = await fast.__anext__()
+    assert received == b'event: tick\ndata: {"n": 1}\n\n'
+
+    publisher.publish({"n": 2})
+    publisher.publish({"n": 3})
+    assert publisher.dropped == 1
+    assert await slow.__anext__() == b'data: {"n": 2}\n\n'
+    assert await fast.__anext__() == b'data: {"n": 2}\n\n'
+    # Every subscriber gets the same encoded object
+    assert await fast.__anext__() is await slow.__anext__()
+
+    await fast.aclose()
+    await slow.aclose()
+    assert len(publisher) == 0
+    assert publisher.publish("nobody") == 0
+
+
+@pytest.mark.asyncio
+async def test_publisher_response_stops_on_disconnect():
+    """Test that a disconnected client is removed from the publisher."""
+    publisher = EventPublisher()
+    disconnect = asyncio.Event()
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    response = publisher.response(ping=None)
+    task = asyncio.ensure_future(response.send(send, receive))
+    # The client is subscribed once streaming starts
+    while not len(publisher):
+        await asyncio.sleep(0)
+    publisher.publish("first")
+    await asyncio.sleep(0.01)
+    disconnect.set()
+    await task
+
+    assert messages[1]["body"] == b"data: first\n\n"
+    assert len(publisher) == 0
+
+
+@pytest.mark.asyncio
+async def test_publisher_response_subscribes_only_when_sent():
+    """Test that unsent or failed responses don't leave subscribers behind."""
+    publisher = EventPublisher()
+    response = publisher.response(ping=None)
+    assert len(publisher) == 0
+    del response
+    assert len(publisher) == 0
+
+    async def send(message):
+        raise ConnectionResetError
+
+    async def receive():
+        await asyncio.sleep(10)
+
+    with pytest.raises(ConnectionResetError):
+        await publisher.response(ping=None).send(send, receive)
+    assert len(publisher) == 0
@@ -0,0 +1,145 @@
+import os
+import pytest
+from nasirpy import App, Router
+from nasirpy.staticfiles import StaticFiles, parse_range
+from nasirpy.exceptions import HTTPException
+
+
+@pytest.fixture
+def public(tmp_path):
+    """A directory with a small file, a large file and a secret next to it."""
+    root = tmp_path / "public"
+    (root / "css").mkdir(parents=True)
+    (root / "index.html").write_text("<h1>home</h1>")
+    (root / "css" / "site.css").write_text("body { color: red; }")
+    (root / "big.bin").write_bytes(bytes(range(256)) * 1024)
+    (tmp_path / "secret.txt").write_text("secret")
+    os.symlink(tmp_path / "secret.txt", root / "link.txt")
+    return root
+
+
+async def get(app, path, headers=(), method="GET", extensions=None):
+    """Run one request through the app and collect the response."""
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [(k.encode(), v.encode()) for k, v in headers],
+    }
+    if extensions is not None:
+        scope["extensions"] = extensions
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    body = b"".join(bytes(m.get("body", b"")) for m in messages[1:])
+    return messages[0]["status"], dict(messages[0]["headers"]), body, messages
+
+
+@pytest.mark.asyncio
+async def test_static_files_serving_and_caching(public):
+    """Test content types, validators, 304s and that cache hits skip the disk."""
+    app = App()
+    router = Router(prefix="/assets")
+    files = router.static("/", str(public), cache_control="public, max-age=60", stat_ttl=60)
+    app.include_router(router)
+
+    status, headers, body, _ = await get(app, "/assets/css/site.css")
+    assert status == 200
+    assert body == b"body { color: red; }"
+    assert headers[b"content-type"] == b"text/css; charset=utf-8"
+    assert headers[b"content-length"] == b"20"
+    assert headers[b"cache-control"] == b"public, max-age=60"
+    etag = headers[b"etag"].decode()
+    last_modified = headers[b"last-modified"].decode()
+
+    status, _, body, _ = await get(app, "/assets/")
+    assert (status, body) == (200, b"<h1>home</h1>")
+
+    status, headers, body, _ = await get(app, "/assets/css/site.css", [("if-none-match", f'W/{etag}, "other"')])
+    assert (status, body) == (304, b"")
+    assert headers[b"etag"] == etag.encode()
+    status, _, _, _ = await get(app, "/assets/css/site.css", [("if-modified-since", last_modified)])
+    assert status == 304
+
+    # Within stat_ttl the cached copy is served without checking the file
+    (public / "css" / "site.css").write_text("changed")
+    _, _, body, _ = await get(app, "/assets/css/site.css")
+    assert body == b"body { color: red; }"
+    files.stat_ttl = 0
+    _, _, body, _ = await get(app, "/assets/css/site.css")
+    assert body == b"changed"
+    assert files.cache_bytes == sum(len(e.body) for e in files._cache.values() if e.body is not None)
+
+
+@pytest.mark.asyncio
+async def test_static_files_refuse_paths_outside_directory(public):
+    """Test that traversal, symlinks out of the directory and missing files are 404s."""
+    app = App()
+    app.static("/static", str(public))
+
+    for path in ("/static/../secret.txt", "/static/link.txt", "/static/missing.txt", "/static/css"):
+        status, _, _, _ = await get(app, path)
+        assert status == 404, path
+    status, headers, _, _ = await get(app, "/static/index.html", method="POST")
+    assert status == 405
+
+
+@pytest.mark.asyncio
+async def test_static_files_large_files_and_ranges(public):
+    """Test mmap streaming, pathsend, 206 responses and If-Range."""
+    app = App()
+    app.static("/static", str(public), max_cached_file_size=1024, chunk_size=100_000)
+    data = (public / "big.bin").read_bytes()
+
+    status, headers, body, messages = await get(app, "/static/big.bin")
+    assert status == 200 and body == data
+    assert headers[b"content-type"] == b"application/octet-stream"
+    assert len(messages) == 4  # start + 3 slices of the mapping
+    assert all(type(message["body"]) is bytes for message in messages[1:])
+
+    # HEAD gets the headers only, without the file being mapped
+    status, headers, body, messages = await get(app, "/static/big.bin", method="HEAD")
+    assert status == 200 and body == b"" and len(messages) == 2
+    assert headers[b"content-length"] == str(len(data)).encode()
+    status, headers, body, _ = await get(app, "/static/big.bin", [("range", "bytes=0-9")], method="HEAD")
+    assert (status, body, headers[b"content-length"]) == (206, b"", b"10")
+
+    _, _, _, messages = await get(app, "/static/big.bin", extensions={"http.response.pathsend": {}})
+    assert messages[1] == {"type": "http.response.pathsend", "path": str(public / "big.bin")}
+
+    status, headers, body, _ = await get(app, "/static/big.bin", [("range", "bytes=1000-1999")])
+    assert status == 206 and body == data[1000:2000]
+    assert headers[b"content-range"] == f"bytes 1000-1999/{len(data)}".encode()
+    etag = headers[b"etag"].decode()
+
+    status, _, body, _ = await get(app, "/static/css/site.css", [("range", "bytes=-3")])
+    assert (status, body) == (206, b"; }")
+
+    status, _, body, _ = await get(app, "/static/big.bin", [("range", "bytes=0-9"), ("if-range", '"stale"')])
+    assert status == 200 and len(body) == len(data)
+    status, _, body, _ = await get(app, "/static/big.bin", [("range", "bytes=0-9"), ("if-range", etag)])
+    assert (status, body) == (206, data[:10])
+
+    status, headers, _, _ = await get(app, "/static/big.bin", [("range", f"bytes={len(data)}-")])
+    assert status == 416
+    assert headers[b"content-range"] == f"bytes */{len(data)}".encode()
+
+
+def test_parse_range():
+    """Test single ranges, suffixes and headers that are ignored."""
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=500-5000", 1000) == (500, 999)
+    assert parse_range("bytes=0-1,5-6", 1000) is None
+    assert parse_range("items=0-1", 1000) is None
+    assert parse_range("bytes=5-1", 1000) is None
+    with pytest.raises(HTTPException):
+        parse_range("bytes=-0", 1000)
@@ -0,0 +1,164 @@
+import asyncio
+import pytest
+from nasirpy import App, EventSourceResponse, Response, StreamingResponse, bulkhead
+from nasirpy.testclient import LoadReport, TestClient
+
+
+def make_app():
+    app = App()
+
+    @app.get("/items/{item_id}")
+    async def get_item(request):
+        return Response({"id": int(request.path_params["item_id"]), "q": request.query_params.get("q")})
+
+    @app.post("/echo")
+    async def echo(request):
+        return Response({"body": (await request.body()).decode(), "type": request.headers.get("content-type")})
+
+    @app.get("/fail")
+    async def fail(request):
+        raise ValueError("boom")
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_get_json_and_query():
+    """Test a GET with path and query parameters."""
+    client = TestClient(make_app())
+    response = await client.get("/items/7", query={"q": "x"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/json")
+    assert response.json() == {"id": 7, "q": "x"}
+
+    response = await client.get("/items/8?q=y")
+    assert response.json() == {"id": 8, "q": "y"}
+
+
+@pytest.mark.asyncio
+async def test_chunked_request_body():
+    """Test that a body split into messages reaches the handler whole."""
+    chunks = []
+    app = make_app()
+
+    async def recording_app(scope, receive, send):
+        async def counting_receive():
+            message = await receive()
+            chunks.append(message.get("body"))
+            return message
+        await app(scope, counting_receive, send)
+
+    client = TestClient(recording_app)
+    response = await client.post("/echo", body="abcdefghij", chunk_size=3)
+    assert response.json() == {"body": "abcdefghij", "type": None}
+    assert chunks[:4] == [b"abc", b"def", b"ghi", b"j"]
+
+    response = await client.post("/echo", json={"a": 1})
+    assert response.json() == {"body": '{"a": 1}', "type": "application/json"}
+
+
+@pytest.mark.asyncio
+async def test_streaming_chunks_and_disconnect():
+    """Test that streamed chunks are kept and a disconnect stops the stream."""
+    app = App()
+    closed = asyncio.Event()
+
+    @app.get("/count")
+    async def count(request):
+        async def numbers():
+            for i in range(3):
+                yield f"{i}\n"
+        return StreamingResponse(numbers(), media_type="text/plain")
+
+    @app.get("/events")
+    async def events(request):
+        async def forever():
+            try:
+                while True:
+                    yield {"tick": 1}
+                    await asyncio.sleep(0.01)
+            finally:
+                closed.set()
+        return EventSourceResponse(forever())
+
+    client = TestClient(app)
+    response = await client.get("/count")
+    assert response.chunks == [b"0\n", b"1\n", b"2\n"]
+    assert not response.disconnected
+
+    response = await client.get("/events", disconnect_after=0.05)
+    assert response.disconnected
+    assert response.status_code == 200
+    assert response.text.startswith('data: {"tick": 1}\n\n')
+    assert closed.is_set()
+
+
+@pytest.mark.asyncio
+async def test_lifespan_and_app_exceptions():
+    """Test lifespan startup/shutdown and exceptions escaping the app."""
+    app = make_app()
+    calls = []
+
+    @app.on_startup
+    async def start():
+        calls.append("startup")
+
+    @app.on_shutdown
+    async def stop():
+        calls.append("shutdown")
+
+    async with TestClient(app) as client:
+        assert calls == ["startup"]
+        response = await client.get("/fail")
+        assert response.status_code == 500
+    assert calls == ["startup", "shutdown"]
+
+    async def broken(scope, receive, send):
+        raise RuntimeError("no")
+
+    with pytest.raises(RuntimeError):
+        await TestClient(broken).get("/")
+
+    response = await TestClient(broken, raise_app_exceptions=False).get("/")
+    assert response.status_code == 500
+    assert response.text == "Internal Server Error"
+
+
+@pytest.mark.asyncio
+async def test_load_mix_and_admission_control():
+    """Test that load reports latencies, statuses and shed requests."""
+    app = make_app()
+
+    @app.get("/slow")
+    @bulkhead(2)
+    async def slow(request):
+        await asyncio.sleep(0.01)
+        return Response({"ok": True})
+
+    client = TestClient(app)
+    report = await client.load(
+        [(3, {"path": "/items/1"}), (1, {"path": "/slow"}), (1, {"method": "POST", "path": "/echo", "body": b"x"})],
+        requests=200,
+        concurrency=20,
+        seed=1,
+    )
+    assert report.total == 200
+    assert report.status_counts[200] > 0
+    assert report.status_counts.get(503, 0) > 0  # the bulkhead shed some /slow requests
+    assert report.errors == report.status_counts[503]
+    assert 0 < report.error_rate < 1
+    assert report.throughput > 0
+    assert report.percentile(50) <= report.percentile(99) <= max(report.latencies)
+    assert "200 requests" in str(report)
+
+
+def test_load_report_percentiles():
+    """Test nearest-rank percentiles and error counting."""
+    report = LoadReport()
+    for i in range(1, 101):
+        report.record(i / 1000, 200, None)
+    report.record(0.5, None, ValueError())
+    assert report.percentile(50) == 0.051
+    assert report.percentile(100) == 0.5
+    assert report.errors == 1
+    assert report.exceptions == {"ValueError": 1}
@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from nasirpy import App, Request, Response, StreamingResponse, timeout, cancel_on_disconnect
+
+
+@pytest.mark.asyncio
+async def test_route_and_app_timeouts(call):
+    """Test 504 from the app-wide timeout and a per-route override."""
+    app = App()
+    app.set_request_timeout(0.01)
+
+    @app.get("/slow")
+    async def slow(request):
+        await asyncio.sleep(1)
+
+    @app.get("/patient")
+    @timeout(1)
+    async def patient(request):
+        await asyncio.sleep(0.05)
+        return Response("done")
+
+    status, _, body = await call(app, "/slow")
+    assert (status, body) == (504, b'{"error": "Gateway Timeout"}')
+    status, _, body = await call(app, "/patient")
+    assert (status, body) == (200, b"done")
+
+
+@pytest.mark.asyncio
+async def test_handler_cancelled_on_disconnect(call, make_receive):
+    """Test that a disconnect cancels the handler while the body stays readable."""
+    app = App()
+    disconnect = asyncio.Event()
+    events = []
+
+    @app.post("/work")
+    @cancel_on_disconnect
+    async def work(request):
+        events.append(await request.body())
+        disconnect.set()
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+
+    status, _, _ = await call(app, "/work", "POST", receive=make_receive(b"payload", disconnect))
+    assert status == 499
+    assert events == [b"payload", "cancelled"]
+
+
+@pytest.mark.asyncio
+async def test_disconnect_seen_behind_unread_body(call):
+    """Test that body chunks the handler never reads don't hide the disconnect."""
+    app = App()
+    chunks = [{"type": "http.request", "body": b"x", "more_body": True} for _ in range(3)]
+    chunks.append({"type": "http.request", "body": b"", "more_body": False})
+
+    async def receive():
+        if chunks:
+            return chunks.pop(0)
+        return {"type": "http.disconnect"}
+
+    @app.post("/upload")
+    @cancel_on_disconnect
+    async def upload(request):
+        await asyncio.sleep(1)
+
+    status, _, _ = await asyncio.wait_for(call(app, "/upload", "POST", receive=receive), 0.5)
+    assert status == 499
+
+
+@pytest.mark.asyncio
+async def test_request_is_disconnected(make_scope, make_receive):
+    """Test cooperative polling for a disconnect."""
+    disconnect = asyncio.Event()
+    request = Request(make_scope(), make_receive(b"abc", disconnect))
+
+    assert not await request.is_disconnected()
+    assert await request.body() == b"abc"
+    disconnect.set()
+    await asyncio.sleep(0)
+    assert await request.is_disconnected()
+
+
+@pytest.mark.asyncio
+async def test_stream_sees_disconnect_after_polling(make_scope):
+    """Test that a pending is_disconnected() poll doesn't swallow the disconnect."""
+    app = App()
+    # A server queue: each message goes to one receive() call only
+    messages = asyncio.Queue()
+    messages.put_nowait({"type": "http.request", "body": b"", "more_body": False})
+    closed = []
+
+    async def ticks():
+        try:
+            while True:
+                yield b"tick"
+                await asyncio.sleep(0.001)
+        finally:
+            closed.append(True)
+
+    @app.get("/ticks")
+    async def stream(request):
+        assert not await request.is_disconnected()
+        return StreamingResponse(ticks())
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            # Once the stream's disconnect listener is waiting too
+            asyncio.get_running_loop().call_later(0.01, messages.put_nowait, {"type": "http.disconnect"})
+
+    await asyncio.wait_for(app(make_scope("/ticks"), messages.get, send), 1)
+    assert closed == [True]
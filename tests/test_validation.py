@@ -0,0 +1,147 @@
+import json
+import sys
+import pytest
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Literal, Optional, TypedDict
+from nasirpy import App, RequestValidationError
+from nasirpy.validation import get_decoder, get_validator, is_model_type, _get_msgspec
+from nasirpy.exceptions import BadRequestError
+
+
+@dataclass
+class Address:
+    city: str
+    zip_code: Optional[str] = None
+
+
+@dataclass
+class UserIn:
+    name: str
+    age: int
+    tags: List[str] = field(default_factory=list)
+    address: Optional[Address] = None
+    role: Literal["admin", "user"] = "user"
+
+
+class Point(TypedDict):
+    x: float
+    y: float
+
+
+@dataclass
+class Node:
+    value: int
+    children: List["Node"] = field(default_factory=list)
+
+
+def test_is_model_type():
+    """Test detection of body model annotations."""
+    assert is_model_type(UserIn)
+    assert is_model_type(Point)
+    assert not is_model_type(dict)
+    assert not is_model_type(int)
+
+
+def test_decoder_is_cached():
+    """Test that decoders are compiled once per type."""
+    assert get_decoder(UserIn) is get_decoder(UserIn)
+
+
+def test_decode_nested_models():
+    """Test decoding into nested dataclasses, TypedDicts and containers."""
+    user = get_decoder(UserIn)(
+        b'{"name": "Ann", "age": 30, "tags": ["a"], "address": {"city": "Oslo"}, "extra": 1}'
+    )
+    assert user == UserIn("Ann", 30, ["a"], Address("Oslo"))
+    assert get_decoder(Point)(b'{"x": 1, "y": 2.5}') == {"x": 1.0, "y": 2.5}
+
+
+@pytest.mark.skipif(bool(_get_msgspec()), reason="field error details come from the built-in validator")
+def test_validator_collects_field_errors():
+    """Test that every field error is reported with its location."""
+    with pytest.raises(RequestValidationError) as exc_info:
+        get_decoder(UserIn)(b'{"age": true, "tags": ["a", 1], "address": {}, "role": "root"}')
+    assert exc_info.value.status_code == 422
+    assert exc_info.value.errors == [
+        {"loc": ["body", "name"], "msg": "field required"},
+        {"loc": ["body", "age"], "msg": "must be an integer"},
+        {"loc": ["body", "tags", 1], "msg": "must be a string"},
+        {"loc": ["body", "address"], "msg": "does not match any allowed type"},
+        {"loc": ["body", "role"], "msg": "must be one of [\"'admin'\", \"'user'\"]"},
+    ]
+
+    with pytest.raises(BadRequestError, match="Invalid JSON"):
+        get_decoder(UserIn)(b"{not json")
+
+
+def test_validator_self_referencing_and_simple_types():
+    """Test recursive models and string-parsed types."""
+    tree = get_validator(Node)({"value": 1, "children": [{"value": 2}]}, ("body",), [])
+    assert tree == Node(1, [Node(2)])
+
+    errors = []
+    assert get_validator(Dict[str, date])({"d": "2024-01-02"}, ("body",), errors) == {"d": date(2024, 1, 2)}
+    assert errors == []
+
+
+def test_validator_failed_compile_is_not_cached():
+    """Test that a type that can't be compiled fails every time instead of recursing."""
+    @dataclass
+    class Broken:
+        child: "Missing"  # noqa: F821
+
+    for _ in range(2):
+        with pytest.raises(NameError):
+            get_validator(Broken)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="X | Y unions need Python 3.10")
+def test_validator_pep604_union():
+    """Test that int | None fields are validated like Optional[int]."""
+    @dataclass
+    class Item:
+        count: "int | None" = None
+
+    validate = get_validator(Item)
+    assert validate({"count": 3}, ("body",), []) == Item(3)
+    assert validate({"count": None}, ("body",), []) == Item(None)
+    errors = []
+    validate({"count": "x"}, ("body",), errors)
+    assert errors == [{"loc": ["body", "count"], "msg": "does not match any allowed type"}]
+
+
+@pytest.mark.asyncio
+async def test_handler_receives_model():
+    """Test a handler declaring its body as a dataclass."""
+    app = App()
+
+    @app.post("/users")
+    async def create_user(user: UserIn):
+        return {"name": user.name, "age": user.age}
+
+    async def call(body, content_type=b"application/json"):
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http", "method": "POST", "path": "/users", "query_string": b"",
+            "headers": [(b"content-type", content_type)],
+        }
+        await app(scope, receive, send)
+        return messages[0]["status"], json.loads(messages[1]["body"])
+
+    assert await call(b'{"name": "Ann", "age": 30}') == (200, {"name": "Ann", "age": 30})
+
+    status, body = await call(b'{"name": "Ann"}')
+    assert status == 422
+    assert body["error"] == "Validation failed"
+    assert body["errors"]
+
+    status, _ = await call(b'{"name": "Ann", "age": 30}', b"text/plain")
+    assert status == 400
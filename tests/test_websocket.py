@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from nasirpy import App, Router, Broadcast, WebSocket
+from nasirpy.testclient import TestClient
+
+
+class FakeClient:
+    """In-memory ASGI websocket client."""
+
+    def __init__(self, messages=()):
+        self.inbox = asyncio.Queue()
+        for message in messages:
+            self.inbox.put_nowait(message)
+        self.sent = []
+
+    async def receive(self):
+        return await self.inbox.get()
+
+    async def send(self, message):
+        self.sent.append(message)
+
+
+def make_scope(path):
+    """Build a websocket scope."""
+    return {"type": "websocket", "path": path, "query_string": b"", "headers": []}
+
+
+@pytest.mark.asyncio
+async def test_websocket_route_echo():
+    """Test routing, path params, JSON helpers and close on disconnect."""
+    app = App()
+    rooms = Router(prefix="/ws")
+
+    @rooms.websocket("/rooms/{room}")
+    async def room(websocket: WebSocket):
+        await websocket.accept()
+        async for message in websocket.iter_json():
+            await websocket.send_json({"room": websocket.path_params["room"], "echo": message})
+
+    app.include_router(rooms)
+    client = FakeClient([
+        {"type": "websocket.connect"},
+        {"type": "websocket.receive", "text": '{"n": 1}'},
+        {"type": "websocket.disconnect", "code": 1000},
+    ])
+    await app(make_scope("/ws/rooms/lobby"), client.receive, client.send)
+
+    assert client.sent == [
+        {"type": "websocket.accept", "subprotocol": None, "headers": []},
+        {"type": "websocket.send", "text": '{"room": "lobby", "echo": {"n": 1}}'},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_websocket_unknown_route_and_idle_timeout():
+    """Test rejection of unknown paths and the idle timeout."""
+    app = App()
+
+    @app.websocket("/idle", idle_timeout=0.01)
+    async def idle(websocket):
+        await websocket.accept()
+        await websocket.receive_text()
+
+    @app.get("/idle")
+    async def page(request):
+        return {"ok": True}
+
+    client = FakeClient()
+    await app(make_scope("/missing"), client.receive, client.send)
+    assert client.sent == [{"type": "websocket.close", "code": 1000}]
+
+    client = FakeClient([{"type": "websocket.connect"}])
+    await app(make_scope("/idle"), client.receive, client.send)
+    assert client.sent[-1] == {"type": "websocket.close", "code": 1001, "reason": "Idle timeout"}
+
+
+@pytest.mark.asyncio
+async def test_http_requests_never_reach_websocket_routes():
+    """Test that an HTTP method named WEBSOCKET doesn't match websocket routes."""
+    app = App()
+
+    @app.websocket("/live")
+    async def live(websocket):
+        await websocket.accept()
+
+    @app.get("/both")
+    async def page(request):
+        return {"ok": True}
+
+    @app.websocket("/both")
+    async def both(websocket):
+        await websocket.accept()
+
+    client = TestClient(app)
+    assert (await client.request("WEBSOCKET", "/live")).status_code == 404
+    response = await client.request("WEBSOCKET", "/both")
+    assert response.status_code == 405
+    assert response.headers["allow"] == "GET"
+
+
+@pytest.mark.asyncio
+async def test_broadcast_fan_out_and_slow_consumers():
+    """Test that publish queues without awaiting and bounds slow clients."""
+    fast, slow = FakeClient(), FakeClient()
+    gate = asyncio.Event()
+
+    async def blocked_send(message):
+        await gate.wait()
+        slow.sent.append(message)
+
+    sockets = [WebSocket({}, fast.receive, fast.send), WebSocket({}, slow.receive, blocked_send)]
+    for websocket in sockets:
+        websocket.client_state = 1
+
+    broadcast = Broadcast(max_queue=2)
+    for websocket in sockets:
+        broadcast.add(websocket)
+
+    for i in range(4):
+        assert broadcast.publish({"n": i}) == 2
+        await asyncio.sleep(0)
+
+    assert [m["text"] for m in fast.sent] == ['{"n": 0}', '{"n": 1}', '{"n": 2}', '{"n": 3}']
+    assert broadcast.dropped == 1
+    gate.set()
+    await asyncio.sleep(0.01)
+    assert [m["text"] for m in slow.sent] == ['{"n": 0}', '{"n": 2}', '{"n": 3}']
+
+    for websocket in sockets:
+        broadcast.remove(websocket)
+    assert len(broadcast) == 0